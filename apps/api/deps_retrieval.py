@@ -0,0 +1,23 @@
+"""
+Retrieval dependency for the chat endpoints.
+
+get_retriever returns a callable that takes the user's question and returns
+the fused dense + BM25 chunks for it (ai_engine.hybrid). The search opens
+its own sessions, so it never shares the request's transaction. Tests
+override this dependency so endpoint tests never embed queries or hit
+Gemini.
+"""
+
+from collections.abc import Awaitable, Callable
+from functools import partial
+
+from ai_engine.hybrid import hybrid_search
+from ai_engine.retrieval import RetrievedChunk
+from database import AsyncSessionLocal
+
+Retriever = Callable[[str], Awaitable[list[RetrievedChunk]]]
+
+
+def get_retriever() -> Retriever:
+    """Hybrid retrieval over sessions from AsyncSessionLocal."""
+    return partial(hybrid_search, AsyncSessionLocal)
@@ -1,11 +1,41 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
+from ai_engine.bm25 import get_bm25_index
+from ai_engine.clients import close_client
+from ai_engine.worker import build_workers
+from database import AsyncSessionLocal
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from apps.api.routers import admin, chat
 
-app = FastAPI(title="Awaqi API", version="1.0.0")
+# Ingestion workers run inside the API process unless set to 0 (e.g. when
+# dedicated `python -m ai_engine.worker` processes consume the queue).
+_INPROCESS_WORKERS = int(os.getenv("INGEST_INPROCESS_WORKERS", "1"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop = asyncio.Event()
+    tasks = []
+    if _INPROCESS_WORKERS > 0:
+        workers = build_workers(
+            _INPROCESS_WORKERS,
+            page_cache=admin._page_cache,
+            embedding_cache=admin._embedding_cache,
+        )
+        tasks = [asyncio.create_task(worker.run(stop)) for worker in workers]
+    # The BM25 index is built and then kept in sync in the background
+    tasks.append(asyncio.create_task(get_bm25_index().run(AsyncSessionLocal, stop)))
+    yield
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await close_client()
+
+
+app = FastAPI(title="Awaqi API", version="1.0.0", lifespan=lifespan)
 
 # Read allowed origins from env so production can lock this down.
 # Defaults include both localhost and 127.0.0.1 for local development.
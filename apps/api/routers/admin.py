@@ -1,16 +1,29 @@
+import asyncio
 import hashlib
 import logging
 import os
 import uuid
 from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO
 
-from ai_engine import ingest_pdf
-from database import get_session
+from ai_engine.cache import DatabaseEmbeddingCache, DatabasePageCache
+from ai_engine.jobs import JobQueue, get_job_queue, spool_path, upload_path
+from database import AsyncSessionLocal, get_session
 from database.models.auth import BaUser
 from database.models.document import Document
 from database.models.document import DocumentStatus as DocStatusEnum
 from database.models.session import Message, MessageRole
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Response,
+    UploadFile,
+    status,
+)
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -20,9 +33,13 @@ from apps.api.schemas import (
     AdminDocumentList,
     AdminUserItem,
     AdminUserList,
+    CacheCounters,
     DocumentStatus,
+    IngestionCacheStats,
+    IngestionStatus,
     LogEntry,
     LogEntryList,
+    StageProgressItem,
 )
 
 logger = logging.getLogger(__name__)
@@ -33,6 +50,11 @@ ALLOWED_UPLOAD_MIME_TYPES = {"application/pdf", "application/x-pdf"}
 
 router = APIRouter()
 
+# Process-wide so their hit/miss counters accumulate across ingestions
+# run by this process's in-process workers (see apps.api.main)
+_page_cache = DatabasePageCache(AsyncSessionLocal)
+_embedding_cache = DatabaseEmbeddingCache(AsyncSessionLocal)
+
 
 def _role_value(user: BaUser) -> str:
     return str(getattr(user.role, "value", user.role))
@@ -65,19 +87,44 @@ def _validate_upload_metadata(file: UploadFile) -> None:
         )
 
 
-async def _sha256_with_size_limit(file: UploadFile) -> str:
+def _open_spool() -> tuple[Path, BinaryIO]:
+    path = spool_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path, open(path, "wb")
+
+
+async def _spool_upload(file: UploadFile) -> tuple[Path, str]:
+    """
+    Stream the upload to a file in the storage directory while hashing it.
+
+    The upload is read exactly once and never held in memory as a whole.
+    Returns the spooled path and the SHA-256 hex digest; the spool file is
+    removed if the size limit is exceeded or the read fails.
+    """
+    path, out = await asyncio.to_thread(_open_spool)
     total_bytes = 0
     digest = hashlib.sha256()
-    while chunk := await file.read(UPLOAD_READ_CHUNK_SIZE):
-        total_bytes += len(chunk)
-        if total_bytes > MAX_UPLOAD_BYTES:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File exceeds max allowed size of {MAX_UPLOAD_BYTES} bytes",
-            )
-        digest.update(chunk)
-    await file.seek(0)
-    return digest.hexdigest()
+    try:
+        while chunk := await file.read(UPLOAD_READ_CHUNK_SIZE):
+            total_bytes += len(chunk)
+            if total_bytes > MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File exceeds max allowed size of {MAX_UPLOAD_BYTES} bytes",
+                )
+            digest.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+        await asyncio.to_thread(out.close)
+    except BaseException:
+        await asyncio.to_thread(_discard_spool, path, out)
+        raise
+    return path, digest.hexdigest()
+
+
+def _discard_spool(path: Path, out: BinaryIO | None = None) -> None:
+    if out is not None:
+        out.close()
+    path.unlink(missing_ok=True)
 
 
 @router.get("/admin/documents", response_model=AdminDocumentList)
@@ -169,54 +216,186 @@ async def delete_admin_user(
     return {"status": "ok", "deleted_user_id": user_id}
 
 
-@router.post("/admin/upload", response_model=DocumentStatus)
+@router.post(
+    "/admin/upload",
+    response_model=DocumentStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def upload_document(
+    response: Response,
     file: UploadFile = File(...),
+    replaces: str | None = Form(None),
     current_user: BaUser = Depends(get_current_admin),
     db: AsyncSession = Depends(get_session),
+    queue: JobQueue = Depends(get_job_queue),
 ):
+    """
+    Store the PDF and queue it for ingestion.
+
+    Returns 202 with the document in `pending`; poll
+    GET /admin/documents/{doc_id}/ingestion for progress. Re-uploading a
+    known file returns its current status (200), except that a FAILED
+    document is queued again.
+
+    With `replaces` set to an existing document id, the file is an amended
+    version of that document: it keeps its id, its version is bumped and
+    only the chunks whose text changed are re-embedded and rewritten.
+    """
     _require_superadmin(current_user)
     _validate_upload_metadata(file)
-    file_hash = await _sha256_with_size_limit(file)
+    replaces_uuid = _parse_replaces(replaces)
+    spooled, file_hash = await _spool_upload(file)
 
     # Check for duplicate by file hash
-    existing = await db.execute(
-        select(Document).where(Document.file_hash == file_hash)
-    )
+    try:
+        existing = await db.execute(
+            select(Document).where(Document.file_hash == file_hash)
+        )
+    except BaseException:
+        await asyncio.to_thread(_discard_spool, spooled)
+        raise
     doc = existing.scalar_one_or_none()
 
-    if doc is not None:
+    if doc is None and replaces_uuid is not None:
+        try:
+            doc = await _new_version(db, replaces_uuid, file, file_hash)
+        except BaseException:
+            await asyncio.to_thread(_discard_spool, spooled)
+            raise
+    elif doc is not None and doc.status != DocStatusEnum.FAILED:
+        await asyncio.to_thread(_discard_spool, spooled)
+        response.status_code = status.HTTP_200_OK
         return DocumentStatus(
             doc_id=str(doc.id),
             status=str(getattr(doc.status, "value", doc.status)),
         )
 
-    # Create new document record
-    doc = Document(
-        id=uuid.uuid4(),
-        title=file.filename or "Untitled",
-        file_hash=file_hash,
-        status=DocStatusEnum.PENDING,
-    )
-    db.add(doc)
-    await db.flush()
+    elif doc is None:
+        doc = Document(
+            id=uuid.uuid4(),
+            title=file.filename or "Untitled",
+            file_hash=file_hash,
+            status=DocStatusEnum.PENDING,
+        )
+        db.add(doc)
+    else:
+        doc.status = DocStatusEnum.PENDING
 
-    # Run the ingestion pipeline: extract → chunk → embed → store
+    # The worker must be able to see the row before it gets the job. Commit
+    # before moving the file, so a failed commit leaves no orphaned upload
     try:
-        pdf_bytes = await file.read()
-        chunk_count = await ingest_pdf(pdf_bytes, doc.id, db)
-        doc.status = DocStatusEnum.INDEXED
-        logger.info("Document %s indexed with %d chunks", doc.id, chunk_count)
+        await db.commit()
+    except BaseException:
+        await asyncio.to_thread(_discard_spool, spooled)
+        raise
+    try:
+        # Same directory, so this is an atomic rename: a worker never sees a partial file
+        await asyncio.to_thread(spooled.replace, upload_path(doc.id))
+        await queue.enqueue(str(doc.id))
     except Exception:
+        logger.exception("Could not queue ingestion of document %s", doc.id)
+        await asyncio.to_thread(_discard_spool, spooled)
         doc.status = DocStatusEnum.FAILED
-        logger.exception("Ingestion failed for document %s", doc.id)
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ingestion queue unavailable; please retry the upload",
+        )
 
+    logger.info("Queued document %s for ingestion", doc.id)
     return DocumentStatus(
         doc_id=str(doc.id),
         status=str(getattr(doc.status, "value", doc.status)),
     )
 
 
+def _parse_replaces(replaces: str | None) -> uuid.UUID | None:
+    if not replaces:
+        return None
+    try:
+        return uuid.UUID(replaces)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="replaces must be a valid UUID",
+        )
+
+
+async def _new_version(
+    db: AsyncSession, doc_id: uuid.UUID, file: UploadFile, file_hash: str
+) -> Document:
+    """Point an existing document at an amended file as its next version."""
+    doc = await db.get(Document, doc_id, with_for_update=True)
+    if doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document to replace not found",
+        )
+    if doc.status == DocStatusEnum.PENDING:
+        # Its current file is still being ingested
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Document is still being ingested; retry when it has finished",
+        )
+    doc.title = file.filename or doc.title
+    doc.file_hash = file_hash
+    doc.version += 1
+    doc.status = DocStatusEnum.PENDING
+    return doc
+
+
+@router.get("/admin/documents/{doc_id}/ingestion", response_model=IngestionStatus)
+async def get_ingestion_status(
+    doc_id: str,
+    current_user: BaUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_session),
+    queue: JobQueue = Depends(get_job_queue),
+):
+    """Document status plus per-stage progress of its ingestion job."""
+    del current_user  # endpoint is admin-protected via dependency
+    try:
+        doc_uuid = uuid.UUID(doc_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="doc_id must be a valid UUID",
+        )
+
+    doc = await db.get(Document, doc_uuid)
+    if doc is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found",
+        )
+
+    result = IngestionStatus(
+        doc_id=doc_id,
+        status=str(getattr(doc.status, "value", doc.status)),
+    )
+    progress = await queue.get_progress(doc_id)
+    if progress is not None:
+        result.stage = progress.stage
+        result.stages = {
+            name: StageProgressItem(done=stage.done, total=stage.total)
+            for name, stage in progress.stages.items()
+        }
+        result.attempts = progress.attempts
+        result.error = progress.error
+    return result
+
+
+@router.get("/admin/ingestion/cache-stats", response_model=IngestionCacheStats)
+async def get_ingestion_cache_stats(
+    current_user: BaUser = Depends(get_current_admin),
+):
+    """Hit/miss counters of this API worker's ingestion caches."""
+    del current_user  # endpoint is admin-protected via dependency
+    return IngestionCacheStats(
+        page_cache=CacheCounters(**_page_cache.stats()),
+        embedding_cache=CacheCounters(**_embedding_cache.stats()),
+    )
+
+
 @router.get("/admin/logs", response_model=LogEntryList)
 async def get_logs(
     current_user: BaUser = Depends(get_current_admin),
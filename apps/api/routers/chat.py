@@ -18,6 +18,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from apps.api.deps_rate_limit import require_rate_limit
+from apps.api.deps_retrieval import Retriever, get_retriever
 from apps.api.schemas import (
     ChatMessage,
     ChatRequest,
@@ -27,6 +28,8 @@ from apps.api.schemas import (
 )
 
 router = APIRouter()
+# Citations carry a snippet of the chunk, not its full text (up to ~1500 tokens)
+CITATION_SNIPPET_CHARS = 300
 SESSION_TOKEN_SECRET = os.environ.get("SESSION_TOKEN_SECRET", "")
 if not SESSION_TOKEN_SECRET:
     raise RuntimeError(
@@ -43,6 +46,13 @@ def _build_guest_session_token(session_id: uuid.UUID) -> str:
     ).hexdigest()
 
 
+def _snippet(text: str, limit: int = CITATION_SNIPPET_CHARS) -> str:
+    """`text` cut at a word boundary to at most `limit` characters."""
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(maxsplit=1)[0] + "…"
+
+
 def _validate_guest_session_token(
     chat_session: ChatSession, session_token: str | None
 ) -> None:
@@ -92,6 +102,7 @@ async def send_message(
     request: ChatRequest,
     session_token: str | None = Header(None, alias="X-Session-Token"),
     db: AsyncSession = Depends(get_session),
+    retrieve: Retriever = Depends(get_retriever),
     _rl: None = Depends(require_rate_limit),
 ):
     chat_session = await _get_or_create_session(
@@ -110,13 +121,22 @@ async def send_message(
     db.add(user_msg)
     await db.flush()
 
-    # TODO: replace with real ai-engine RAG call once ai-engine is wired up
-    # from ai_engine import rag_pipeline
-    # rag_result = await rag_pipeline.answer(request.message, language=request.language)
+    # Dense + BM25 retrieval, fused; a slow or failed leg falls back to the other
+    chunks = await retrieve(request.message)
+    citations = [
+        Citation(
+            source=chunk.document_title,
+            page=chunk.pages[0] if chunk.pages else 0,
+            text=_snippet(chunk.content),
+        )
+        for chunk in chunks
+    ]
+
+    # TODO: generate the answer from `chunks` once the ai-engine RAG pipeline exists
+    # rag_result = await rag_pipeline.answer(request.message, chunks, language=request.language)
     response_text = (
         "This is a placeholder response. Connect the ai-engine RAG pipeline here."
     )
-    citations: list[Citation] = []
     confidence_score = 0.0
 
     # Persist the assistant message
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -34,6 +34,18 @@ class DocumentStatus(BaseModel):
     doc_id: str
     status: str
 
+class StageProgressItem(BaseModel):
+    done: int
+    total: int
+
+class IngestionStatus(BaseModel):
+    doc_id: str
+    status: str
+    stage: Optional[str] = None
+    stages: Dict[str, StageProgressItem] = {}
+    attempts: int = 0
+    error: Optional[str] = None
+
 class LogEntry(BaseModel):
     timestamp: str
     level: str
@@ -66,3 +78,13 @@ class AdminUserItem(BaseModel):
 
 class AdminUserList(BaseModel):
     users: List[AdminUserItem]
+
+
+class CacheCounters(BaseModel):
+    hits: int
+    misses: int
+
+
+class IngestionCacheStats(BaseModel):
+    page_cache: CacheCounters
+    embedding_cache: CacheCounters
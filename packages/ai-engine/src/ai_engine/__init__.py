@@ -1,5 +1,5 @@
 """ai-engine — Core AI logic for Awaqi."""
 
-from ai_engine.ingest import ingest_pdf
+from ai_engine.ingest import IngestionResult, ingest_pdf
 
-__all__ = ["ingest_pdf"]
+__all__ = ["IngestionResult", "ingest_pdf"]
@@ -0,0 +1,298 @@
+"""
+In-process BM25 index over `document_chunks` for sparse (lexical) retrieval.
+
+Dense retrieval finds passages that mean the same as the question, but
+exact legal terms and article or proclamation numbers ("አንቀጽ ፲፪",
+"983/2016") are matched far more reliably by the words themselves. The
+pg_trgm index can filter on such terms but cannot rank multi-word queries
+well, and every lexical query would be another database round trip.
+
+BM25Index keeps an inverted index in process memory and answers queries
+without touching the database:
+
+- text is tokenized with the Ge'ez-aware tokenizer (ai_engine.tokenizer),
+  so homophone spellings and Ethiopic numerals match their variants
+- each term's postings are two typed arrays (chunk ordinals as uint32,
+  term frequencies as uint16) that grow in place
+- between changes a term's BM25 contributions are computed once, on its
+  first query, and cached as numpy arrays; a query then costs one
+  scatter-add per term over the postings it touches
+- deleted chunks are tombstoned and the arrays are compacted once a
+  quarter of the ordinals are dead
+
+The index follows the database incrementally: `refresh` compares one
+aggregate row per document (chunk count, canonical chunk count, newest
+chunk) with what was indexed, and re-reads only the documents that were
+added, re-ingested, re-chunked or deleted. `run` refreshes on an interval
+in the background (started by the API); searches never wait on it.
+
+Near-duplicate chunks (`canonical_chunk_id` set, see ai_engine.dedup) are
+not indexed, as in dense retrieval: their canonical chunk carries the
+same terms. When a canonical chunk is deleted its duplicates are promoted,
+which changes their document's canonical count, so they are picked up by
+the next refresh.
+
+Environment variables:
+    BM25_REFRESH_INTERVAL  — seconds between refreshes from the database (default: 30)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import os
+import uuid
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from typing import NamedTuple
+
+import numpy as np
+from database.models.document import DocumentChunk
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ai_engine.executor import run_cpu_bound
+from ai_engine.tokenizer import tokenize
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = float(os.getenv("BM25_REFRESH_INTERVAL", "30"))
+
+K1 = 1.2
+B = 0.75
+
+_MAX_TF = (1 << 16) - 1
+_COMPACT_DEAD_FRACTION = 0.25
+_REFRESH_BATCH = 100  # documents re-read per query
+
+
+class SparseHit(NamedTuple):
+    """A chunk matched by a BM25 query."""
+    chunk_id: uuid.UUID
+    document_id: uuid.UUID
+    score: float
+
+
+def term_counts(texts: Iterable[str]) -> list[Counter[str]]:
+    """Term frequencies of each text (CPU-bound)."""
+    return [Counter(tokenize(text)) for text in texts]
+
+
+class BM25Index:
+    """Inverted index of chunk texts with BM25 (Okapi) scoring."""
+
+    def __init__(self, k1: float = K1, b: float = B):
+        self.k1 = k1
+        self.b = b
+        self._vocabulary: dict[str, int] = {}
+        self._postings: list[tuple[array, array]] = []  # term id -> (ordinals, tfs)
+        # Per ordinal
+        self._chunk_ids: list[uuid.UUID] = []
+        self._document_ids: list[uuid.UUID] = []
+        self._lengths = array("I")
+        self._alive = bytearray()
+        self._by_document: dict[uuid.UUID, list[int]] = {}
+        self._live_count = 0
+        self._live_length = 0
+        # term id -> (live ordinals, idf-weighted BM25 term scores); holds
+        # no views of the arrays above, so they can still grow
+        self._impacts: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        # Database state each document was indexed at (see `refresh`)
+        self._signatures: dict[uuid.UUID, tuple] = {}
+        self._refresh_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def add(self, chunk_id: uuid.UUID, document_id: uuid.UUID, counts: Counter[str]) -> None:
+        """Index one chunk from its term frequencies (see `term_counts`)."""
+        ordinal = len(self._chunk_ids)
+        self._impacts.clear()
+        for term, tf in counts.items():
+            term_id = self._vocabulary.get(term)
+            if term_id is None:
+                term_id = self._vocabulary[term] = len(self._postings)
+                self._postings.append((array("I"), array("H")))
+            ordinals, tfs = self._postings[term_id]
+            ordinals.append(ordinal)
+            tfs.append(min(tf, _MAX_TF))
+        length = sum(counts.values())
+        self._chunk_ids.append(chunk_id)
+        self._document_ids.append(document_id)
+        self._lengths.append(length)
+        self._alive.append(1)
+        self._by_document.setdefault(document_id, []).append(ordinal)
+        self._live_count += 1
+        self._live_length += length
+
+    def remove_document(self, document_id: uuid.UUID) -> int:
+        """Drop all chunks of a document. Returns the number removed."""
+        ordinals = self._by_document.pop(document_id, [])
+        if ordinals:
+            self._impacts.clear()
+        for ordinal in ordinals:
+            self._alive[ordinal] = 0
+            self._live_length -= self._lengths[ordinal]
+        self._live_count -= len(ordinals)
+        self._signatures.pop(document_id, None)
+        return len(ordinals)
+
+    def search(self, query: str, top_k: int) -> list[SparseHit]:
+        """The `top_k` chunks with the highest BM25 score for `query`, best first."""
+        term_ids = {self._vocabulary[t] for t in tokenize(query) if t in self._vocabulary}
+        if not term_ids or not self._live_count or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self._chunk_ids), dtype=np.float32)
+        touched = []
+        for term_id in term_ids:
+            ordinals, impacts = self._term_impacts(term_id)
+            scores[ordinals] += impacts
+            touched.append(ordinals)
+
+        if sum(map(len, touched)) < len(scores) // 4:
+            # An ordinal appears once per matching term, so the best
+            # top_k * terms entries hold the top_k distinct ordinals
+            candidates = np.concatenate(touched)
+            limit = top_k * len(touched)
+        else:  # cheaper than listing the nonzero scores
+            candidates = np.arange(len(scores))
+            limit = top_k
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        hits: dict[int, SparseHit] = {}
+        for o in candidates[np.argsort(-scores[candidates], kind="stable")]:
+            if len(hits) == top_k or scores[o] <= 0:
+                break
+            if o not in hits:
+                hits[o] = SparseHit(self._chunk_ids[o], self._document_ids[o], float(scores[o]))
+        return list(hits.values())
+
+    def _term_impacts(self, term_id: int) -> tuple[np.ndarray, np.ndarray]:
+        cached = self._impacts.get(term_id)
+        if cached is not None:
+            return cached
+        ordinals, tfs = self._postings[term_id]
+        ordinals = np.frombuffer(ordinals, dtype=np.uint32)
+        live = np.frombuffer(self._alive, dtype=np.bool_)[ordinals]
+        ordinals = ordinals[live].astype(np.intp)
+        tfs = np.frombuffer(tfs, dtype=np.uint16)[live].astype(np.float32)
+        df = len(ordinals)
+        idf = math.log(1 + (self._live_count - df + 0.5) / (df + 0.5))
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)[ordinals]
+        average_length = self._live_length / self._live_count
+        norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        impacts = (idf * tfs * (self.k1 + 1) / (tfs + norm)).astype(np.float32)
+        self._impacts[term_id] = ordinals, impacts
+        return ordinals, impacts
+
+    def compact(self) -> None:
+        """Renumber the live chunks and drop tombstones from the postings."""
+        self._impacts.clear()
+        alive = np.frombuffer(self._alive, dtype=np.bool_)
+        keep = np.flatnonzero(alive)
+        renumber = np.cumsum(alive, dtype=np.int64) - 1
+        vocabulary, postings = {}, []
+        for term, term_id in self._vocabulary.items():
+            ordinals, tfs = self._postings[term_id]
+            ordinals = np.frombuffer(ordinals, dtype=np.uint32)
+            live = alive[ordinals]
+            if not live.any():
+                continue
+            vocabulary[term] = len(postings)
+            postings.append((
+                array("I", renumber[ordinals[live]].astype(np.uint32).tobytes()),
+                array("H", np.frombuffer(tfs, dtype=np.uint16)[live].tobytes()),
+            ))
+
+        self._vocabulary, self._postings = vocabulary, postings
+        self._chunk_ids = [self._chunk_ids[o] for o in keep]
+        self._document_ids = [self._document_ids[o] for o in keep]
+        self._lengths = array("I", (self._lengths[o] for o in keep))
+        self._alive = bytearray(b"\x01" * len(keep))
+        self._by_document = {}
+        for ordinal, document_id in enumerate(self._document_ids):
+            self._by_document.setdefault(document_id, []).append(ordinal)
+
+    async def refresh(self, db: AsyncSession) -> tuple[int, int]:
+        """
+        Bring the index up to date with `document_chunks`.
+        Returns the number of documents (re)indexed and removed.
+        """
+        async with self._refresh_lock:
+            result = await db.execute(
+                select(
+                    DocumentChunk.document_id,
+                    func.count(),
+                    func.count().filter(DocumentChunk.canonical_chunk_id.is_(None)),
+                    func.max(DocumentChunk.created_at),
+                ).group_by(DocumentChunk.document_id)
+            )
+            current = {document_id: tuple(signature) for document_id, *signature in result}
+            removed = [d for d in self._signatures if d not in current]
+            for document_id in removed:
+                self.remove_document(document_id)
+            changed = [d for d, sig in current.items() if self._signatures.get(d) != sig]
+            for start in range(0, len(changed), _REFRESH_BATCH):
+                batch = changed[start:start + _REFRESH_BATCH]
+                await self._reindex(db, batch, current)
+
+            total = len(self._chunk_ids)
+            if total and (total - self._live_count) / total >= _COMPACT_DEAD_FRACTION:
+                self.compact()
+        if removed or changed:
+            logger.info(
+                "BM25 index: %d documents indexed, %d removed; %d chunks, %d terms",
+                len(changed), len(removed), self._live_count, len(self._vocabulary),
+            )
+        return len(changed), len(removed)
+
+    async def _reindex(
+        self, db: AsyncSession, document_ids: list[uuid.UUID], signatures: dict
+    ) -> None:
+        result = await db.execute(
+            select(DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.content)
+            .where(
+                DocumentChunk.document_id.in_(document_ids),
+                DocumentChunk.canonical_chunk_id.is_(None),
+            )
+            .order_by(DocumentChunk.document_id, DocumentChunk.chunk_index)
+        )
+        rows = result.all()
+        counts = await run_cpu_bound(term_counts, [content for _, _, content in rows])
+        # No awaits from here on: searches see each document entirely old or new
+        for document_id in document_ids:
+            self.remove_document(document_id)
+            self._signatures[document_id] = signatures[document_id]
+        for (chunk_id, document_id, _), chunk_counts in zip(rows, counts):
+            self.add(chunk_id, document_id, chunk_counts)
+
+    async def run(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        stop: asyncio.Event,
+        interval: float = REFRESH_INTERVAL,
+    ) -> None:
+        """Refresh every `interval` seconds until `stop` is set."""
+        while not stop.is_set():
+            try:
+                async with session_factory() as db:
+                    await self.refresh(db)
+            except Exception:
+                logger.exception("BM25 index refresh failed")
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(stop.wait(), interval)
+
+
+_index: BM25Index | None = None
+
+
+def get_bm25_index() -> BM25Index:
+    """Return the process-wide BM25 index."""
+    global _index
+    if _index is None:
+        _index = BM25Index()
+    return _index
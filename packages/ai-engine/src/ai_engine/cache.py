@@ -0,0 +1,278 @@
+"""
+Persistent caches for paid Gemini work.
+
+PageCache maps a content-addressed page key (see extractor.page_cache_key)
+to extracted text, so pages that did not change between uploads are never
+re-sent to Gemini.
+
+EmbeddingCache maps a hash of (text, model, dimension, task type) to its
+normalized embedding (see embedder.embedding_cache_key), so boilerplate,
+repeated preambles and re-chunked documents are only embedded once.
+
+The database-backed implementations open their own short-lived sessions
+and commit immediately, so cached work survives even if the surrounding
+ingestion transaction is rolled back.
+
+Query embeddings on the chat path (see retrieval.embed_query) use short-
+lived EmbeddingCaches instead, with entries that expire:
+    InMemoryEmbeddingCache  — LRU with a TTL, in process memory
+    RedisEmbeddingCache     — float32 bytes in Redis with a sliding TTL,
+                              shared by all API processes, behind an
+                              InMemoryEmbeddingCache so hot questions skip
+                              even the Redis round trip
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Protocol
+
+import numpy as np
+import redis.asyncio as aioredis
+from database.models.cache import EmbeddingCacheEntry, PageExtraction
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) lists and multi-row INSERTs to a reasonable size
+_MAX_KEYS_PER_QUERY = 500
+
+
+class PageCache(Protocol):
+    """Lookup and write-back of extracted page text by content key."""
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, str]:
+        """Return the cached text for every key that is present."""
+        ...
+
+    async def set_many(self, entries: Mapping[str, str]) -> None:
+        """Store extracted text for the given keys (existing keys are kept)."""
+        ...
+
+
+class DatabasePageCache:
+    """
+    PageCache stored in the `page_extraction_cache` table.
+
+    `hits` and `misses` count lookups over the lifetime of the instance.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        self._session_factory = session_factory
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """Cumulative hit/miss counters."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, str]:
+        found: dict[str, str] = {}
+        if keys:
+            async with self._session_factory() as session:
+                for start in range(0, len(keys), _MAX_KEYS_PER_QUERY):
+                    batch = keys[start:start + _MAX_KEYS_PER_QUERY]
+                    result = await session.execute(
+                        select(PageExtraction.key, PageExtraction.text)
+                        .where(PageExtraction.key.in_(batch))
+                    )
+                    found.update(result.tuples().all())
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, entries: Mapping[str, str]) -> None:
+        if not entries:
+            return
+        rows = [{"key": key, "text": text} for key, text in entries.items()]
+        async with self._session_factory() as session:
+            for start in range(0, len(rows), _MAX_KEYS_PER_QUERY):
+                await session.execute(
+                    insert(PageExtraction)
+                    .values(rows[start:start + _MAX_KEYS_PER_QUERY])
+                    .on_conflict_do_nothing(index_elements=["key"])
+                )
+            await session.commit()
+        logger.debug("Cached extracted text for %d pages", len(rows))
+
+
+class EmbeddingCache(Protocol):
+    """Lookup and write-back of normalized embeddings by content key."""
+
+    hits: int
+    misses: int
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, np.ndarray]:
+        """Return the cached float32 embedding for every key that is present."""
+        ...
+
+    async def set_many(self, entries: Mapping[str, np.ndarray]) -> None:
+        """Store embeddings for the given keys (existing keys are kept)."""
+        ...
+
+
+class DatabaseEmbeddingCache:
+    """
+    EmbeddingCache stored in the `embedding_cache` table.
+
+    `hits` and `misses` count lookups over the lifetime of the instance.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        self._session_factory = session_factory
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """Cumulative hit/miss counters."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, np.ndarray]:
+        found: dict[str, np.ndarray] = {}
+        if keys:
+            async with self._session_factory() as session:
+                for start in range(0, len(keys), _MAX_KEYS_PER_QUERY):
+                    batch = keys[start:start + _MAX_KEYS_PER_QUERY]
+                    result = await session.execute(
+                        select(EmbeddingCacheEntry.key, EmbeddingCacheEntry.embedding)
+                        .where(EmbeddingCacheEntry.key.in_(batch))
+                    )
+                    # pgvector already returns float32 ndarrays
+                    found.update(result.tuples().all())
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, entries: Mapping[str, np.ndarray]) -> None:
+        if not entries:
+            return
+        rows = [{"key": key, "embedding": emb} for key, emb in entries.items()]
+        async with self._session_factory() as session:
+            for start in range(0, len(rows), _MAX_KEYS_PER_QUERY):
+                await session.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values(rows[start:start + _MAX_KEYS_PER_QUERY])
+                    .on_conflict_do_nothing(index_elements=["key"])
+                )
+            await session.commit()
+        logger.debug("Cached %d embeddings", len(rows))
+
+
+class InMemoryEmbeddingCache:
+    """
+    EmbeddingCache in process memory: at most `capacity` entries, least
+    recently used evicted first, each expiring `ttl` seconds after it was
+    stored.
+    """
+
+    def __init__(self, capacity: int, ttl: float):
+        self._capacity = capacity
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[np.ndarray, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, np.ndarray]:
+        now = time.monotonic()
+        found: dict[str, np.ndarray] = {}
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if entry[1] <= now:
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            found[key] = entry[0]
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, entries: Mapping[str, np.ndarray]) -> None:
+        if self._capacity <= 0:
+            return
+        expires = time.monotonic() + self._ttl
+        for key, embedding in entries.items():
+            embedding = np.asarray(embedding, dtype=np.float32)
+            embedding.flags.writeable = False  # shared by every caller that hits
+            self._entries[key] = (embedding, expires)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+
+
+class RedisEmbeddingCache:
+    """
+    EmbeddingCache in Redis, shared by all processes, with a local
+    InMemoryEmbeddingCache in front.
+
+    Keys:
+        {prefix}:{key}  STRING of little-endian float32 values
+
+    Every hit renews the entry's TTL (GETEX), so questions that keep being
+    asked stay cached while the rest expire; under memory pressure a
+    volatile-lru / allkeys-lru maxmemory-policy evicts the least recently
+    used first. If Redis is unreachable, lookups miss and writes are
+    skipped (with a warning): the cache never fails a query.
+
+    Needs a client that returns bytes (database.redis_client.redis_binary_client).
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        ttl: int,
+        *,
+        local_size: int = 0,
+        prefix: str = "embedding:query",
+    ):
+        self._redis = redis
+        self._ttl = ttl
+        self._prefix = prefix
+        self._local = InMemoryEmbeddingCache(local_size, ttl)
+        self.hits = 0
+        self.misses = 0
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, np.ndarray]:
+        found = await self._local.get_many(keys)
+        remote = [key for key in keys if key not in found]
+        if remote:
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    for key in remote:
+                        pipe.getex(f"{self._prefix}:{key}", ex=self._ttl)
+                    values = await pipe.execute()
+            except Exception:
+                logger.warning("Query embedding cache unavailable", exc_info=True)
+                values = [None] * len(remote)
+            fetched = {
+                key: np.frombuffer(value, dtype="<f4").astype(np.float32)
+                for key, value in zip(remote, values)
+                if value is not None
+            }
+            await self._local.set_many(fetched)
+            found.update(fetched)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, entries: Mapping[str, np.ndarray]) -> None:
+        if not entries:
+            return
+        await self._local.set_many(entries)
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, embedding in entries.items():
+                    pipe.set(
+                        f"{self._prefix}:{key}",
+                        np.asarray(embedding, dtype="<f4").tobytes(),
+                        ex=self._ttl,
+                    )
+                await pipe.execute()
+        except Exception:
+            logger.warning("Query embedding cache unavailable", exc_info=True)
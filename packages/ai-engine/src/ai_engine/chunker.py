@@ -3,12 +3,33 @@ Text chunker for the ingestion pipeline.
 
 Splits extracted page texts into overlapping chunks suitable for embedding
 and retrieval. Each chunk carries metadata about which page(s) it spans.
+
+`iter_chunks` does the work as a generator that runs in time linear in the
+document size; `chunk_pages` collects its output into a list.
+
+Two ChunkingStrategy implementations are available:
+    WindowChunker    — fixed character windows with overlap (iter_chunks)
+    SentenceChunker  — packs whole sentences and articles up to a token
+                       budget estimated per script (Ge'ez vs Latin), so
+                       chunks neither split mid-sentence at `።` nor waste
+                       embedding capacity
+
+Environment variables:
+    CHUNK_STRATEGY    — "sentence" (default) or "window"
+    CHUNK_MAX_TOKENS  — token budget per chunk for "sentence" (default: 1500)
 """
 
 from __future__ import annotations
 
 import logging
+import math
+import os
+import re
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import NamedTuple, Protocol
 
 from ai_engine.extractor import PageText
 
@@ -16,6 +37,32 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_CHUNK_SIZE = 4000  # characters (~1000 tokens)
 DEFAULT_OVERLAP = 400      # characters (~100 tokens)
+DEFAULT_MAX_TOKENS = 1500  # estimated tokens; gemini-embedding-001 accepts 2048
+
+_CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "sentence")
+_CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", str(DEFAULT_MAX_TOKENS)))
+
+# Rough characters-per-token of the Gemini tokenizer per script. Ge'ez
+# syllables each carry a consonant+vowel, so they pack far fewer characters
+# into a token than Latin letters do. Digits and punctuation count as one
+# token each; whitespace is free.
+_ETHIOPIC_CHARS_PER_TOKEN = 2.0
+_LATIN_CHARS_PER_TOKEN = 4.0
+_ETHIOPIC_CHAR = re.compile(r"[\u1200-\u135f\u1380-\u139f\u2d80-\u2ddf\uab00-\uab2f]")
+_LATIN_CHAR = re.compile(r"[A-Za-z\u00c0-\u024f]")
+_SPACE = re.compile(r"\s")
+
+# A sentence ends at ። or ፧ (or ?, !, a full stop before whitespace, or
+# the typewriter form ፡፡), optionally followed by closing quotes/brackets,
+# and at every paragraph break.
+_SENTENCE_END = re.compile(
+    r"(?:[\u1362\u1367?!]|\u1361\u1361|\.(?=\s))[\"'\u00bb\u201d)\]]*|\n\s*\n"
+)
+# An article/part heading at the start of a line, e.g. "አንቀጽ ፭" or "Article 12"
+_ARTICLE_HEADING = re.compile(
+    r"^[ \t]*((?:አንቀጽ|አንቀፅ|ክፍል|Article|ARTICLE|Part|PART)\s*[0-9\u1369-\u137c]+)",
+    re.MULTILINE,
+)
 
 
 @dataclass
@@ -26,8 +73,63 @@ class Chunk:
     metadata: dict = field(default_factory=dict)
 
 
+class ChunkingStrategy(Protocol):
+    """Turns ordered page texts into chunks, lazily."""
+
+    def chunk(self, pages: Iterable[PageText]) -> Iterator[Chunk]:
+        ...
+
+
+@dataclass(frozen=True)
+class WindowChunker:
+    """Fixed-size character windows with overlap."""
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    overlap: int = DEFAULT_OVERLAP
+
+    def chunk(self, pages: Iterable[PageText]) -> Iterator[Chunk]:
+        return iter_chunks(pages, chunk_size=self.chunk_size, overlap=self.overlap)
+
+
+@dataclass(frozen=True)
+class SentenceChunker:
+    """
+    Whole sentences and articles packed up to `max_tokens` estimated tokens.
+
+    Articles that fit the remaining budget are added to the current chunk;
+    otherwise they start a new one. An article larger than the budget is
+    split between sentences, repeating the last `overlap_sentences` of one
+    chunk at the start of the next. Only a single sentence longer than the
+    whole budget is ever cut, between words.
+    """
+    max_tokens: int = DEFAULT_MAX_TOKENS
+    overlap_sentences: int = 1
+
+    def chunk(self, pages: Iterable[PageText]) -> Iterator[Chunk]:
+        return _SentencePacker(self.max_tokens, self.overlap_sentences).run(pages)
+
+
+def get_chunking_strategy(name: str | None = None) -> ChunkingStrategy:
+    """Return the strategy named by `name` or the CHUNK_STRATEGY env var."""
+    name = name or _CHUNK_STRATEGY
+    if name == "sentence":
+        return SentenceChunker(max_tokens=_CHUNK_MAX_TOKENS)
+    if name == "window":
+        return WindowChunker()
+    raise ValueError(f"Unknown chunking strategy: {name!r}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the embedding-model token count of `text` from its scripts."""
+    ethiopic = len(_ETHIOPIC_CHAR.findall(text))
+    latin = len(_LATIN_CHAR.findall(text))
+    other = len(text) - ethiopic - latin - len(_SPACE.findall(text))
+    return math.ceil(
+        ethiopic / _ETHIOPIC_CHARS_PER_TOKEN + latin / _LATIN_CHARS_PER_TOKEN
+    ) + other
+
+
 def chunk_pages(
-    pages: list[PageText],
+    pages: Iterable[PageText],
     chunk_size: int = DEFAULT_CHUNK_SIZE,
     overlap: int = DEFAULT_OVERLAP,
 ) -> list[Chunk]:
@@ -47,70 +149,268 @@ def chunk_pages(
     Returns:
         List of Chunk objects with 0-indexed chunk_index.
     """
-    if not pages:
+    chunks = list(iter_chunks(pages, chunk_size=chunk_size, overlap=overlap))
+    if not chunks:
+        logger.warning("No text content to chunk")
         return []
 
-    # Build a flat text with page boundary tracking
-    full_text = ""
-    # Map character offset → page number
-    page_boundaries: list[tuple[int, int]] = []  # (start_offset, page_number)
-    for page in pages:
-        if not page.text.strip():
-            continue
-        page_boundaries.append((len(full_text), page.page_number))
-        full_text += page.text + "\n\n"
+    logger.info(
+        "Chunked %d chars into %d chunks (size=%d, overlap=%d)",
+        chunks[-1].metadata["char_end"], len(chunks), chunk_size, overlap,
+    )
+    return chunks
 
-    if not full_text.strip():
-        logger.warning("No text content to chunk")
-        return []
 
-    # Sliding window chunking
-    chunks: list[Chunk] = []
+def iter_chunks(
+    pages: Iterable[PageText],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_OVERLAP,
+) -> Iterator[Chunk]:
+    """
+    Streaming form of `chunk_pages`, yielding exactly the same chunks.
+
+    Pages are consumed lazily and a chunk is yielded as soon as the text
+    under its window is known, so embedding can start while later pages
+    are still being extracted. Only the text from the current window start
+    onwards is kept in memory, and page spans are found by binary search,
+    so the total cost is linear in the size of the document.
+    """
     step = max(chunk_size - overlap, 1)
+    # (start_offset, page_number) of every non-blank page, in offset order
+    page_boundaries: list[tuple[int, int]] = []
+    pending: list[str] = []   # page texts not yet appended to `window`
+    window = ""               # text from offset `window_start` onwards
+    window_start = 0
+    total = 0                 # length of the concatenated text so far
     start = 0
     chunk_idx = 0
 
-    while start < len(full_text):
-        end = min(start + chunk_size, len(full_text))
-        content = full_text[start:end].strip()
-
-        if not content:
+    def _emit(final: bool) -> Iterator[Chunk]:
+        nonlocal window, window_start, start, chunk_idx
+        window = window + "".join(pending)
+        pending.clear()
+        while start < total and (final or start + chunk_size <= total):
+            end = min(start + chunk_size, total)
+            content = window[start - window_start:end - window_start].strip()
+            if content:
+                yield Chunk(
+                    index=chunk_idx,
+                    content=content,
+                    metadata={
+                        "pages": sorted(_pages_for_range(page_boundaries, start, end)),
+                        "char_start": start,
+                        "char_end": end,
+                    },
+                )
+                chunk_idx += 1
             start += step
+        # Everything before the next window start is no longer needed
+        window = window[min(start, total) - window_start:]
+        window_start = min(start, total)
+
+    for page in pages:
+        if not page.text.strip():
             continue
+        page_boundaries.append((total, page.page_number))
+        text = page.text + "\n\n"
+        pending.append(text)
+        total += len(text)
+        if total - start >= chunk_size:
+            yield from _emit(final=False)
+
+    yield from _emit(final=True)
+
+
+def _pages_for_range(
+    boundaries: list[tuple[int, int]],
+    start: int,
+    end: int,
+) -> set[int]:
+    """
+    Find which page numbers a character range spans.
+
+    `boundaries` is sorted by offset; page i covers [offset_i, offset_i+1).
+    """
+    offset_of = itemgetter(0)
+    # First page whose span ends after `start`, last page starting before `end`
+    first = max(bisect_right(boundaries, start, key=offset_of) - 1, 0)
+    last = bisect_left(boundaries, end, key=offset_of)
+    return {page_num for _, page_num in boundaries[first:last]}
+
+
+class _Span(NamedTuple):
+    """A sentence (or a piece of an oversized one) in document offsets."""
+    start: int
+    end: int
+    tokens: int
+
+
+class _SentencePacker:
+    """
+    Streaming state machine behind SentenceChunker.
+
+    Offsets refer to the same concatenated text as iter_chunks (non-blank
+    pages joined by blank lines), so `char_start`/`char_end` and `pages`
+    metadata mean the same thing for both strategies. Each page is split
+    into sentences as it arrives. Sentences accumulate into the pending
+    article until the next heading; once the pending article exceeds the
+    budget it is packed sentence by sentence instead, so memory stays
+    bounded by the budget rather than by article length.
+    """
 
-        # Determine which pages this chunk spans
-        chunk_pages_set = _pages_for_range(page_boundaries, start, end)
+    def __init__(self, max_tokens: int, overlap_sentences: int):
+        self.budget = max(max_tokens, 1)
+        self.overlap = max(overlap_sentences, 0)
+        self.page_boundaries: list[tuple[int, int]] = []
+        self.window = ""       # text from offset `window_start` onwards
+        self.window_start = 0
+        self.total = 0
+        self.current: list[_Span] = []
+        self.current_tokens = 0
+        self.article_from = 0  # index in `current` where the pending article begins
+        self.article: list[_Span] = []
+        self.article_tokens = 0
+        self.splitting = False  # pending article is being packed by sentence
+        self.chunk_idx = 0
 
-        chunks.append(Chunk(
-            index=chunk_idx,
-            content=content,
+    def run(self, pages: Iterable[PageText]) -> Iterator[Chunk]:
+        for page in pages:
+            if not page.text.strip():
+                continue
+            offset = self.total
+            self.page_boundaries.append((offset, page.page_number))
+            self.window += page.text + "\n\n"
+            self.total += len(page.text) + 2
+            for span, opens_article in _split_sentences(page.text, offset):
+                if opens_article:
+                    yield from self._close_article()
+                yield from self._add_sentence(span)
+            self._trim_window()
+        yield from self._close_article()
+        yield from self._flush(carry=False)
+
+    def _add_sentence(self, span: _Span) -> Iterator[Chunk]:
+        if self.splitting:
+            yield from self._pack_sentence(span)
+            return
+        self.article.append(span)
+        self.article_tokens += span.tokens
+        if self.article_tokens > self.budget:
+            # Too big for any chunk: start it afresh and pack by sentence
+            self.splitting = True
+            yield from self._flush(carry=False)
+            pending, self.article, self.article_tokens = self.article, [], 0
+            for sentence in pending:
+                yield from self._pack_sentence(sentence)
+
+    def _close_article(self) -> Iterator[Chunk]:
+        if self.article:
+            if self.current_tokens + self.article_tokens > self.budget:
+                yield from self._flush(carry=False)
+            self.current.extend(self.article)
+            self.current_tokens += self.article_tokens
+        self.article, self.article_tokens = [], 0
+        self.splitting = False
+        self.article_from = len(self.current)
+
+    def _pack_sentence(self, span: _Span) -> Iterator[Chunk]:
+        if span.tokens > self.budget:
+            for piece in self._split_oversized(span):
+                yield from self._pack_sentence(piece)
+            return
+        if self.current_tokens + span.tokens > self.budget:
+            yield from self._flush(carry=True, room_for=span.tokens)
+        self.current.append(span)
+        self.current_tokens += span.tokens
+
+    def _flush(self, carry: bool, room_for: int = 0) -> Iterator[Chunk]:
+        if not self.current:
+            return
+        start, end = self.current[0].start, self.current[-1].end
+        yield Chunk(
+            index=self.chunk_idx,
+            content=self._text(start, end).strip(),
             metadata={
-                "pages": sorted(chunk_pages_set),
+                "pages": sorted(_pages_for_range(self.page_boundaries, start, end)),
                 "char_start": start,
                 "char_end": end,
+                "tokens": self.current_tokens,
             },
-        ))
-        chunk_idx += 1
-        start += step
+        )
+        self.chunk_idx += 1
 
-    logger.info(
-        "Chunked %d chars into %d chunks (size=%d, overlap=%d)",
-        len(full_text), len(chunks), chunk_size, overlap,
-    )
-    return chunks
+        kept: list[_Span] = []
+        if carry and self.overlap:
+            # Repeat trailing sentences of the same article for context
+            first = max(self.article_from, len(self.current) - self.overlap)
+            kept = self.current[first:]
+            while kept and sum(s.tokens for s in kept) + room_for > self.budget:
+                kept = kept[1:]
+            # Never emit the same chunk twice
+            if len(kept) == len(self.current):
+                kept = []
+        self.current = kept
+        self.current_tokens = sum(s.tokens for s in kept)
+        self.article_from = 0
 
+    def _split_oversized(self, span: _Span) -> Iterator[_Span]:
+        """Cut a sentence longer than the budget between words."""
+        text = self._text(span.start, span.end)
+        piece_start: int | None = None
+        piece_end = 0
+        piece_tokens = 0
+        for match in re.finditer(r"\S+", text):
+            word_tokens = estimate_tokens(match.group())
+            if piece_start is not None and piece_tokens + word_tokens > self.budget:
+                yield _Span(span.start + piece_start, span.start + piece_end, piece_tokens)
+                piece_start, piece_tokens = None, 0
+            if word_tokens > self.budget:
+                # A single "word" (e.g. a long number table) cut by characters
+                step = max(len(match.group()) * self.budget // word_tokens, 1)
+                for cut in range(match.start(), match.end(), step):
+                    stop = min(cut + step, match.end())
+                    yield _Span(
+                        span.start + cut, span.start + stop,
+                        estimate_tokens(text[cut:stop]),
+                    )
+                continue
+            if piece_start is None:
+                piece_start = match.start()
+            piece_end = match.end()
+            piece_tokens += word_tokens
+        if piece_start is not None:
+            yield _Span(span.start + piece_start, span.start + piece_end, piece_tokens)
 
-def _pages_for_range(
-    boundaries: list[tuple[int, int]],
-    start: int,
-    end: int,
-) -> set[int]:
-    """Find which page numbers a character range spans."""
-    pages: set[int] = set()
-    for i, (offset, page_num) in enumerate(boundaries):
-        # Next boundary (or end of text)
-        next_offset = boundaries[i + 1][0] if i + 1 < len(boundaries) else float("inf")
-        # Check if this page overlaps with [start, end)
-        if offset < end and next_offset > start:
-            pages.add(page_num)
-    return pages
+    def _text(self, start: int, end: int) -> str:
+        return self.window[start - self.window_start:end - self.window_start]
+
+    def _trim_window(self) -> None:
+        keep_from = self.total
+        if self.current:
+            keep_from = self.current[0].start
+        if self.article:
+            keep_from = min(keep_from, self.article[0].start)
+        self.window = self.window[keep_from - self.window_start:]
+        self.window_start = keep_from
+
+
+def _split_sentences(text: str, offset: int) -> Iterator[tuple[_Span, bool]]:
+    """
+    Split one page into sentences, in document offsets.
+
+    Yields (span, opens_article) where opens_article marks a sentence that
+    starts with an article heading. Whitespace around sentences is dropped.
+    """
+    headings = {m.start(1) for m in _ARTICLE_HEADING.finditer(text)}
+    cuts = sorted(headings.union(m.end() for m in _SENTENCE_END.finditer(text)))
+    prev = 0
+    for cut in [*cuts, len(text)]:
+        segment = text[prev:cut]
+        stripped = segment.strip()
+        if stripped:
+            start = prev + len(segment) - len(segment.lstrip())
+            yield (
+                _Span(offset + start, offset + start + len(stripped), estimate_tokens(stripped)),
+                start in headings,
+            )
+        prev = cut
@@ -0,0 +1,48 @@
+"""
+Process-wide Gemini client.
+
+A genai.Client owns HTTP connection pools for its sync and async APIs.
+Building one per upload or per call throws those pools away and pays for
+new TLS handshakes every time, so everything that talks to Gemini without
+being handed a client shares the one returned by `get_client()`.
+
+The client reads GOOGLE_API_KEY (or the Vertex AI settings) from the
+environment when it is first created.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+
+from google import genai
+
+logger = logging.getLogger(__name__)
+
+_client: genai.Client | None = None
+_lock = threading.Lock()
+
+
+def get_client() -> genai.Client:
+    """Return the process-wide genai.Client, creating it on first use."""
+    global _client
+    if _client is None:
+        # Also called from executor threads; only one client may be built
+        with _lock:
+            if _client is None:
+                _client = genai.Client()
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client's connection pools (e.g. on shutdown)."""
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is None:
+        return
+    try:
+        await client.aio.aclose()
+        client.close()
+    except Exception:
+        logger.warning("Closing the Gemini client failed", exc_info=True)
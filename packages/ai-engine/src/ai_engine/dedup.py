@@ -0,0 +1,241 @@
+"""
+Near-duplicate chunk detection for ingestion.
+
+Regulations repeat a lot of text verbatim or almost verbatim: letterheads,
+the definitions article copied into many proclamations, recurring closing
+formulas. Embedding and indexing every copy costs quota and index space,
+and fills top-k results with the same passage.
+
+Each new chunk gets a MinHash signature over its character shingles; the
+fraction of equal signature values estimates the Jaccard similarity of
+two chunks' shingle sets. Signatures are split into LSH bands, and the
+hashed bands are stored with the chunk (`document_chunks.lsh_bands`, GIN
+indexed), so candidates sharing a band are found across the whole corpus
+with one indexed query per batch. A candidate whose estimated similarity
+reaches the threshold becomes the chunk's canonical chunk:
+
+- the chunk row is still stored (with its text, pages and offsets), but
+  without an embedding and with `canonical_chunk_id` pointing at the
+  canonical chunk, so it is neither embedded nor in the vector index
+- if the canonical chunk is deleted later, its duplicates inherit its
+  embedding and become canonical themselves (a trigger, see migration
+  0009), so no passage disappears from retrieval
+
+Duplicates are linked to canonical chunks only, never to other duplicates.
+
+Environment variables:
+    NEAR_DUP_THRESHOLD  — estimated Jaccard similarity from which a chunk
+                          is linked instead of embedded (default: 0.9;
+                          0 disables near-duplicate detection)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import uuid
+import zlib
+from collections.abc import Iterable
+from typing import NamedTuple
+
+import numpy as np
+from database.models.document import DocumentChunk
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai_engine.executor import run_cpu_bound
+
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))
+
+NUM_PERM = 128
+SHINGLE_SIZE = 5  # characters; about one Ge'ez word
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Signatures are stored, so the permutations must never change: fixed seed.
+# a, b < 2**31 and shingle hashes < 2**32 keep a*x + b within uint64.
+_rng = np.random.default_rng(20261018)
+_PERM_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Fingerprint(NamedTuple):
+    """Identity and near-duplicate link of a chunk about to be stored."""
+    id: uuid.UUID
+    minhash: bytes | None  # None if near-duplicate detection is disabled
+    lsh_bands: list[int] | None
+    canonical_id: uuid.UUID | None  # set if the chunk is a near-duplicate
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> tuple[int, int]:
+    """
+    Number of bands and rows per band for `num_perm` values.
+
+    Two chunks become candidates with probability 1 - (1 - s**rows)**bands
+    at similarity s, which rises steeply around (1/bands)**(1/rows). The
+    largest band size whose rise is at or below the threshold is chosen,
+    so chunks at the threshold are almost always found while dissimilar
+    ones rarely cost a comparison.
+    """
+    for rows in sorted((r for r in range(1, num_perm + 1) if num_perm % r == 0), reverse=True):
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            return bands, rows
+    return num_perm, 1
+
+
+def shingles(text: str) -> np.ndarray:
+    """32-bit hashes of the text's character shingles (case and spacing ignored)."""
+    text = _WHITESPACE.sub(" ", text).strip().casefold()
+    if len(text) <= SHINGLE_SIZE:
+        grams = {text}
+    else:
+        grams = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return np.fromiter(
+        (zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams)
+    )
+
+
+def minhash_signatures(texts: Iterable[str]) -> np.ndarray:
+    """MinHash signatures of the texts, one uint32 row of NUM_PERM values each."""
+    rows = []
+    for text in texts:
+        hashed = shingles(text)
+        values = (_PERM_A[:, None] * hashed[None, :] + _PERM_B[:, None]) % _PRIME
+        rows.append((values & _MAX_HASH).min(axis=1))
+    if not rows:
+        return np.empty((0, NUM_PERM), dtype=np.uint32)
+    return np.asarray(rows, dtype=np.uint32)
+
+
+def band_keys(signature: np.ndarray, bands: int) -> list[int]:
+    """One signed 64-bit key per LSH band (a bigint in PostgreSQL)."""
+    rows = len(signature) // bands
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                signature[band * rows:(band + 1) * rows].tobytes(),
+                digest_size=8,
+                person=band.to_bytes(2, "big"),
+            ).digest(),
+            "big",
+            signed=True,
+        )
+        for band in range(bands)
+    ]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+async def load_canonical_candidates(
+    db: AsyncSession, keys: Iterable[int], exclude_document: uuid.UUID | None = None
+) -> list[tuple[uuid.UUID, bytes, list[int]]]:
+    """
+    Stored canonical chunks sharing at least one LSH band key with `keys`,
+    other than those of `exclude_document`.
+    """
+    keys = list(keys)
+    if not keys:
+        return []
+    query = select(DocumentChunk.id, DocumentChunk.minhash, DocumentChunk.lsh_bands).where(
+        DocumentChunk.lsh_bands.overlap(keys),
+        DocumentChunk.canonical_chunk_id.is_(None),
+        DocumentChunk.embedding.is_not(None),
+    )
+    if exclude_document is not None:
+        query = query.where(DocumentChunk.document_id != exclude_document)
+    result = await db.execute(query)
+    return [tuple(row) for row in result]
+
+
+class NearDuplicateLinker:
+    """
+    Fingerprints the new chunks of one ingestion run and links each
+    near-duplicate to a canonical chunk, stored or from earlier in the run.
+    """
+
+    def __init__(self, threshold: float | None = None):
+        self.threshold = NEAR_DUP_THRESHOLD if threshold is None else threshold
+        self.bands, self.rows = lsh_params(self.threshold) if self.enabled else (0, 0)
+        # Canonical chunks fingerprinted in this run, by band key
+        self._run_index: dict[int, list[tuple[uuid.UUID, np.ndarray]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    async def fingerprint(
+        self, db: AsyncSession, texts: list[str], exclude_document: uuid.UUID | None = None
+    ) -> list[Fingerprint]:
+        """
+        Fingerprints for `texts`, in order. Each text that is not a
+        near-duplicate becomes a canonical candidate for the texts after it.
+        """
+        return await self.link(db, await self.sign(texts), exclude_document)
+
+    async def sign(self, texts: list[str]) -> np.ndarray:
+        """MinHash signatures of `texts` (CPU-bound; needs no database)."""
+        if not self.enabled or not texts:
+            return np.empty((len(texts), 0), dtype=np.uint32)
+        return await run_cpu_bound(minhash_signatures, texts)
+
+    async def link(
+        self,
+        db: AsyncSession,
+        signatures: np.ndarray,
+        exclude_document: uuid.UUID | None = None,
+    ) -> list[Fingerprint]:
+        """
+        Fingerprints for chunks with the given signatures (from `sign`).
+        Stored chunks of `exclude_document` are not candidates: on
+        re-ingestion they are the previous version, and the ones a new chunk
+        resembles without matching exactly are about to be deleted.
+        """
+        if not self.enabled:
+            return [Fingerprint(uuid.uuid4(), None, None, None) for _ in signatures]
+
+        keys = [band_keys(signature, self.bands) for signature in signatures]
+        stored: dict[int, list[tuple[uuid.UUID, np.ndarray]]] = {}
+        for chunk_id, minhash, lsh_bands in await load_canonical_candidates(
+            db, {key for chunk_keys in keys for key in chunk_keys}, exclude_document
+        ):
+            candidate = (chunk_id, np.frombuffer(minhash, dtype=np.uint32))
+            for key in lsh_bands:
+                stored.setdefault(key, []).append(candidate)
+
+        # No awaits from here on: concurrent callers see each other's canonicals
+        fingerprints = []
+        for signature, chunk_keys in zip(signatures, keys):
+            canonical_id = self._best_match(signature, chunk_keys, stored)
+            chunk_id = uuid.uuid4()
+            if canonical_id is None:
+                for key in chunk_keys:
+                    self._run_index.setdefault(key, []).append((chunk_id, signature))
+            fingerprints.append(
+                Fingerprint(chunk_id, signature.tobytes(), chunk_keys, canonical_id)
+            )
+        return fingerprints
+
+    def _best_match(
+        self,
+        signature: np.ndarray,
+        keys: list[int],
+        stored: dict[int, list[tuple[uuid.UUID, np.ndarray]]],
+    ) -> uuid.UUID | None:
+        best_id, best = None, self.threshold
+        seen: set[uuid.UUID] = set()
+        for key in keys:
+            for chunk_id, candidate in (*self._run_index.get(key, ()), *stored.get(key, ())):
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                score = similarity(signature, candidate)
+                if score >= best:
+                    best_id, best = chunk_id, score
+        return best_id
@@ -3,30 +3,94 @@ Embedding generator using Gemini Embedding API.
 
 Uses gemini-embedding-001 with RETRIEVAL_DOCUMENT task type and
 output_dimensionality=1024 to match the existing pgvector schema.
+
+An optional EmbeddingCache is consulted in bulk before batching and filled
+in bulk afterwards, so only texts never embedded before reach the API.
+
+Batches are sent concurrently (bounded by EMBED_MAX_CONCURRENCY) so a full
+knowledge-base rebuild is limited by quota rather than by serial round-trip
+latency. Each batch is paced to the project's embedding quota (see
+ai_engine.ratelimit), and transient failures (429, 5xx, timeouts) are
+retried per batch with jittered exponential backoff; output order always
+matches input order.
+
+Internally all vectors live in one float32 matrix that is normalized in
+place; `as_array=True` returns it directly so ingestion never materializes
+a boxed Python float per dimension.
+
+Environment variables:
+    EMBED_MAX_CONCURRENCY  — embedding batches in flight at once (default: 4)
+    EMBED_MAX_RETRIES      — retries per batch on transient errors (default: 3)
 """
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
 import math
+import os
+from typing import Literal, overload
 
 import numpy as np
 from google import genai
 from google.genai import types
 
+from ai_engine.cache import EmbeddingCache
+from ai_engine.chunker import estimate_tokens
+from ai_engine.clients import get_client
+from ai_engine.executor import run_cpu_bound
+from ai_engine.ratelimit import EMBED, get_quota_limiter
+from ai_engine.retry import retry_transient
+
 logger = logging.getLogger(__name__)
 
 MODEL = "gemini-embedding-001"
 OUTPUT_DIM = 1024
 # Gemini Embedding API allows up to 100 texts per batch
 _MAX_BATCH_SIZE = 100
+_MAX_CONCURRENT_BATCHES = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+_RETRY_BASE_DELAY = 1.0
+
+
+def embedding_cache_key(text: str, task_type: str) -> str:
+    """Cache key for an embedding: hash of text, model, dimension and task type."""
+    return hashlib.sha256(
+        f"{MODEL}\0{OUTPUT_DIM}\0{task_type}\0{text}".encode()
+    ).hexdigest()
+
+
+@overload
+async def embed_texts(
+    texts: list[str],
+    client: genai.Client | None = ...,
+    task_type: str = ...,
+    cache: EmbeddingCache | None = ...,
+    *,
+    as_array: Literal[False] = ...,
+) -> list[list[float]]: ...
+
+
+@overload
+async def embed_texts(
+    texts: list[str],
+    client: genai.Client | None = ...,
+    task_type: str = ...,
+    cache: EmbeddingCache | None = ...,
+    *,
+    as_array: Literal[True],
+) -> np.ndarray: ...
 
 
 async def embed_texts(
     texts: list[str],
     client: genai.Client | None = None,
     task_type: str = "RETRIEVAL_DOCUMENT",
-) -> list[list[float]]:
+    cache: EmbeddingCache | None = None,
+    *,
+    as_array: bool = False,
+) -> list[list[float]] | np.ndarray:
     """
     Generate normalized embeddings for a list of texts.
 
@@ -35,28 +99,119 @@ async def embed_texts(
         client: Optional pre-configured genai.Client.
         task_type: Embedding task type (RETRIEVAL_DOCUMENT for indexing,
                    RETRIEVAL_QUERY for search queries).
+        cache: Optional persistent embedding cache.
+        as_array: Return one contiguous float32 matrix of shape
+                  (len(texts), OUTPUT_DIM) instead of nested lists. Its rows
+                  can be handed to pgvector columns as they are.
 
     Returns:
-        List of 1024-dimensional normalized embedding vectors.
+        1024-dimensional normalized embedding vectors, one per text.
     """
+    matrix = await _embed_matrix(texts, client, task_type, cache)
+    return matrix if as_array else matrix.tolist()
+
+
+async def _embed_matrix(
+    texts: list[str],
+    client: genai.Client | None,
+    task_type: str,
+    cache: EmbeddingCache | None,
+) -> np.ndarray:
+    """Embed texts into a (len(texts), OUTPUT_DIM) float32 matrix."""
     if not texts:
-        return []
+        return np.empty((0, OUTPUT_DIM), dtype=np.float32)
+
+    if cache is None:
+        return await _embed_uncached(texts, client, task_type)
+
+    # Identical texts share a key, so each distinct text is embedded once
+    keys = [embedding_cache_key(text, task_type) for text in texts]
+    unique: dict[str, str] = dict(zip(keys, texts))
+    try:
+        found = await cache.get_many(list(unique))
+    except Exception:
+        logger.warning("Embedding cache lookup failed; embedding all texts", exc_info=True)
+        found = {}
+
+    missing = [key for key in unique if key not in found]
+    if missing:
+        computed = await _embed_uncached(
+            [unique[key] for key in missing], client, task_type
+        )
+        # Row views into `computed`, not copies
+        fresh = dict(zip(missing, computed))
+        try:
+            await cache.set_many(fresh)
+        except Exception:
+            logger.warning("Embedding cache write-back failed", exc_info=True)
+        found.update(fresh)
+
+    logger.info(
+        "Embedding cache: %d/%d distinct texts hit, %d embedded",
+        len(unique) - len(missing), len(unique), len(missing),
+    )
+    matrix = np.empty((len(texts), OUTPUT_DIM), dtype=np.float32)
+    for row, key in enumerate(keys):
+        matrix[row] = found[key]
+    return matrix
+
+
+async def _embed_uncached(
+    texts: list[str],
+    client: genai.Client | None,
+    task_type: str,
+    max_concurrency: int = _MAX_CONCURRENT_BATCHES,
+) -> np.ndarray:
+    """
+    Embed texts via the Gemini Embedding API in batches of _MAX_BATCH_SIZE.
 
+    Up to `max_concurrency` batches are in flight at once; each one writes
+    its normalized rows into its own slice of a single preallocated matrix.
+    If a batch still fails after its retries the error propagates and the
+    remaining batches are cancelled.
+    """
     if client is None:
-        client = genai.Client()
+        client = get_client()
 
-    all_embeddings: list[list[float]] = []
     total_batches = math.ceil(len(texts) / _MAX_BATCH_SIZE)
+    semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+    matrix = np.empty((len(texts), OUTPUT_DIM), dtype=np.float32)
 
-    for batch_idx in range(total_batches):
+    async def _run(batch_idx: int) -> None:
         start = batch_idx * _MAX_BATCH_SIZE
-        end = min(start + _MAX_BATCH_SIZE, len(texts))
-        batch = texts[start:end]
-
-        logger.debug(
-            "Embedding batch %d/%d (%d texts)", batch_idx + 1, total_batches, len(batch)
-        )
+        batch = texts[start:start + _MAX_BATCH_SIZE]
+        async with semaphore:
+            logger.debug(
+                "Embedding batch %d/%d (%d texts)", batch_idx + 1, total_batches, len(batch)
+            )
+            values = await _embed_batch(client, batch, task_type)
+        await run_cpu_bound(_fill_normalized, matrix[start:start + len(batch)], values)
+
+    tasks = [asyncio.create_task(_run(i)) for i in range(total_batches)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    logger.info("Generated %d embeddings (%d-dim)", len(matrix), OUTPUT_DIM)
+    return matrix
+
+
+async def _embed_batch(
+    client: genai.Client,
+    batch: list[str],
+    task_type: str,
+) -> list[list[float]]:
+    """Embed one batch, retrying transient errors with exponential backoff."""
+    tokens = sum(estimate_tokens(text) for text in batch)
+    limiter = get_quota_limiter()
 
+    async def _call() -> list[list[float]]:
+        # Every attempt counts against the quota
+        await limiter.acquire(EMBED, tokens)
         result = await client.aio.models.embed_content(
             model=MODEL,
             contents=batch,
@@ -65,19 +220,18 @@ async def embed_texts(
                 output_dimensionality=OUTPUT_DIM,
             ),
         )
+        return [emb.values for emb in result.embeddings]
 
-        for emb in result.embeddings:
-            normalized = _normalize(emb.values)
-            all_embeddings.append(normalized)
+    return await retry_transient(
+        _call, retries=_MAX_RETRIES, base_delay=_RETRY_BASE_DELAY, what="Embedding batch"
+    )
 
-    logger.info("Generated %d embeddings (%d-dim)", len(all_embeddings), OUTPUT_DIM)
-    return all_embeddings
 
-
-def _normalize(vec: list[float]) -> list[float]:
-    """L2-normalize an embedding vector (per Google's recommendation for sub-3072 dims)."""
-    arr = np.array(vec, dtype=np.float64)
-    norm = np.linalg.norm(arr)
-    if norm > 0:
-        arr = arr / norm
-    return arr.tolist()
+def _fill_normalized(out: np.ndarray, vectors: list[list[float]]) -> None:
+    """
+    Write L2-normalized vectors into `out` in one vectorized pass
+    (per Google's recommendation for sub-3072 dims).
+    """
+    out[:] = vectors
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
@@ -0,0 +1,56 @@
+"""
+Executor for CPU-bound ingestion work.
+
+PDF parsing and page rendering (pypdf), chunking and vector normalization
+are synchronous. Running them directly in a coroutine blocks the event loop,
+stalling every other request on the same API worker while a large PDF is
+processed. `run_cpu_bound` hands such work to a shared thread pool instead.
+
+A thread pool (rather than a process pool) is used because the pypdf
+reader is shared across calls and cannot be pickled to another process.
+The loop thread still gets the GIL back every switch interval, so request
+latency stays flat while ingestion runs.
+
+Environment variables:
+    INGEST_CPU_WORKERS  — size of the pool (default: 2)
+"""
+
+import asyncio
+import functools
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+T = TypeVar("T")
+
+_CPU_WORKERS = int(os.getenv("INGEST_CPU_WORKERS", "2"))
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide ingestion executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(_CPU_WORKERS, 1),
+            thread_name_prefix="ingest-cpu",
+        )
+    return _executor
+
+
+async def run_cpu_bound(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a synchronous, CPU-bound callable without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown_executor() -> None:
+    """Shut the executor down (e.g. on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
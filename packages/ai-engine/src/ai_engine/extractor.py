@@ -3,21 +3,133 @@ PDF text extraction using Gemini 2.0 Flash.
 
 Sends PDF pages to gemini-2.0-flash to extract text, handling both
 digitally-born PDFs and scanned/OCR documents natively.
+
+Pages whose embedded text layer is complete are read locally with pypdf
+and never sent to Gemini. Only scanned or image-only pages, and pages whose
+text layer is garbled (e.g. broken Ge'ez glyph mapping), go remote.
+
+Pages that do go remote can be looked up in a content-addressed PageCache
+first, keyed by a hash of what the page renders plus the extraction
+prompt/model version, so unchanged pages of a revised document are free.
+
+Two request modes are supported:
+- single-page: every page is its own request (most robust).
+- multi-page: a range of pages is sent in one request and the response is
+  split back into pages on explicit delimiters. If the split does not come
+  back clean, the range falls back to single-page requests.
+
+Requests are paced to the project's generation quota (see
+ai_engine.ratelimit). Transient Gemini errors (429, 5xx, timeouts) are
+retried per request with jittered exponential backoff; a failed multi-page
+request is retried page by page.
+Pages that still fail come back empty with source SOURCE_FAILED. Every
+page is written to the cache as soon as it is extracted, so an interrupted
+or failed ingestion resumes where it left off: on the next attempt only
+the pages that never made it are sent again.
+
+The PDF may be given as bytes or as a file path. A path is memory-mapped
+and parsed in place, so the file is never copied onto the heap; pypdf only
+touches the objects it needs and the OS pages them in on demand.
 """
 
+import asyncio
+import contextlib
+import functools
+import hashlib
 import io
 import logging
+import mmap
+import os
+import re
+import unicodedata
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+)
 from dataclasses import dataclass
+from typing import BinaryIO
 
 from google import genai
 from google.genai import types
-from pypdf import PdfReader, PdfWriter
+from pypdf import PageObject, PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    PdfObject,
+    StreamObject,
+)
+
+from ai_engine.cache import PageCache
+from ai_engine.clients import get_client
+from ai_engine.executor import run_cpu_bound
+from ai_engine.ratelimit import GENERATE, get_quota_limiter
+from ai_engine.retry import retry_transient
 
 logger = logging.getLogger(__name__)
 
-# Gemini Flash handles up to ~100 pages per request comfortably,
-# but we batch in groups of 10 for reliability and rate-limit safety.
-_PAGES_PER_BATCH = 10
+# Raw PDF bytes, or the path of a PDF file
+PdfSource = bytes | str | os.PathLike[str]
+
+EXTRACTION_MODEL = "gemini-2.0-flash"
+
+# Maximum number of requests in flight at once. Pages are sent
+# concurrently up to this limit for throughput while staying rate-limit safe.
+_MAX_CONCURRENT_PAGES = int(os.getenv("EXTRACT_MAX_CONCURRENCY", "10"))
+# Pages sent per Gemini request. 1 = one request per page; larger values
+# cut request count on bulk uploads that are limited by requests per minute.
+_PAGES_PER_REQUEST = int(os.getenv("EXTRACT_PAGES_PER_REQUEST", "1"))
+# Read digitally-born pages from the PDF text layer instead of calling Gemini.
+_USE_TEXT_LAYER = os.getenv("EXTRACT_USE_TEXT_LAYER", "true").lower() == "true"
+# Retries per request on transient errors
+_MAX_RETRIES = int(os.getenv("EXTRACT_MAX_RETRIES", "3"))
+_RETRY_BASE_DELAY = 2.0
+# Tokens reserved against the generation quota per page (PDF page input
+# plus extracted text); corrected with the reported usage afterwards
+_ESTIMATED_TOKENS_PER_PAGE = 1500
+
+# Text-layer classifier thresholds.
+# A page with images and less text than this is treated as scanned.
+_MIN_TEXT_LAYER_CHARS = 40
+# Share of non-whitespace chars that may be unmappable glyphs before the
+# text layer is considered broken (PUA code points, U+FFFD, control chars).
+_MAX_BAD_GLYPH_RATIO = 0.02
+# Minimum share of letters/digits among non-whitespace, non-punctuation chars.
+_MIN_ALNUM_RATIO = 0.6
+
+SOURCE_TEXT_LAYER = "text_layer"
+SOURCE_CACHE = "cache"
+SOURCE_GEMINI = "gemini"
+SOURCE_FAILED = "failed"
+
+_SINGLE_PAGE_PROMPT = (
+    "Extract ALL text from this document page exactly as written. "
+    "Preserve the original language (Amharic or English). "
+    "Return ONLY the extracted text, no commentary or formatting."
+)
+_MULTI_PAGE_PROMPT = (
+    "Extract ALL text from each page of this {count}-page document exactly as written. "
+    "Preserve the original language (Amharic or English). "
+    "Before the text of every page, output a line containing only "
+    "'=== PAGE n ===', where n is the page's position in this document (1 to {count}). "
+    "Output a delimiter for every page, even if the page is blank. "
+    "Return ONLY the delimiters and the extracted text, no commentary or formatting."
+)
+_PAGE_DELIMITER = re.compile(r"^[ \t]*=== PAGE (\d+) ===[ \t]*$", re.MULTILINE)
+
+# Changes whenever the model or a prompt changes, invalidating cached pages
+EXTRACTOR_VERSION = hashlib.sha256(
+    "\0".join((EXTRACTION_MODEL, _SINGLE_PAGE_PROMPT, _MULTI_PAGE_PROMPT)).encode()
+).hexdigest()[:16]
+
+# Page entries that determine what a page renders to
+_FINGERPRINT_KEYS = ("/Contents", "/Resources", "/MediaBox", "/CropBox", "/Rotate")
+# Back-references and stream encoding details that do not change the content
+_FINGERPRINT_SKIP = frozenset({"/Parent", "/P", "/Length", "/Filter", "/DecodeParms"})
 
 
 @dataclass
@@ -25,56 +137,462 @@ class PageText:
     """Extracted text from a single PDF page."""
     page_number: int  # 1-indexed
     text: str
+    # SOURCE_TEXT_LAYER, SOURCE_CACHE, SOURCE_GEMINI or SOURCE_FAILED
+    source: str = SOURCE_GEMINI
+
 
+class PageExtractionError(RuntimeError):
+    """Some pages could not be extracted even after retries."""
 
-def _split_pdf_pages(pdf_bytes: bytes) -> list[bytes]:
-    """Split a PDF into individual single-page PDFs (as bytes)."""
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    page_pdfs: list[bytes] = []
-    for page in reader.pages:
-        writer = PdfWriter()
-        writer.add_page(page)
-        buf = io.BytesIO()
-        writer.write(buf)
-        page_pdfs.append(buf.getvalue())
-    return page_pdfs
+    def __init__(self, page_numbers: Sequence[int]):
+        self.page_numbers = list(page_numbers)
+        super().__init__(f"Text extraction failed for pages {self.page_numbers}")
 
 
-async def extract_text(pdf_bytes: bytes, client: genai.Client | None = None) -> list[PageText]:
+def _page_fingerprint(page: PageObject) -> str:
     """
-    Extract text from every page of a PDF using Gemini Flash.
+    Hash what a page renders to, independent of the file it came from.
+
+    Object numbers and the page tree differ between two uploads of a revised
+    document, so this walks the page's content streams and resources (fonts,
+    images, ...) by value instead of hashing the PDF bytes.
+    """
+    digest = hashlib.sha256()
+    seen: set[tuple[int, int]] = set()
+
+    def _feed(obj: PdfObject) -> None:
+        if isinstance(obj, IndirectObject):
+            ref = (obj.idnum, obj.generation)
+            if ref in seen:
+                digest.update(b"@")  # already hashed (shared or cyclic ref)
+                return
+            seen.add(ref)
+            obj = obj.get_object()
+
+        if isinstance(obj, DictionaryObject):
+            digest.update(b"<<")
+            for key in sorted(obj.keys()):
+                if key not in _FINGERPRINT_SKIP:
+                    digest.update(key.encode())
+                    _feed(obj.raw_get(key))
+            digest.update(b">>")
+            if isinstance(obj, StreamObject):
+                try:
+                    data = obj.get_data()
+                except Exception:
+                    data = obj._data
+                digest.update(b"stream%d:" % len(data))
+                digest.update(data)
+        elif isinstance(obj, ArrayObject):
+            digest.update(b"[")
+            for item in obj:
+                _feed(item)
+            digest.update(b"]")
+        else:
+            digest.update(repr(obj).encode())
+        digest.update(b";")
+
+    for key in _FINGERPRINT_KEYS:
+        if key in page:
+            digest.update(key.encode())
+            _feed(page.raw_get(key))
+    return digest.hexdigest()
+
+
+def page_cache_key(fingerprint: str) -> str:
+    """Cache key for a page: its content fingerprint plus the extractor version."""
+    return hashlib.sha256(f"{EXTRACTOR_VERSION}:{fingerprint}".encode()).hexdigest()
+
+
+def _is_bad_glyph(char: str) -> bool:
+    """True for code points a correct ToUnicode mapping never produces."""
+    if char == "\ufffd":
+        return True
+    category = unicodedata.category(char)
+    # Co = private use (unmapped Ge'ez fonts land here), Cc = control chars
+    return category == "Co" or (category == "Cc" and char not in "\n\r\t")
+
+
+def _page_has_images(page: PageObject) -> bool:
+    """True if the page draws any image or form XObject."""
+    try:
+        xobjects = page.get("/Resources", {}).get("/XObject", {})
+        return any(
+            xobj.get_object().get("/Subtype") in ("/Image", "/Form")
+            for xobj in xobjects.values()
+        )
+    except Exception:
+        return True
+
+
+def _classify_text_layer(page: PageObject) -> str | None:
+    """
+    Return the page's local text layer if it can be trusted, else None.
+
+    The page goes to Gemini (None) when it is scanned or image-only, or when
+    its text layer contains unmappable glyphs or mostly non-letter symbols,
+    the usual symptom of a Ge'ez font without a proper ToUnicode map.
+    """
+    try:
+        text = (page.extract_text() or "").strip()
+    except Exception:
+        logger.debug("Text layer extraction failed", exc_info=True)
+        return None
+
+    has_images = _page_has_images(page)
+    if not text:
+        # Blank page with nothing to OCR is trivially handled locally
+        return None if has_images else ""
+    if has_images and len(text) < _MIN_TEXT_LAYER_CHARS:
+        return None
+
+    visible = [c for c in text if not c.isspace()]
+    bad = sum(1 for c in visible if _is_bad_glyph(c))
+    if bad > _MAX_BAD_GLYPH_RATIO * len(visible):
+        return None
+
+    # Punctuation (incl. Ethiopic ፡ ።) is neutral; symbols/marks are suspicious
+    content = [c for c in visible if not unicodedata.category(c).startswith("P")]
+    alnum = sum(1 for c in content if c.isalnum())
+    if content and alnum < _MIN_ALNUM_RATIO * len(content):
+        return None
+
+    return text
+
+
+def _pages_to_pdf(reader: PdfReader, page_indices: Sequence[int]) -> bytes:
+    """Write the given 0-indexed pages of `reader` into a new PDF (as bytes)."""
+    writer = PdfWriter()
+    for idx in page_indices:
+        writer.add_page(reader.pages[idx])
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+@contextlib.contextmanager
+def _pdf_stream(pdf: PdfSource) -> Iterator[BinaryIO]:
+    """A seekable stream over the PDF; files are memory-mapped, not read."""
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(pdf)
+        return
+    with open(pdf, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+def _open_pdf(stream: BinaryIO) -> PdfReader:
+    """Parse a PDF and its page tree."""
+    reader = PdfReader(stream)
+    _ = len(reader.pages)  # flatten the page tree now, off the event loop
+    return reader
+
+
+def _classify_pages(
+    reader: PdfReader, use_text_layer: bool, with_keys: bool
+) -> tuple[dict[int, str], dict[int, str | None]]:
+    """
+    Split pages into local and remote ones.
+
+    Returns (local texts by page index, cache key or None by remote page index).
+    """
+    local: dict[int, str] = {}
+    remote: dict[int, str | None] = {}
+    for idx, page in enumerate(reader.pages):
+        text = _classify_text_layer(page) if use_text_layer else None
+        if text is not None:
+            local[idx] = text
+        else:
+            remote[idx] = page_cache_key(_page_fingerprint(page)) if with_keys else None
+    return local, remote
+
+
+def _iter_page_groups(
+    page_indices: Iterable[int], pages_per_request: int
+) -> Iterator[list[int]]:
+    """Lazily group 0-indexed pages into lists of up to `pages_per_request`."""
+    group: list[int] = []
+    for idx in page_indices:
+        group.append(idx)
+        if len(group) == pages_per_request:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def _iter_page_pdfs(
+    reader: PdfReader, groups: Iterable[list[int]]
+) -> Iterator[tuple[list[int], bytes]]:
+    """
+    Lazily render each page group as a standalone PDF.
+
+    Nothing is rendered until a consumer asks for the next group, so peak
+    memory is bounded by the groups in flight rather than the document size.
+    """
+    for group in groups:
+        yield group, _pages_to_pdf(reader, group)
+
+
+def _split_page_delimited(text: str, count: int) -> list[str] | None:
+    """
+    Split a multi-page response on its '=== PAGE n ===' delimiters.
+
+    Returns one text per page, or None if the delimiters are not exactly
+    1..count in order (missing, duplicated, or reordered pages).
+    """
+    matches = list(_PAGE_DELIMITER.finditer(text))
+    if [int(m.group(1)) for m in matches] != list(range(1, count + 1)):
+        return None
+
+    texts: list[str] = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        texts.append(text[match.end():end].strip())
+    return texts
+
+
+async def extract_text(
+    pdf: PdfSource,
+    client: genai.Client | None = None,
+    max_concurrency: int = _MAX_CONCURRENT_PAGES,
+    pages_per_request: int = _PAGES_PER_REQUEST,
+    use_text_layer: bool = _USE_TEXT_LAYER,
+    cache: PageCache | None = None,
+    progress: Callable[[int, int], Awaitable[None]] | None = None,
+) -> list[PageText]:
+    """
+    Extract text from every page of a PDF.
+
+    Pages with a usable text layer are read locally. The rest are looked up
+    in `cache` and only cache misses are sent to Gemini Flash, concurrently
+    with at most `max_concurrency` requests in flight. A page that fails to
+    extract yields empty text without affecting the others.
 
     Args:
-        pdf_bytes: Raw bytes of the PDF file.
+        pdf: Raw bytes of the PDF file, or its path (memory-mapped).
         client: Optional pre-configured genai.Client.
+        max_concurrency: Maximum number of requests in flight at once.
+        pages_per_request: Pages sent per request. Values above 1 enable
+                           multi-page mode with per-page demultiplexing.
+        use_text_layer: Try the local text layer before calling Gemini.
+        cache: Optional content-addressed cache of extracted page text.
+        progress: Optional callback awaited with (pages done, total pages)
+                  once local/cached pages are resolved and after every
+                  page extracted remotely.
 
     Returns:
-        List of PageText with 1-indexed page numbers.
+        List of PageText with 1-indexed page numbers, in page order.
+        `source` tells whether a page was read locally, from the cache,
+        or by Gemini, or failed (empty text).
+    """
+    return [
+        page async for page in iter_pages(
+            pdf, client, max_concurrency, pages_per_request,
+            use_text_layer, cache, progress,
+        )
+    ]
+
+
+async def iter_pages(
+    pdf: PdfSource,
+    client: genai.Client | None = None,
+    max_concurrency: int = _MAX_CONCURRENT_PAGES,
+    pages_per_request: int = _PAGES_PER_REQUEST,
+    use_text_layer: bool = _USE_TEXT_LAYER,
+    cache: PageCache | None = None,
+    progress: Callable[[int, int], Awaitable[None]] | None = None,
+) -> AsyncIterator[PageText]:
+    """
+    Like extract_text, but yields each page as soon as it and every page
+    before it are ready, so consumers can start on early pages while later
+    ones are still being extracted. Pages are yielded in page order.
+    """
+    # The mapping stays open until every page has been read
+    with _pdf_stream(pdf) as stream:
+        reader = await run_cpu_bound(_open_pdf, stream)
+        async with contextlib.aclosing(_iter_reader_pages(
+            reader, client, max_concurrency, pages_per_request,
+            use_text_layer, cache, progress,
+        )) as pages:
+            async for page in pages:
+                yield page
+
+
+async def _iter_reader_pages(
+    reader: PdfReader,
+    client: genai.Client | None,
+    max_concurrency: int,
+    pages_per_request: int,
+    use_text_layer: bool,
+    cache: PageCache | None,
+    progress: Callable[[int, int], Awaitable[None]] | None,
+) -> AsyncIterator[PageText]:
+    # pypdf work (text-layer reads, rendering) runs in the CPU executor.
+    # The reader is not thread-safe, so concurrent access holds this lock.
+    reader_lock = asyncio.Lock()
+    total_pages = len(reader.pages)
+    results: list[PageText | None] = [None] * total_pages
+    next_page = 0
+
+    def _ready() -> list[PageText]:
+        """Pages that can be yielded now without breaking page order."""
+        nonlocal next_page
+        ready = []
+        while next_page < total_pages and results[next_page] is not None:
+            ready.append(results[next_page])
+            next_page += 1
+        return ready
+
+    local, remote = await run_cpu_bound(
+        _classify_pages, reader, use_text_layer, cache is not None
+    )
+    for idx, text in local.items():
+        results[idx] = PageText(page_number=idx + 1, text=text, source=SOURCE_TEXT_LAYER)
+
+    if cache is not None and remote:
+        try:
+            cached = await cache.get_many(list(remote.values()))
+        except Exception:
+            logger.warning("Page cache lookup failed; extracting all pages", exc_info=True)
+            cached = {}
+        for idx, key in remote.items():
+            if key in cached:
+                results[idx] = PageText(
+                    page_number=idx + 1, text=cached[key], source=SOURCE_CACHE
+                )
+
+    pending = [idx for idx in remote if results[idx] is None]
+    done = total_pages - len(pending)
+    if progress is not None:
+        await progress(done, total_pages)
+    for page in _ready():
+        yield page
+    if pending:
+        if client is None:
+            client = get_client()
+        groups = _iter_page_groups(pending, max(pages_per_request, 1))
+        page_pdfs = _iter_page_pdfs(reader, groups)
+        async with contextlib.aclosing(_extract_remote(
+            client, reader, reader_lock, page_pdfs, max(max_concurrency, 1)
+        )) as extracted:
+            async for page in extracted:
+                results[page.page_number - 1] = page
+                if cache is not None and page.source != SOURCE_FAILED:
+                    # Checkpoint the page right away, not when the document is done
+                    await _cache_page(cache, remote[page.page_number - 1], page.text)
+                done += 1
+                if progress is not None:
+                    await progress(done, total_pages)
+                for ready in _ready():
+                    yield ready
+
+    failed = sum(1 for idx in pending if results[idx].source == SOURCE_FAILED)
+    logger.info(
+        "Extracted text from %d pages: %d from text layer, %d from cache, "
+        "%d via Gemini Flash, %d failed (concurrency=%d, pages_per_request=%d)",
+        total_pages, len(local), len(remote) - len(pending), len(pending) - failed,
+        failed, max_concurrency, pages_per_request,
+    )
+
+
+async def _cache_page(cache: PageCache, key: str, text: str) -> None:
+    try:
+        await cache.set_many({key: text})
+    except Exception:
+        logger.warning("Page cache write-back failed", exc_info=True)
+
+
+async def _extract_remote(
+    client: genai.Client,
+    reader: PdfReader,
+    reader_lock: asyncio.Lock,
+    page_pdfs: Iterator[tuple[list[int], bytes]],
+    max_concurrency: int,
+) -> AsyncIterator[PageText]:
     """
-    if client is None:
-        client = genai.Client()
+    Extract rendered page groups via Gemini, one request per group.
 
-    page_pdfs = _split_pdf_pages(pdf_bytes)
-    total_pages = len(page_pdfs)
-    logger.info("Extracting text from %d pages via Gemini Flash", total_pages)
+    `max_concurrency` workers pull from the shared lazy `page_pdfs`
+    iterator, so at most that many groups are rendered and held at once.
+    Pages are yielded as they complete, not in page order.
+    """
+    done: asyncio.Queue[PageText | None] = asyncio.Queue()
 
-    results: list[PageText] = []
+    async def _single(page_pdf: bytes, page_num: int) -> PageText:
+        try:
+            text = await retry_transient(
+                functools.partial(_extract_single_page, client, page_pdf, page_num),
+                retries=_MAX_RETRIES, base_delay=_RETRY_BASE_DELAY,
+                what=f"Extraction of page {page_num}",
+            )
+        except Exception:
+            logger.exception("Failed to extract text from page %d", page_num)
+            return PageText(page_number=page_num, text="", source=SOURCE_FAILED)
+        return PageText(page_number=page_num, text=text)
 
-    # Process pages in batches
-    for batch_start in range(0, total_pages, _PAGES_PER_BATCH):
-        batch_end = min(batch_start + _PAGES_PER_BATCH, total_pages)
-        batch_pages = page_pdfs[batch_start:batch_end]
+    async def _extract_page(page_idx: int) -> PageText:
+        async with reader_lock:
+            page_pdf = await run_cpu_bound(_pages_to_pdf, reader, [page_idx])
+        return await _single(page_pdf, page_idx + 1)
 
-        for i, page_pdf in enumerate(batch_pages):
-            page_num = batch_start + i + 1  # 1-indexed
-            try:
-                text = await _extract_single_page(client, page_pdf, page_num)
-                results.append(PageText(page_number=page_num, text=text))
-            except Exception:
-                logger.exception("Failed to extract text from page %d", page_num)
-                results.append(PageText(page_number=page_num, text=""))
+    async def _extract_group(group: list[int], group_pdf: bytes) -> list[PageText]:
+        page_nums = [idx + 1 for idx in group]
+        if len(group) == 1:
+            return [await _single(group_pdf, page_nums[0])]
+        try:
+            texts = await retry_transient(
+                functools.partial(_extract_page_range, client, group_pdf, page_nums),
+                retries=_MAX_RETRIES, base_delay=_RETRY_BASE_DELAY,
+                what=f"Extraction of pages {page_nums}",
+            )
+        except Exception:
+            logger.exception(
+                "Failed to extract text from pages %s; retrying them one by one", page_nums
+            )
+        else:
+            if texts is not None:
+                return [
+                    PageText(page_number=num, text=text)
+                    for num, text in zip(page_nums, texts)
+                ]
+            logger.warning(
+                "Pages %s did not split cleanly; falling back to single pages", page_nums
+            )
+
+        del group_pdf
+        return [await _extract_page(idx) for idx in group]
+
+    async def _worker() -> None:
+        while True:
+            async with reader_lock:
+                item = await run_cpu_bound(next, page_pdfs, None)
+            if item is None:
+                return
+            group, group_pdf = item
+            del item
+            for page in await _extract_group(group, group_pdf):
+                await done.put(page)
 
-    return results
+    async def _run_workers() -> None:
+        workers = [asyncio.create_task(_worker()) for _ in range(max_concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        finally:
+            await done.put(None)
+
+    runner = asyncio.create_task(_run_workers())
+    try:
+        while (page := await done.get()) is not None:
+            yield page
+        await runner
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
 
 
 async def _extract_single_page(
@@ -83,26 +601,54 @@ async def _extract_single_page(
     page_num: int,
 ) -> str:
     """Send a single PDF page to Gemini Flash for text extraction."""
+    text = await _generate(client, page_pdf, _SINGLE_PAGE_PROMPT, pages=1)
+    logger.debug("Page %d: extracted %d chars", page_num, len(text))
+    return text.strip()
+
+
+async def _extract_page_range(
+    client: genai.Client,
+    group_pdf: bytes,
+    page_nums: list[int],
+) -> list[str] | None:
+    """
+    Send a multi-page PDF to Gemini Flash and split the response per page.
+
+    Returns one text per page, or None if the response did not split cleanly.
+    """
+    count = len(page_nums)
+    text = await _generate(
+        client, group_pdf, _MULTI_PAGE_PROMPT.format(count=count), pages=count
+    )
+    texts = _split_page_delimited(text, count)
+    if texts is not None:
+        logger.debug(
+            "Pages %s: extracted %d chars", page_nums, sum(len(t) for t in texts)
+        )
+    return texts
+
+
+async def _generate(client: genai.Client, pdf: bytes, prompt: str, pages: int) -> str:
+    """
+    One extraction request within the generation quota. The token estimate
+    reserved up front is corrected with the usage the API reports.
+    """
+    limiter = get_quota_limiter()
+    estimate = pages * _ESTIMATED_TOKENS_PER_PAGE
+    await limiter.acquire(GENERATE, estimate)
     response = await client.aio.models.generate_content(
-        model="gemini-2.0-flash",
+        model=EXTRACTION_MODEL,
         contents=[
             types.Content(
                 parts=[
-                    types.Part.from_bytes(
-                        data=page_pdf,
-                        mime_type="application/pdf",
-                    ),
-                    types.Part.from_text(
-                        text=(
-                            "Extract ALL text from this document page exactly as written. "
-                            "Preserve the original language (Amharic or English). "
-                            "Return ONLY the extracted text, no commentary or formatting."
-                        )
-                    ),
+                    types.Part.from_bytes(data=pdf, mime_type="application/pdf"),
+                    types.Part.from_text(text=prompt),
                 ]
             )
         ],
     )
-    text = response.text or ""
-    logger.debug("Page %d: extracted %d chars", page_num, len(text))
-    return text.strip()
+    usage = getattr(response, "usage_metadata", None)
+    used = getattr(usage, "total_token_count", None)
+    if used:
+        await limiter.settle(GENERATE, used - estimate)
+    return response.text or ""
@@ -0,0 +1,121 @@
+"""
+Hybrid retrieval: dense and BM25 search fused with Reciprocal Rank Fusion.
+
+The two legs find different things. Dense search (ai_engine.retrieval)
+matches meaning across wording and languages; BM25 (ai_engine.bm25)
+matches exact legal terms and article or proclamation numbers. Their
+rankings are fused with Reciprocal Rank Fusion:
+
+    score(chunk) = sum over legs of 1 / (RETRIEVAL_RRF_K + rank in that leg)
+
+RRF uses ranks only, so cosine similarities and BM25 scores never have to
+be put on one scale, and a chunk ranked well by both legs beats a chunk
+ranked first by one. A chunk found by both legs appears once.
+
+The dense leg runs under a timeout. If it times out or fails (the
+embedding call is the usual suspect) it contributes nothing, and the
+answer is built from BM25 alone instead of stalling the chat response. It
+uses its own session, so cancelling it never disturbs the caller's
+transaction. BM25 answers from process memory in well under a
+millisecond, so it runs directly on the event loop, without a timeout; a
+failure there likewise leaves the dense hits alone. BM25 hits carry ids
+only; the ones the dense leg did not return are loaded in one query after
+fusion.
+
+Environment variables:
+    RETRIEVAL_CANDIDATES      — hits taken from each leg before fusion (default: 30)
+    RETRIEVAL_RRF_K           — RRF rank constant (default: 60)
+    RETRIEVAL_DENSE_TIMEOUT   — seconds for the dense leg, embedding included (default: 3)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from collections.abc import Awaitable, Sequence
+from dataclasses import replace
+
+from google import genai
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ai_engine.bm25 import BM25Index, SparseHit, get_bm25_index
+from ai_engine.retrieval import TOP_K, RetrievedChunk, dense_search, fetch_chunks
+
+logger = logging.getLogger(__name__)
+
+CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "30"))
+RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+DENSE_TIMEOUT = float(os.getenv("RETRIEVAL_DENSE_TIMEOUT", "3"))
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[uuid.UUID]], k: int = RRF_K
+) -> list[tuple[uuid.UUID, float]]:
+    """
+    Fuse rankings (ids, best first) into one, best first. Ties keep the
+    order in which ids were first seen, leg by leg.
+    """
+    scores: dict[uuid.UUID, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)
+
+
+async def hybrid_search(
+    session_factory: async_sessionmaker[AsyncSession],
+    query: str,
+    top_k: int = TOP_K,
+    *,
+    index: BM25Index | None = None,
+    client: genai.Client | None = None,
+    candidates: int = CANDIDATES,
+    dense_timeout: float = DENSE_TIMEOUT,
+) -> list[RetrievedChunk]:
+    """
+    The `top_k` chunks for `query` by fused dense and BM25 rank, best first.
+    Empty if both legs fail.
+    """
+    if top_k <= 0:
+        return []
+    index = index or get_bm25_index()
+    depth = max(candidates, top_k)
+
+    async def dense() -> list[RetrievedChunk]:
+        async with session_factory() as db:
+            return await dense_search(db, query, depth, client=client)
+
+    sparse_hits: list[SparseHit] = []
+    try:
+        sparse_hits = index.search(query, depth)
+    except Exception:
+        logger.warning("sparse retrieval failed; using the dense leg", exc_info=True)
+    dense_hits = await _dense_leg(dense(), dense_timeout)
+    fused = reciprocal_rank_fusion(
+        [[hit.chunk_id for hit in dense_hits], [hit.chunk_id for hit in sparse_hits]]
+    )[:top_k]
+
+    chunks = {hit.chunk_id: hit for hit in dense_hits}
+    missing = [chunk_id for chunk_id, _ in fused if chunk_id not in chunks]
+    if missing:
+        async with session_factory() as db:
+            chunks.update(await fetch_chunks(db, missing))
+    # Sparse hits deleted since the last BM25 refresh are dropped here
+    return [
+        replace(chunks[chunk_id], score=score) for chunk_id, score in fused if chunk_id in chunks
+    ]
+
+
+async def _dense_leg(
+    search: Awaitable[list[RetrievedChunk]], timeout: float
+) -> list[RetrievedChunk]:
+    """Run the dense leg; a timeout or failure yields no hits."""
+    try:
+        return await asyncio.wait_for(search, timeout)
+    except TimeoutError:
+        logger.warning("dense retrieval timed out after %.2fs; using BM25 only", timeout)
+    except Exception:
+        logger.warning("dense retrieval failed; using BM25 only", exc_info=True)
+    return []
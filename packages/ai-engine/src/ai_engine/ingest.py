@@ -3,30 +3,154 @@ Document ingestion orchestrator.
 
 Single entry point for both admin upload and future scraper.
 Pipeline: extract text (Gemini Flash) → chunk → embed → store in DB.
+
+The four stages run concurrently, connected by bounded queues:
+
+    extract ──pages──▶ chunk ──chunk batches──▶ embed (× N) ──▶ store
+
+Pages leave the extractor in page order as soon as they are ready, full
+batches of chunks are embedded while later pages are still being extracted,
+and embedded batches are written while later ones are still being embedded.
+A full queue blocks its producer, so memory stays bounded and a document
+takes roughly as long as its slowest stage rather than the sum of all four.
+
+Paid work is checkpointed as it completes: each extracted page goes to the
+page cache and each embedded batch to the embedding cache. Pages that fail
+even after their own retries do not stop the run; the remaining pages are
+still extracted, embedded and cached, and PageExtractionError is raised at
+the end. Retrying the document (see ai_engine.worker) then resumes from the
+checkpoints and only pays for the pages and chunks that are missing.
+
+Ingesting into a document that already has chunks (a new version of an
+amended file) is incremental. Chunks are matched to the stored ones by the
+SHA-256 of their content: matches keep their row, embedding and
+chunk_index and only get their metadata refreshed, new chunks are embedded
+and inserted, and stored chunks left unmatched are deleted at the end.
+Everything happens in the caller's transaction, so readers switch from the
+old version to the new one at commit. Writes, Gemini calls and embedding
+index churn all scale with the size of the amendment rather than the
+document. A first ingestion is simply the case with nothing stored.
+
+New chunks that nearly duplicate a stored chunk of another document, or one
+earlier in the same run, are linked to it instead of being embedded (see
+ai_engine.dedup). The document's own stored chunks are not candidates: an
+amended chunk would otherwise be linked to the version it replaces.
+
+The extracted text of every page is stored in `document_pages`, so chunks
+can later be rebuilt with different chunking settings without Gemini (see
+ai_engine.rechunk).
+
+Environment variables:
+    INGEST_STAGE_BUFFER  — items buffered between two stages (default: 4)
 """
 
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
+import contextlib
 import logging
+import os
+import threading
 import uuid
+from collections.abc import Awaitable, Coroutine, Iterator
+from dataclasses import dataclass
+from typing import Any, NamedTuple, TypeVar
 
+import numpy as np
+from database.bulk import (
+    ChunkRow,
+    PageRow,
+    bulk_insert_chunks,
+    bulk_insert_pages,
+    chunk_content_hash,
+    delete_chunks,
+    update_chunk_metadata,
+)
 from database.models.document import DocumentChunk
 from google import genai
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ai_engine.chunker import chunk_pages
-from ai_engine.embedder import embed_texts
-from ai_engine.extractor import extract_text
+from ai_engine.cache import EmbeddingCache, PageCache
+from ai_engine.chunker import Chunk, ChunkingStrategy, get_chunking_strategy
+from ai_engine.clients import get_client
+from ai_engine.dedup import Fingerprint, NearDuplicateLinker
+from ai_engine.embedder import _MAX_BATCH_SIZE, _MAX_CONCURRENT_BATCHES, embed_texts
+from ai_engine.extractor import (
+    SOURCE_CACHE,
+    SOURCE_FAILED,
+    SOURCE_TEXT_LAYER,
+    PageExtractionError,
+    PageText,
+    PdfSource,
+    iter_pages,
+)
+from ai_engine.jobs import ProgressCallback
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+_STAGE_BUFFER = int(os.getenv("INGEST_STAGE_BUFFER", "4"))
+# How often the chunker thread checks whether the pipeline was torn down
+_THREAD_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class IngestionResult:
+    """Summary of a completed ingestion run."""
+    chunk_count: int
+    pages_total: int
+    pages_local: int   # read from the PDF text layer
+    pages_cached: int  # reused from the page extraction cache
+    pages_remote: int  # extracted via Gemini Flash
+    embeddings_cached: int = 0  # chunk embeddings reused from the cache
+    chunks_reused: int = 0   # unchanged chunks kept from the previous version
+    chunks_deleted: int = 0  # chunks of the previous version no longer present
+    chunks_linked: int = 0   # near-duplicates linked to a canonical chunk, not embedded
+
+
+class StoredChunk(NamedTuple):
+    """A chunk already stored for the document being ingested."""
+    id: uuid.UUID
+    chunk_index: int
+    metadata: dict | None
+
+
+async def load_stored_chunks(
+    db: AsyncSession, document_id: uuid.UUID
+) -> dict[str, list[StoredChunk]]:
+    """Stored chunks of a document grouped by content hash, in chunk_index order."""
+    result = await db.execute(
+        select(
+            DocumentChunk.id,
+            DocumentChunk.chunk_index,
+            DocumentChunk.content_hash,
+            DocumentChunk.chunk_metadata,
+        )
+        .where(DocumentChunk.document_id == document_id)
+        .order_by(DocumentChunk.chunk_index)
+    )
+    stored: dict[str, list[StoredChunk]] = {}
+    for chunk_id, chunk_index, content_hash, metadata in result:
+        stored.setdefault(content_hash, []).append(
+            StoredChunk(chunk_id, chunk_index, metadata)
+        )
+    return stored
+
 
 async def ingest_pdf(
-    pdf_bytes: bytes,
+    pdf: PdfSource,
     document_id: uuid.UUID,
     db: AsyncSession,
     client: genai.Client | None = None,
-) -> int:
+    page_cache: PageCache | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+    chunker: ChunkingStrategy | None = None,
+    progress: ProgressCallback | None = None,
+    near_dup_threshold: float | None = None,
+) -> IngestionResult:
     """
     Process a PDF end-to-end: extract → chunk → embed → store.
 
@@ -34,60 +158,324 @@ async def ingest_pdf(
     Both the admin upload endpoint and a future scraper should call this.
 
     Args:
-        pdf_bytes: Raw bytes of the uploaded PDF.
+        pdf: Raw bytes of the uploaded PDF, or the path of the stored file
+             (memory-mapped rather than read into memory).
         document_id: UUID of the parent Document record (must already exist).
         db: Active async database session.
         client: Optional pre-configured genai.Client.
+        page_cache: Optional cache of previously extracted page text.
+        embedding_cache: Optional cache of previously computed embeddings.
+        chunker: Chunking strategy (default: from CHUNK_STRATEGY).
+        progress: Optional callback awaited with (stage, done, total) as
+                  the extract, chunk, embed and store stages advance. The
+                  embed and store totals grow as chunks are produced.
+        near_dup_threshold: Similarity from which a new chunk is linked to
+                  a canonical chunk instead of embedded (default: from
+                  NEAR_DUP_THRESHOLD; 0 disables).
 
     Returns:
-        Number of chunks created and stored.
+        IngestionResult with the number of chunks the document now has, how
+        many were kept from the previous version or deleted, and how many
+        pages were read locally, reused from the cache, or extracted remotely.
 
     Raises:
+        PageExtractionError: If some pages failed after retries. Everything
+            else has been checkpointed, so retrying is cheap.
         ValueError: If extraction yields no text.
         Exception: Propagated from Gemini API or database.
     """
     if client is None:
-        client = genai.Client()
+        client = get_client()
+    if chunker is None:
+        chunker = get_chunking_strategy()
 
-    # 1. Extract text from PDF pages via Gemini Flash
     logger.info("Starting ingestion for document %s", document_id)
-    pages = await extract_text(pdf_bytes, client=client)
-
-    non_empty_pages = [p for p in pages if p.text.strip()]
-    if not non_empty_pages:
-        raise ValueError("No text could be extracted from the PDF")
-
+    pipeline = _Pipeline(
+        pdf, document_id, db, client, page_cache, embedding_cache, chunker,
+        progress or _no_progress, NearDuplicateLinker(near_dup_threshold),
+    )
+    result = await pipeline.run()
     logger.info(
-        "Extracted text from %d/%d pages", len(non_empty_pages), len(pages)
+        "Stored %d chunks for document %s (%d kept, %d deleted, %d near-duplicates linked)",
+        result.chunk_count, document_id, result.chunks_reused, result.chunks_deleted,
+        result.chunks_linked,
     )
+    return result
 
-    # 2. Chunk the extracted text
-    chunks = chunk_pages(non_empty_pages)
-    if not chunks:
-        raise ValueError("Text chunking produced no chunks")
-
-    logger.info("Created %d chunks", len(chunks))
-
-    # 3. Generate embeddings for all chunks
-    chunk_texts = [c.content for c in chunks]
-    embeddings = await embed_texts(chunk_texts, client=client)
-
-    # 4. Store chunks with embeddings in the database
-    for chunk, embedding in zip(chunks, embeddings):
-        db_chunk = DocumentChunk(
-            id=uuid.uuid4(),
-            document_id=document_id,
-            chunk_index=chunk.index,
-            content=chunk.content,
-            embedding=embedding,
-            chunk_metadata=chunk.metadata,
+
+class _Pipeline:
+    """One ingestion run: the four stages and the queues between them."""
+
+    def __init__(
+        self,
+        pdf: PdfSource,
+        document_id: uuid.UUID,
+        db: AsyncSession,
+        client: genai.Client,
+        page_cache: PageCache | None,
+        embedding_cache: EmbeddingCache | None,
+        chunker: ChunkingStrategy,
+        report: ProgressCallback,
+        linker: NearDuplicateLinker,
+    ):
+        self._pdf = pdf
+        self._document_id = document_id
+        self._db = db
+        self._client = client
+        self._page_cache = page_cache
+        self._embedding_cache = embedding_cache
+        self._chunker = chunker
+        self._report = report
+        self._linker = linker
+        # The session is not safe for concurrent use: the embed workers'
+        # near-duplicate lookups and the store stage take turns
+        self._db_lock = asyncio.Lock()
+
+        # None marks the end of a stream
+        self._pages: asyncio.Queue[PageText | None] = asyncio.Queue(_STAGE_BUFFER)
+        self._batches: asyncio.Queue[list[Chunk] | None] = asyncio.Queue(_STAGE_BUFFER)
+        self._embedded: asyncio.Queue[_EmbeddedBatch | None] = asyncio.Queue(_STAGE_BUFFER)
+
+        # Chunks of the previous version not matched yet, by content hash
+        self._stored: dict[str, list[StoredChunk]] = {}
+        # New chunks are numbered after the stored ones so chunk_index stays unique
+        self._index_base = 0
+
+        self._pages_total = 0
+        self._pages_extracted = 0
+        self._pages_local = 0
+        self._pages_cached = 0
+        self._pages_failed: list[int] = []
+        self._extracted: list[PageText] = []
+        self._pages_chunked = 0
+        self._pages_with_text = 0
+        self._chunks_created = 0
+        self._chunks_embedded = 0
+        self._chunks_stored = 0
+        self._chunks_reused = 0
+        self._chunks_linked = 0
+
+    async def run(self) -> IngestionResult:
+        self._stored = await load_stored_chunks(self._db, self._document_id)
+        self._index_base = 1 + max(
+            (row.chunk_index for rows in self._stored.values() for row in rows),
+            default=-1,
         )
-        db.add(db_chunk)
 
-    await db.flush()
-    logger.info(
-        "Stored %d chunks with embeddings for document %s",
-        len(chunks), document_id,
-    )
+        hits_before = self._embedding_cache.hits if self._embedding_cache else 0
+        await _run_stages(self._extract(), self._chunk(), self._embed(), self._store())
+        embeddings_cached = (
+            self._embedding_cache.hits - hits_before if self._embedding_cache else 0
+        )
+
+        if self._pages_failed:
+            raise PageExtractionError(self._pages_failed)
+        if not self._pages_with_text:
+            raise ValueError("No text could be extracted from the PDF")
+        if not self._chunks_created:
+            raise ValueError("Text chunking produced no chunks")
+
+        chunks_deleted = await delete_chunks(self._db, (
+            row.id for rows in self._stored.values() for row in rows
+        ))
+        await bulk_insert_pages(self._db, self._document_id, (
+            PageRow(page.page_number, page.text, page.source) for page in self._extracted
+        ))
+
+        return IngestionResult(
+            chunk_count=self._chunks_stored,
+            pages_total=self._pages_extracted,
+            pages_local=self._pages_local,
+            pages_cached=self._pages_cached,
+            pages_remote=self._pages_extracted - self._pages_local - self._pages_cached,
+            embeddings_cached=embeddings_cached,
+            chunks_reused=self._chunks_reused,
+            chunks_deleted=chunks_deleted,
+            chunks_linked=self._chunks_linked,
+        )
+
+    async def _extract(self) -> None:
+        async def _progress(done: int, total: int) -> None:
+            self._pages_total = total
+            await self._report("extract", done, total)
+
+        async with contextlib.aclosing(iter_pages(
+            self._pdf, client=self._client, cache=self._page_cache, progress=_progress,
+        )) as pages:
+            async for page in pages:
+                self._pages_extracted += 1
+                self._extracted.append(page)
+                if page.source == SOURCE_TEXT_LAYER:
+                    self._pages_local += 1
+                elif page.source == SOURCE_CACHE:
+                    self._pages_cached += 1
+                elif page.source == SOURCE_FAILED:
+                    self._pages_failed.append(page.page_number)
+                await self._pages.put(page)
+        await self._pages.put(None)
+        logger.info(
+            "Extracted %d pages (%d local, %d cached, %d remote, %d failed)",
+            self._pages_extracted, self._pages_local, self._pages_cached,
+            self._pages_extracted - self._pages_local - self._pages_cached
+            - len(self._pages_failed),
+            len(self._pages_failed),
+        )
+
+    async def _chunk(self) -> None:
+        """
+        Run the (synchronous, lazy) chunking strategy in a thread that pulls
+        pages from and pushes batches to the event loop's queues.
+
+        The thread comes from the default executor rather than the CPU pool:
+        it mostly waits on queues, and holding a CPU-pool thread while
+        waiting for pages would starve the page rendering it waits for.
+        """
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+
+        def _call(coro: Coroutine[Any, Any, T]) -> T:
+            future = asyncio.run_coroutine_threadsafe(coro, loop)
+            while True:
+                try:
+                    return future.result(timeout=_THREAD_POLL_INTERVAL)
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        raise asyncio.CancelledError from None
+
+        def _pages() -> Iterator[PageText]:
+            while (page := _call(self._next_page())) is not None:
+                if page.text.strip():
+                    yield page
+
+        def _run() -> None:
+            batch: list[Chunk] = []
+            for chunk in self._chunker.chunk(_pages()):
+                batch.append(chunk)
+                if len(batch) == _MAX_BATCH_SIZE:
+                    _call(self._put_batch(batch))
+                    batch = []
+            if batch:
+                _call(self._put_batch(batch))
+
+        try:
+            await loop.run_in_executor(None, _run)
+        finally:
+            stop.set()
+        await self._batches.put(None)
+        logger.info("Created %d chunks", self._chunks_created)
+
+    async def _next_page(self) -> PageText | None:
+        page = await self._pages.get()
+        if page is not None:
+            self._pages_chunked += 1
+            self._pages_with_text += bool(page.text.strip())
+            await self._report("chunk", self._pages_chunked, self._pages_total)
+        return page
+
+    async def _put_batch(self, batch: list[Chunk]) -> None:
+        self._chunks_created += len(batch)
+        await self._batches.put(batch)
+
+    async def _embed(self) -> None:
+        # Each worker sends one batch at a time
+        workers = max(_MAX_CONCURRENT_BATCHES, 1)
+        await _run_stages(*(self._embed_worker() for _ in range(workers)))
+        await self._embedded.put(None)
+
+    async def _embed_worker(self) -> None:
+        while (batch := await self._batches.get()) is not None:
+            new, kept = self._match_stored(batch)
+            signatures = await self._linker.sign([chunk.content for chunk in new])
+            async with self._db_lock:
+                # Not to this document's stored chunks: an amended chunk would
+                # be linked to its stale predecessor and inherit its embedding
+                fingerprints = await self._linker.link(
+                    self._db, signatures, exclude_document=self._document_id
+                )
+            canonical = [
+                chunk for chunk, fp in zip(new, fingerprints) if fp.canonical_id is None
+            ]
+            # One float32 matrix; each row goes to pgvector without becoming a list
+            embeddings = await embed_texts(
+                [chunk.content for chunk in canonical],
+                client=self._client, cache=self._embedding_cache, as_array=True,
+            )
+            self._chunks_embedded += len(batch)
+            await self._report("embed", self._chunks_embedded, self._chunks_created)
+            await self._embedded.put(_EmbeddedBatch(new, fingerprints, embeddings, kept))
+        # Pass the end marker on to the other workers
+        await self._batches.put(None)
+
+    def _match_stored(
+        self, batch: list[Chunk]
+    ) -> tuple[list[Chunk], list[tuple[Chunk, StoredChunk]]]:
+        """Split a batch into new chunks and chunks already stored unchanged."""
+        new: list[Chunk] = []
+        kept: list[tuple[Chunk, StoredChunk]] = []
+        for chunk in batch:
+            rows = self._stored.get(chunk_content_hash(chunk.content))
+            if rows:
+                # Repeated content claims one stored row per occurrence
+                kept.append((chunk, rows.pop(0)))
+            else:
+                new.append(chunk)
+        return new, kept
+
+    async def _store(self) -> None:
+        while (item := await self._embedded.get()) is not None:
+            async with self._db_lock:
+                await self._store_batch(item)
+            await self._report("store", self._chunks_stored, self._chunks_created)
+
+    async def _store_batch(self, item: _EmbeddedBatch) -> None:
+        if item.new:
+            embeddings = iter(item.embeddings)
+            rows = []
+            for chunk, fp in zip(item.new, item.fingerprints):
+                # Near-duplicates share their canonical chunk's embedding
+                embedding = next(embeddings) if fp.canonical_id is None else None
+                rows.append(ChunkRow(
+                    self._index_base + chunk.index, chunk.content, embedding, chunk.metadata,
+                    id=fp.id, minhash=fp.minhash, lsh_bands=fp.lsh_bands,
+                    canonical_id=fp.canonical_id,
+                ))
+                self._chunks_linked += fp.canonical_id is not None
+            self._chunks_stored += await bulk_insert_chunks(self._db, self._document_id, rows)
+        if item.kept:
+            # Kept rows keep their chunk_index: changing an indexed column
+            # would rewrite every index entry, including the embedding's
+            await update_chunk_metadata(self._db, (
+                (stored.id, chunk.metadata)
+                for chunk, stored in item.kept if stored.metadata != chunk.metadata
+            ))
+            self._chunks_stored += len(item.kept)
+            self._chunks_reused += len(item.kept)
+
+
+class _EmbeddedBatch(NamedTuple):
+    new: list[Chunk]
+    fingerprints: list[Fingerprint]  # one per new chunk
+    embeddings: np.ndarray           # one row per new chunk that is not a near-duplicate
+    kept: list[tuple[Chunk, StoredChunk]]
+
+
+async def _run_stages(*stages: Awaitable[None]) -> None:
+    """
+    Run stages concurrently until all finish. The first failure cancels the
+    others (which would otherwise wait forever on a dead queue) and is raised.
+    """
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+
 
-    return len(chunks)
+async def _no_progress(stage: str, done: int, total: int) -> None:
+    pass
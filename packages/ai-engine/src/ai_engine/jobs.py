@@ -0,0 +1,316 @@
+"""
+Ingestion job queue.
+
+Uploads are persisted to INGEST_STORAGE_DIR and queued by Document id; the
+pipeline then runs in workers (see ai_engine.worker) instead of inside the
+HTTP request.
+
+Delivery is at-least-once with visibility timeouts: a claimed job moves to
+an in-flight set with a deadline, the worker extends the deadline while it
+is busy and acks the job when done. If a worker dies, the deadline passes
+and the job is handed to another worker, so workers can run in any number
+of processes or hosts.
+
+Two JobQueue implementations:
+    RedisJobQueue     — shared queue for multi-process / multi-host workers
+    InMemoryJobQueue  — in-process stand-in for tests and local development
+
+Each queue also stores per-job progress (current stage and done/total counts
+per stage) for the status endpoint.
+
+Environment variables:
+    INGEST_QUEUE               — "redis" (default) or "memory"
+    INGEST_STORAGE_DIR         — where uploaded PDFs are kept until ingested
+                                 (default: ./data/uploads)
+    INGEST_VISIBILITY_TIMEOUT  — seconds a claimed job stays invisible to
+                                 other workers without a heartbeat (default: 300)
+    INGEST_MAX_ATTEMPTS        — deliveries before a job is marked failed
+                                 (default: 3)
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import uuid
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Protocol
+
+import redis.asyncio as aioredis
+
+_QUEUE_BACKEND = os.getenv("INGEST_QUEUE", "redis")
+STORAGE_DIR = Path(os.getenv("INGEST_STORAGE_DIR", "./data/uploads"))
+VISIBILITY_TIMEOUT = float(os.getenv("INGEST_VISIBILITY_TIMEOUT", "300"))
+MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+
+# Pipeline stages in order, as reported by ingest_pdf's progress callback
+STAGES = ("extract", "chunk", "embed", "store")
+
+# Progress entries outlive the job long enough for clients to poll them
+_PROGRESS_TTL = 7 * 24 * 3600
+
+ProgressCallback = Callable[[str, int, int], Awaitable[None]]
+
+
+def upload_path(document_id: uuid.UUID) -> Path:
+    """Where the uploaded PDF of a document is stored until it is ingested."""
+    return STORAGE_DIR / f"{document_id}.pdf"
+
+
+def spool_path() -> Path:
+    """
+    A fresh path in the storage directory to stream an upload into before
+    its document id is known. Renaming it to upload_path() is atomic.
+    """
+    return STORAGE_DIR / f"{uuid.uuid4()}.part"
+
+
+@dataclass
+class StageProgress:
+    done: int = 0
+    total: int = 0
+
+
+@dataclass
+class JobProgress:
+    """Progress of one ingestion job."""
+    stage: str | None = None
+    stages: dict[str, StageProgress] = field(default_factory=dict)
+    attempts: int = 0
+    error: str | None = None
+
+
+class JobQueue(Protocol):
+    """At-least-once job queue with visibility timeouts and progress."""
+
+    async def enqueue(self, job_id: str) -> None:
+        """Queue a job and reset its progress."""
+        ...
+
+    async def claim(self, visibility_timeout: float = VISIBILITY_TIMEOUT) -> str | None:
+        """
+        Take the next job, hiding it from other workers for
+        `visibility_timeout` seconds. Returns None if the queue is empty.
+        """
+        ...
+
+    async def extend(self, job_id: str, visibility_timeout: float = VISIBILITY_TIMEOUT) -> bool:
+        """Push back the deadline of a claimed job. False if it was lost."""
+        ...
+
+    async def ack(self, job_id: str) -> None:
+        """Remove a finished job for good."""
+        ...
+
+    async def release(self, job_id: str, delay: float = 0.0) -> None:
+        """
+        Give a claimed job back, to be redelivered after `delay` seconds.
+        Stop extending the job first: a later extend replaces the delay.
+        """
+        ...
+
+    async def requeue_expired(self) -> int:
+        """Make jobs whose deadline passed claimable again; returns how many."""
+        ...
+
+    async def set_progress(self, job_id: str, stage: str, done: int, total: int) -> None:
+        ...
+
+    async def record_attempt(self, job_id: str) -> int:
+        """Count a delivery of the job; returns the attempt number."""
+        ...
+
+    async def set_error(self, job_id: str, error: str) -> None:
+        ...
+
+    async def get_progress(self, job_id: str) -> JobProgress | None:
+        ...
+
+
+class InMemoryJobQueue:
+    """JobQueue held in process memory; only visible to this process."""
+
+    def __init__(self):
+        self._pending: deque[str] = deque()
+        self._in_flight: dict[str, float] = {}  # job id -> deadline (monotonic)
+        self._progress: dict[str, JobProgress] = {}
+
+    async def enqueue(self, job_id: str) -> None:
+        self._progress[job_id] = JobProgress()
+        self._pending.append(job_id)
+
+    async def claim(self, visibility_timeout: float = VISIBILITY_TIMEOUT) -> str | None:
+        if not self._pending:
+            return None
+        job_id = self._pending.popleft()
+        self._in_flight[job_id] = time.monotonic() + visibility_timeout
+        return job_id
+
+    async def extend(self, job_id: str, visibility_timeout: float = VISIBILITY_TIMEOUT) -> bool:
+        if job_id not in self._in_flight:
+            return False
+        self._in_flight[job_id] = time.monotonic() + visibility_timeout
+        return True
+
+    async def ack(self, job_id: str) -> None:
+        self._in_flight.pop(job_id, None)
+
+    async def release(self, job_id: str, delay: float = 0.0) -> None:
+        if job_id in self._in_flight:
+            self._in_flight[job_id] = time.monotonic() + delay
+
+    async def requeue_expired(self) -> int:
+        now = time.monotonic()
+        expired = [job_id for job_id, deadline in self._in_flight.items() if deadline <= now]
+        for job_id in expired:
+            del self._in_flight[job_id]
+            # Redelivered jobs go to the front of the line
+            self._pending.appendleft(job_id)
+        return len(expired)
+
+    async def set_progress(self, job_id: str, stage: str, done: int, total: int) -> None:
+        progress = self._progress.setdefault(job_id, JobProgress())
+        progress.stage = stage
+        progress.stages[stage] = StageProgress(done=done, total=total)
+
+    async def record_attempt(self, job_id: str) -> int:
+        progress = self._progress.setdefault(job_id, JobProgress())
+        progress.attempts += 1
+        return progress.attempts
+
+    async def set_error(self, job_id: str, error: str) -> None:
+        self._progress.setdefault(job_id, JobProgress()).error = error
+
+    async def get_progress(self, job_id: str) -> JobProgress | None:
+        return self._progress.get(job_id)
+
+
+# Deadlines use the Redis server clock so workers on different hosts agree.
+_NOW = "local t = redis.call('TIME') local now = tonumber(t[1]) + tonumber(t[2]) / 1000000 "
+
+_CLAIM_SCRIPT = _NOW + """
+local job_id = redis.call('RPOP', KEYS[1])
+if not job_id then return false end
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[1]), job_id)
+return job_id
+"""
+
+_EXTEND_SCRIPT = _NOW + """
+return redis.call('ZADD', KEYS[1], 'XX', 'CH', now + tonumber(ARGV[2]), ARGV[1])
+"""
+
+_REQUEUE_SCRIPT = _NOW + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, job_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], job_id)
+    redis.call('RPUSH', KEYS[1], job_id)
+end
+return #expired
+"""
+
+
+class RedisJobQueue:
+    """
+    JobQueue shared through Redis.
+
+    Keys:
+        {prefix}:pending       LIST of job ids (LPUSH in, RPOP out)
+        {prefix}:inflight      ZSET of claimed job ids scored by deadline
+        {prefix}:job:{job_id}  HASH of progress fields
+    """
+
+    def __init__(self, redis: aioredis.Redis, prefix: str = "ingest"):
+        self._redis = redis
+        self._pending_key = f"{prefix}:pending"
+        self._in_flight_key = f"{prefix}:inflight"
+        self._prefix = prefix
+        self._claim = redis.register_script(_CLAIM_SCRIPT)
+        self._extend = redis.register_script(_EXTEND_SCRIPT)
+        self._requeue = redis.register_script(_REQUEUE_SCRIPT)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self._prefix}:job:{job_id}"
+
+    async def enqueue(self, job_id: str) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._job_key(job_id))
+            pipe.hset(self._job_key(job_id), "attempts", 0)
+            pipe.expire(self._job_key(job_id), _PROGRESS_TTL)
+            pipe.lpush(self._pending_key, job_id)
+            await pipe.execute()
+
+    async def claim(self, visibility_timeout: float = VISIBILITY_TIMEOUT) -> str | None:
+        job_id = await self._claim(
+            keys=[self._pending_key, self._in_flight_key], args=[visibility_timeout]
+        )
+        if job_id is None:
+            return None
+        return job_id.decode() if isinstance(job_id, bytes) else job_id
+
+    async def extend(self, job_id: str, visibility_timeout: float = VISIBILITY_TIMEOUT) -> bool:
+        changed = await self._extend(
+            keys=[self._in_flight_key], args=[job_id, visibility_timeout]
+        )
+        return bool(changed)
+
+    async def ack(self, job_id: str) -> None:
+        await self._redis.zrem(self._in_flight_key, job_id)
+
+    async def release(self, job_id: str, delay: float = 0.0) -> None:
+        await self.extend(job_id, delay)
+
+    async def requeue_expired(self) -> int:
+        return int(await self._requeue(keys=[self._pending_key, self._in_flight_key]))
+
+    async def set_progress(self, job_id: str, stage: str, done: int, total: int) -> None:
+        await self._redis.hset(self._job_key(job_id), mapping={
+            "stage": stage,
+            f"{stage}:done": done,
+            f"{stage}:total": total,
+        })
+
+    async def record_attempt(self, job_id: str) -> int:
+        return int(await self._redis.hincrby(self._job_key(job_id), "attempts", 1))
+
+    async def set_error(self, job_id: str, error: str) -> None:
+        await self._redis.hset(self._job_key(job_id), "error", error)
+
+    async def get_progress(self, job_id: str) -> JobProgress | None:
+        fields = await self._redis.hgetall(self._job_key(job_id))
+        if not fields:
+            return None
+        fields = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in fields.items()
+        }
+        progress = JobProgress(
+            stage=fields.get("stage"),
+            attempts=int(fields.get("attempts", 0)),
+            error=fields.get("error"),
+        )
+        for stage in STAGES:
+            if f"{stage}:total" in fields:
+                progress.stages[stage] = StageProgress(
+                    done=int(fields[f"{stage}:done"]),
+                    total=int(fields[f"{stage}:total"]),
+                )
+        return progress
+
+
+_queue: JobQueue | None = None
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue selected by INGEST_QUEUE."""
+    global _queue
+    if _queue is None:
+        if _QUEUE_BACKEND == "memory":
+            _queue = InMemoryJobQueue()
+        else:
+            from database.redis_client import redis_client
+
+            _queue = RedisJobQueue(redis_client)
+    return _queue
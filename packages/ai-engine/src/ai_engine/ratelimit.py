@@ -0,0 +1,195 @@
+"""
+Quota-aware rate limiting for Gemini calls.
+
+Gemini quotas are per project: requests per minute (RPM) and tokens per
+minute (TPM), separately for generation (page extraction) and embedding.
+Every API worker and ingestion worker draws on the same quota, so without
+coordination each process backs off on its own: all of them get throttled
+together, all of them sleep, and throughput swings between idle and 429.
+
+Before each call, QuotaLimiter reserves one request and the call's
+estimated tokens from token buckets that refill continuously at the quota
+rate. Reservations may overdraw a bucket; the caller is told how long to
+wait until its share has refilled and sleeps exactly that long. Callers are
+therefore spaced evenly at the quota rate instead of polling, and
+throughput settles just under the ceiling. After a generation call the
+estimate is corrected with the token count the API reports.
+
+Two TokenBuckets implementations:
+    RedisTokenBuckets     — buckets shared by all processes and hosts
+    InMemoryTokenBuckets  — per-process stand-in for tests and local development
+
+If Redis is unreachable the limiter lets calls through (with a warning);
+the retry policy in ai_engine.retry still backs off on 429s.
+
+Environment variables:
+    GEMINI_RATE_LIMITER  — "redis" (default) or "memory"
+    GEMINI_GENERATE_RPM  — generation requests per minute (default: 0, unlimited)
+    GEMINI_GENERATE_TPM  — generation tokens per minute (default: 0, unlimited)
+    GEMINI_EMBED_RPM     — embedding requests per minute (default: 0, unlimited)
+    GEMINI_EMBED_TPM     — embedding tokens per minute (default: 0, unlimited)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Protocol
+
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+_BACKEND = os.getenv("GEMINI_RATE_LIMITER", "redis")
+
+GENERATE = "generate"
+EMBED = "embed"
+
+_QUOTAS_PER_MINUTE = {
+    f"{GENERATE}:requests": float(os.getenv("GEMINI_GENERATE_RPM", "0")),
+    f"{GENERATE}:tokens": float(os.getenv("GEMINI_GENERATE_TPM", "0")),
+    f"{EMBED}:requests": float(os.getenv("GEMINI_EMBED_RPM", "0")),
+    f"{EMBED}:tokens": float(os.getenv("GEMINI_EMBED_TPM", "0")),
+}
+
+# A full bucket holds this many seconds of quota: enough to absorb jitter
+# between callers, small enough that a burst after idling cannot exceed the
+# per-minute quota
+_BURST_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """Refill rate (units per second) and capacity of one token bucket."""
+    rate: float
+    capacity: float
+
+    @classmethod
+    def per_minute(cls, quota: float) -> Bucket:
+        rate = quota / 60
+        return cls(rate=rate, capacity=max(rate * _BURST_SECONDS, 1.0))
+
+
+class TokenBuckets(Protocol):
+    """Token buckets that hand out reservations."""
+
+    async def reserve(self, name: str, bucket: Bucket, cost: float) -> float:
+        """
+        Take `cost` units from the named bucket, overdrawing it if needed.
+        Returns the seconds to wait before the reserved units are available.
+        A negative cost returns units.
+        """
+        ...
+
+
+class InMemoryTokenBuckets:
+    """TokenBuckets held in process memory; only this process is limited."""
+
+    def __init__(self):
+        self._state: dict[str, tuple[float, float]] = {}  # name -> (tokens, timestamp)
+
+    async def reserve(self, name: str, bucket: Bucket, cost: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._state.get(name, (bucket.capacity, now))
+        tokens = min(bucket.capacity, tokens + (now - updated) * bucket.rate) - cost
+        self._state[name] = (tokens, now)
+        return 0.0 if tokens >= 0 else -tokens / bucket.rate
+
+
+# Refill, then take; the Redis server clock keeps hosts in agreement.
+# Returns the wait as a string, since Lua numbers come back truncated.
+_RESERVE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate) - tonumber(ARGV[3])
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate - math.min(tokens, 0) / rate) + 60)
+if tokens >= 0 then return '0' end
+return tostring(-tokens / rate)
+"""
+
+
+class RedisTokenBuckets:
+    """
+    TokenBuckets shared through Redis.
+
+    Keys:
+        {prefix}:{name}  HASH of tokens and last refill time
+    """
+
+    def __init__(self, redis: aioredis.Redis, prefix: str = "gemini:quota"):
+        self._prefix = prefix
+        self._reserve = redis.register_script(_RESERVE_SCRIPT)
+
+    async def reserve(self, name: str, bucket: Bucket, cost: float) -> float:
+        wait = await self._reserve(
+            keys=[f"{self._prefix}:{name}"], args=[bucket.rate, bucket.capacity, cost]
+        )
+        return float(wait)
+
+
+class QuotaLimiter:
+    """Paces Gemini calls to the configured RPM / TPM quotas."""
+
+    def __init__(
+        self,
+        buckets: TokenBuckets,
+        quotas_per_minute: dict[str, float] | None = None,
+    ):
+        self._buckets = buckets
+        quotas = _QUOTAS_PER_MINUTE if quotas_per_minute is None else quotas_per_minute
+        self._limits = {
+            name: Bucket.per_minute(quota) for name, quota in quotas.items() if quota > 0
+        }
+
+    async def acquire(self, kind: str, tokens: int = 0) -> None:
+        """
+        Wait until one `kind` request ("generate" or "embed") with an
+        estimated `tokens` fits the quota.
+        """
+        wait = max(
+            await self._reserve(f"{kind}:requests", 1),
+            await self._reserve(f"{kind}:tokens", tokens) if tokens else 0.0,
+        )
+        if wait > 0:
+            logger.debug("Waiting %.2fs for %s quota", wait, kind)
+            await asyncio.sleep(wait)
+
+    async def settle(self, kind: str, tokens: int) -> None:
+        """Correct an earlier token estimate by `tokens` (negative refunds)."""
+        if tokens:
+            await self._reserve(f"{kind}:tokens", tokens)
+
+    async def _reserve(self, name: str, cost: float) -> float:
+        bucket = self._limits.get(name)
+        if bucket is None:
+            return 0.0
+        try:
+            return await self._buckets.reserve(name, bucket, cost)
+        except Exception:
+            logger.warning("Rate limiter unavailable; not pacing %s", name, exc_info=True)
+            return 0.0
+
+
+_limiter: QuotaLimiter | None = None
+
+
+def get_quota_limiter() -> QuotaLimiter:
+    """Return the process-wide limiter selected by GEMINI_RATE_LIMITER."""
+    global _limiter
+    if _limiter is None:
+        if _BACKEND == "memory" or not any(_QUOTAS_PER_MINUTE.values()):
+            _limiter = QuotaLimiter(InMemoryTokenBuckets())
+        else:
+            from database.redis_client import redis_client
+
+            _limiter = QuotaLimiter(RedisTokenBuckets(redis_client))
+    return _limiter
@@ -0,0 +1,197 @@
+"""
+Offline re-chunking and re-embedding.
+
+Rebuilds `document_chunks` from the page text stored in `document_pages`, so
+trying another chunking strategy, chunk size or overlap never sends a PDF to
+Gemini again. Embeddings go through the embedding cache: chunks whose text
+did not change are free, and only genuinely new chunk texts cost quota.
+Near-duplicate chunks are linked to a canonical chunk rather than embedded,
+as at ingestion (see ai_engine.dedup).
+
+Each document is rebuilt in its own transaction, so readers see either the
+old set of chunks or the new one, never a mix.
+
+Usage:
+    uv run --package api python -m ai_engine.rechunk [DOCUMENT_ID ...]
+        [--strategy sentence|window] [--max-tokens N]
+        [--chunk-size N] [--overlap N]
+
+Without document ids every indexed document is rebuilt. Settings that are
+not given come from CHUNK_STRATEGY / CHUNK_MAX_TOKENS and the chunker
+defaults. Documents ingested before page text was stored have no pages and
+are skipped; upload those once more.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import logging
+import uuid
+from collections.abc import Sequence
+
+from database import AsyncSessionLocal
+from database.bulk import ChunkRow, bulk_insert_chunks
+from database.models.document import (
+    Document,
+    DocumentChunk,
+    DocumentPage,
+    DocumentStatus,
+)
+from google import genai
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai_engine.cache import DatabaseEmbeddingCache, EmbeddingCache
+from ai_engine.chunker import ChunkingStrategy, get_chunking_strategy
+from ai_engine.clients import get_client
+from ai_engine.dedup import NearDuplicateLinker
+from ai_engine.embedder import embed_texts
+from ai_engine.executor import run_cpu_bound
+from ai_engine.extractor import PageText
+
+logger = logging.getLogger(__name__)
+
+
+async def rechunk_document(
+    db: AsyncSession,
+    document_id: uuid.UUID,
+    chunker: ChunkingStrategy,
+    client: genai.Client | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+) -> int:
+    """
+    Replace the chunks of one document with chunks built from its stored
+    pages. The caller commits.
+
+    Returns:
+        Number of chunks written.
+
+    Raises:
+        LookupError: If the document has no stored pages.
+        ValueError: If chunking produces no chunks.
+    """
+    result = await db.execute(
+        select(DocumentPage.page_number, DocumentPage.text, DocumentPage.source)
+        .where(DocumentPage.document_id == document_id)
+        .order_by(DocumentPage.page_number)
+    )
+    pages = [
+        PageText(page_number=number, text=text, source=source)
+        for number, text, source in result.tuples()
+    ]
+    if not pages:
+        raise LookupError(f"No stored pages for document {document_id}")
+
+    chunks = await run_cpu_bound(
+        lambda: list(chunker.chunk(p for p in pages if p.text.strip()))
+    )
+    if not chunks:
+        raise ValueError("Text chunking produced no chunks")
+
+    # Old chunks go first so new ones are not linked to them
+    await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+    fingerprints = await NearDuplicateLinker().fingerprint(
+        db, [chunk.content for chunk in chunks]
+    )
+    embeddings = iter(await embed_texts(
+        [chunk.content for chunk, fp in zip(chunks, fingerprints) if fp.canonical_id is None],
+        client=client, cache=embedding_cache, as_array=True,
+    ))
+    return await bulk_insert_chunks(db, document_id, [
+        ChunkRow(
+            chunk.index, chunk.content,
+            next(embeddings) if fp.canonical_id is None else None,
+            chunk.metadata,
+            id=fp.id, minhash=fp.minhash, lsh_bands=fp.lsh_bands, canonical_id=fp.canonical_id,
+        )
+        for chunk, fp in zip(chunks, fingerprints)
+    ])
+
+
+def build_chunker(
+    strategy: str | None = None,
+    max_tokens: int | None = None,
+    chunk_size: int | None = None,
+    overlap: int | None = None,
+) -> ChunkingStrategy:
+    """
+    The named (or configured) strategy with the given settings overridden.
+
+    Raises:
+        ValueError: For an unknown strategy or a setting it does not have.
+    """
+    chunker = get_chunking_strategy(strategy)
+    overrides = {
+        name: value
+        for name, value in (
+            ("max_tokens", max_tokens), ("chunk_size", chunk_size), ("overlap", overlap),
+        )
+        if value is not None
+    }
+    try:
+        return dataclasses.replace(chunker, **overrides)
+    except TypeError:
+        raise ValueError(
+            f"{type(chunker).__name__} does not take {', '.join(sorted(overrides))}"
+        ) from None
+
+
+def _parse_args(argv: Sequence[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m ai_engine.rechunk",
+        description="Rebuild document chunks and embeddings from stored page text.",
+    )
+    parser.add_argument("document_ids", nargs="*", type=uuid.UUID, metavar="DOCUMENT_ID")
+    parser.add_argument("--strategy", choices=("sentence", "window"))
+    parser.add_argument("--max-tokens", type=int, help="token budget (sentence strategy)")
+    parser.add_argument("--chunk-size", type=int, help="characters per window (window strategy)")
+    parser.add_argument("--overlap", type=int, help="overlap in characters (window strategy)")
+    args = parser.parse_args(argv)
+    try:
+        args.chunker = build_chunker(args.strategy, args.max_tokens, args.chunk_size, args.overlap)
+    except ValueError as exc:
+        parser.error(str(exc))
+    return args
+
+
+async def main(argv: Sequence[str] | None = None) -> None:
+    args = _parse_args(argv)
+    document_ids = args.document_ids
+    if not document_ids:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Document.id)
+                .where(Document.status == DocumentStatus.INDEXED)
+                .order_by(Document.created_at)
+            )
+            document_ids = list(result.scalars())
+
+    client = get_client()
+    embedding_cache = DatabaseEmbeddingCache(AsyncSessionLocal)
+    logger.info("Rebuilding chunks of %d documents with %r", len(document_ids), args.chunker)
+    rebuilt = skipped = 0
+    for document_id in document_ids:
+        async with AsyncSessionLocal() as db:
+            try:
+                count = await rechunk_document(
+                    db, document_id, args.chunker, client, embedding_cache
+                )
+            except (LookupError, ValueError) as exc:
+                logger.warning("Skipping document %s: %s", document_id, exc)
+                skipped += 1
+                continue
+            await db.commit()
+        rebuilt += 1
+        logger.info("Document %s: %d chunks", document_id, count)
+
+    logger.info(
+        "Rebuilt %d documents, skipped %d; %d embeddings reused, %d newly embedded",
+        rebuilt, skipped, embedding_cache.hits, embedding_cache.misses,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,224 @@
+"""
+Dense retrieval over `document_chunks`.
+
+The query is embedded with task type RETRIEVAL_QUERY (documents were
+embedded with RETRIEVAL_DOCUMENT) and the nearest chunks by cosine distance
+are read through the ANN index on `document_chunks.embedding`. Each hit
+comes back with its score, page metadata and document title from a single
+query joined to `documents`.
+
+Approximate search trades recall for latency through per-query settings:
+`ivfflat.probes` (lists scanned by an IVFFlat index) and `hnsw.ef_search`
+(candidate list size of an HNSW index). They are set with set_config(...,
+is_local => true) right before the search, so they apply to the current
+transaction only and never leak to other users of a pooled connection.
+
+Near-duplicate chunks have no embedding (see ai_engine.dedup) and are
+never returned; their canonical chunk stands in for them.
+
+Taxpayers ask the same questions over and over, so query embeddings are
+cached (see ai_engine.cache). The key is the question after Ge'ez-aware
+normalization (ai_engine.tokenizer): spacing, punctuation, case,
+homophone spellings and Ethiopic numerals do not matter, so "TIN ላማውጣት?"
+and "tin  ላማውጣት" share one entry. A hit skips the Gemini call entirely.
+
+Environment variables:
+    RETRIEVAL_TOP_K                    — chunks returned per query (default: 8)
+    RETRIEVAL_IVFFLAT_PROBES           — ivfflat.probes per query (default: 10)
+    RETRIEVAL_HNSW_EF_SEARCH           — hnsw.ef_search per query (default: 40)
+    QUERY_EMBEDDING_CACHE              — "redis" (default), "memory" or "off"
+    QUERY_EMBEDDING_CACHE_TTL          — seconds an unused entry is kept (default: 604800)
+    QUERY_EMBEDDING_CACHE_LOCAL_SIZE   — entries kept in process memory in front
+                                         of Redis (default: 1024)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from database.models.document import Document, DocumentChunk
+from google import genai
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai_engine.cache import EmbeddingCache, InMemoryEmbeddingCache, RedisEmbeddingCache
+from ai_engine.embedder import embed_texts, embedding_cache_key
+from ai_engine.tokenizer import tokenize
+
+logger = logging.getLogger(__name__)
+
+TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+IVFFLAT_PROBES = int(os.getenv("RETRIEVAL_IVFFLAT_PROBES", "10"))
+HNSW_EF_SEARCH = int(os.getenv("RETRIEVAL_HNSW_EF_SEARCH", "40"))
+
+_QUERY_CACHE_BACKEND = os.getenv("QUERY_EMBEDDING_CACHE", "redis")
+_QUERY_CACHE_TTL = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL", str(7 * 24 * 3600)))
+_QUERY_CACHE_LOCAL_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_LOCAL_SIZE", "1024"))
+
+QUERY_TASK_TYPE = "RETRIEVAL_QUERY"
+
+
+@dataclass
+class RetrievedChunk:
+    """A chunk returned by a search, with its score and source document."""
+    chunk_id: uuid.UUID
+    document_id: uuid.UUID
+    document_title: str
+    content: str
+    score: float  # cosine similarity (dense) or fused RRF score (hybrid); higher is better
+    pages: list[int] = field(default_factory=list)
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+def query_cache_key(query: str) -> str:
+    """
+    Cache key of a query's embedding, from its normalized words. A query
+    without any (only punctuation or symbols) is keyed by its own text, so
+    such queries do not all share one embedding.
+    """
+    words = " ".join(tokenize(query))
+    return embedding_cache_key(words or query.strip(), QUERY_TASK_TYPE)
+
+
+async def embed_query(
+    query: str,
+    client: genai.Client | None = None,
+    cache: EmbeddingCache | None = None,
+) -> np.ndarray:
+    """
+    Embed a search query (RETRIEVAL_QUERY) as a float32 vector, through the
+    query embedding cache (`cache`, default: get_query_embedding_cache()).
+    """
+    if cache is None:
+        cache = get_query_embedding_cache()
+    key = query_cache_key(query) if cache is not None else None
+    if key is not None:
+        cached = await cache.get_many([key])
+        if key in cached:
+            return cached[key]
+    matrix = await embed_texts([query], client=client, task_type=QUERY_TASK_TYPE, as_array=True)
+    if key is not None:
+        await cache.set_many({key: matrix[0]})
+    return matrix[0]
+
+
+async def dense_search(
+    db: AsyncSession,
+    query: str,
+    top_k: int = TOP_K,
+    *,
+    probes: int | None = IVFFLAT_PROBES,
+    ef_search: int | None = HNSW_EF_SEARCH,
+    client: genai.Client | None = None,
+) -> list[RetrievedChunk]:
+    """
+    Embed `query` and return its `top_k` nearest chunks, best first.
+
+    Args:
+        db: Active async database session.
+        query: Search text.
+        top_k: Number of chunks to return.
+        probes: ivfflat.probes for this query (None keeps the session's).
+        ef_search: hnsw.ef_search for this query (None keeps the session's).
+        client: Optional pre-configured genai.Client.
+    """
+    embedding = await embed_query(query, client)
+    return await search_by_embedding(
+        db, embedding, top_k, probes=probes, ef_search=ef_search
+    )
+
+
+async def search_by_embedding(
+    db: AsyncSession,
+    embedding: Sequence[float] | np.ndarray,
+    top_k: int = TOP_K,
+    *,
+    probes: int | None = IVFFLAT_PROBES,
+    ef_search: int | None = HNSW_EF_SEARCH,
+) -> list[RetrievedChunk]:
+    """Nearest chunks to an already computed query embedding, best first."""
+    if top_k <= 0:
+        return []
+    await set_ann_params(db, probes=probes, ef_search=ef_search)
+
+    distance = DocumentChunk.embedding.cosine_distance(embedding)
+    result = await db.execute(
+        _select_chunks(distance.label("distance"))
+        .where(DocumentChunk.embedding.is_not(None))
+        .order_by(distance)
+        .limit(top_k)
+    )
+    return [_retrieved(*row[:-1], score=1.0 - float(row[-1])) for row in result]
+
+
+async def fetch_chunks(
+    db: AsyncSession, chunk_ids: Sequence[uuid.UUID]
+) -> dict[uuid.UUID, RetrievedChunk]:
+    """Chunks by id, with their document title (score 0). Missing ids are left out."""
+    if not chunk_ids:
+        return {}
+    result = await db.execute(_select_chunks().where(DocumentChunk.id.in_(chunk_ids)))
+    return {row[0]: _retrieved(*row, score=0.0) for row in result}
+
+
+def _select_chunks(*extra):
+    return select(
+        DocumentChunk.id,
+        DocumentChunk.document_id,
+        Document.title,
+        DocumentChunk.content,
+        DocumentChunk.chunk_metadata,
+        *extra,
+    ).join(Document, Document.id == DocumentChunk.document_id)
+
+
+def _retrieved(chunk_id, document_id, title, content, metadata, *, score: float) -> RetrievedChunk:
+    return RetrievedChunk(
+        chunk_id=chunk_id,
+        document_id=document_id,
+        document_title=title,
+        content=content,
+        score=score,
+        pages=list((metadata or {}).get("pages", [])),
+        metadata=metadata or {},
+    )
+
+
+async def set_ann_params(
+    db: AsyncSession,
+    *,
+    probes: int | None = None,
+    ef_search: int | None = None,
+) -> None:
+    """Set ANN search parameters for the rest of the current transaction."""
+    settings = [
+        func.set_config(name, str(value), True)
+        for name, value in (("ivfflat.probes", probes), ("hnsw.ef_search", ef_search))
+        if value is not None
+    ]
+    if settings:
+        await db.execute(select(*settings))
+
+
+_query_cache: EmbeddingCache | None = None
+
+
+def get_query_embedding_cache() -> EmbeddingCache | None:
+    """Return the process-wide query embedding cache selected by QUERY_EMBEDDING_CACHE."""
+    global _query_cache
+    if _query_cache is None and _QUERY_CACHE_BACKEND != "off":
+        if _QUERY_CACHE_BACKEND == "memory":
+            _query_cache = InMemoryEmbeddingCache(_QUERY_CACHE_LOCAL_SIZE, _QUERY_CACHE_TTL)
+        else:
+            from database.redis_client import redis_binary_client
+
+            _query_cache = RedisEmbeddingCache(
+                redis_binary_client, _QUERY_CACHE_TTL, local_size=_QUERY_CACHE_LOCAL_SIZE
+            )
+    return _query_cache
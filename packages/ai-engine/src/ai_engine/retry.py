@@ -0,0 +1,93 @@
+"""
+Retry policy for Gemini calls.
+
+Rate limiting (429), server errors (5xx), timeouts and dropped connections
+are transient and retried with exponential backoff. Anything else (bad
+request, blocked content, authentication) fails at once, since repeating it
+only burns quota.
+
+Backoff delays are jittered (uniformly between half and all of the
+exponential delay), so callers throttled at the same moment do not all
+retry at the same moment and get throttled again. A retry delay sent by
+the server with a 429 (RetryInfo) is always waited out.
+"""
+
+import asyncio
+import logging
+import random
+import re
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from google.genai import errors
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_MAX_DELAY = 60.0
+_RETRY_INFO = "type.googleapis.com/google.rpc.RetryInfo"
+_SECONDS = re.compile(r"^(\d+(?:\.\d+)?)s$")
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Rate limiting, server errors and network timeouts are worth retrying."""
+    if isinstance(exc, errors.APIError):
+        return exc.code == 429 or exc.code >= 500
+    return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def server_retry_delay(exc: BaseException) -> float | None:
+    """The retry delay a Gemini error asks for (RetryInfo), if any, in seconds."""
+    if not isinstance(exc, errors.APIError) or not isinstance(exc.details, dict):
+        return None
+    error: Any = exc.details.get("error", exc.details)
+    details = error.get("details") if isinstance(error, dict) else None
+    for detail in details if isinstance(details, list) else ():
+        if isinstance(detail, dict) and detail.get("@type") == _RETRY_INFO:
+            match = _SECONDS.match(str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+def backoff_delay(attempt: int, base_delay: float, exc: BaseException | None = None) -> float:
+    """
+    Jittered delay before retry number `attempt + 1`: uniform between half
+    and all of `base_delay * 2**attempt` (capped at _MAX_DELAY), but never
+    shorter than the delay the server asked for.
+    """
+    ceiling = min(base_delay * 2 ** attempt, _MAX_DELAY)
+    delay = random.uniform(ceiling / 2, ceiling)
+    requested = server_retry_delay(exc) if exc is not None else None
+    return max(delay, requested or 0.0)
+
+
+async def retry_transient(
+    call: Callable[[], Awaitable[T]],
+    *,
+    retries: int,
+    base_delay: float,
+    what: str,
+) -> T:
+    """
+    Await `call()`, retrying transient errors up to `retries` times.
+
+    The n-th retry waits about `base_delay * 2**(n-1)` seconds (see
+    backoff_delay). `what` names the operation in log messages. The last
+    error is re-raised.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await call()
+        except Exception as exc:
+            if attempt >= retries or not is_transient(exc):
+                raise
+            delay = backoff_delay(attempt, base_delay, exc)
+            attempt += 1
+            logger.warning(
+                "%s failed (%s); retry %d/%d in %.1fs",
+                what, exc, attempt, retries, delay,
+            )
+            await asyncio.sleep(delay)
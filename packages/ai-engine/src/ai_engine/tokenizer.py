@@ -0,0 +1,96 @@
+"""
+Ge'ez-aware text normalization and tokenization for lexical search.
+
+Amharic spelling varies in ways that do not change the word, so a query
+and a regulation that say the same thing often differ character by
+character. `normalize` folds those differences away:
+
+- homophone letter series: ሐ and ኀ are written for ሀ, ሠ for ሰ, ዐ for አ,
+  ፀ for ጸ, and the 4th-order forms ሃ / ኣ for ሀ / አ
+- Ethiopic numerals become Arabic numerals (፲፪ -> 12), so "አንቀጽ ፲፪" and
+  "Article 12" share the article number
+- Latin text is case-folded; everything is NFC-normalized first
+
+`tokenize` then splits the normalized text into words at whitespace and
+Ethiopic punctuation (፡ ። ፣ ፤ …). Runs of Ethiopic letters, Latin
+letters and digits are separate tokens, and citation numbers such as
+"983/2016" are kept whole as well as split into their parts.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+
+# (first letter of the variant series, first letter of the series it folds into);
+# each series is the seven vowel orders plus the labialized 8th form
+_HOMOPHONE_SERIES = (
+    (0x1210, 0x1200),  # ሐ -> ሀ
+    (0x1280, 0x1200),  # ኀ -> ሀ
+    (0x1220, 0x1230),  # ሠ -> ሰ
+    (0x12D0, 0x12A0),  # ዐ -> አ
+    (0x1340, 0x1338),  # ፀ -> ጸ
+)
+# 4th-order (-a) forms written for the 1st-order ones
+_FOURTH_ORDER = {0x1203: 0x1200, 0x12A3: 0x12A0}  # ሃ -> ሀ, ኣ -> አ
+
+
+def _homophone_table() -> dict[int, int]:
+    table = {}
+    for variant, base in _HOMOPHONE_SERIES:
+        for order in range(8):
+            table[variant + order] = base + order
+    for source in (*table, *_FOURTH_ORDER):
+        target = table.get(source, source)
+        table[source] = _FOURTH_ORDER.get(target, target)
+    return table
+
+
+_HOMOPHONES = _homophone_table()
+
+_ETHIOPIC_NUMBER = re.compile(r"[\u1369-\u137c]+")
+_UNITS = {0x1369 + i: i + 1 for i in range(9)}    # ፩..፱
+_TENS = {0x1372 + i: (i + 1) * 10 for i in range(9)}  # ፲..፺
+_HUNDRED = 0x137B  # ፻
+_TEN_THOUSAND = 0x137C  # ፼
+
+_ETHIOPIC_LETTERS = r"\u1200-\u135f\u1380-\u139f\u2d80-\u2ddf\uab00-\uab2f"
+_TOKEN = re.compile(
+    r"\d+(?:/\d+)+"  # citation numbers, e.g. 983/2016
+    rf"|[{_ETHIOPIC_LETTERS}]+"
+    rf"|[^\W\d_{_ETHIOPIC_LETTERS}]+"  # other letters (Latin etc.)
+    r"|\d+"
+)
+
+
+def ethiopic_to_int(numeral: str) -> int:
+    """Value of an Ethiopic numeral, e.g. ፲፪ -> 12, ፳፻፲፮ -> 2016."""
+    total = group = 0
+    for char in map(ord, numeral):
+        if char in _UNITS:
+            group += _UNITS[char]
+        elif char in _TENS:
+            group += _TENS[char]
+        elif char == _HUNDRED:
+            group = (group or 1) * 100
+        elif char == _TEN_THOUSAND:
+            total = (total + (group or 1)) * 10000
+            group = 0
+    return total + group
+
+
+def normalize(text: str) -> str:
+    """Text with homophones, numerals, case and Unicode form folded."""
+    text = unicodedata.normalize("NFC", text).translate(_HOMOPHONES).casefold()
+    return _ETHIOPIC_NUMBER.sub(lambda match: str(ethiopic_to_int(match.group())), text)
+
+
+def tokenize(text: str) -> list[str]:
+    """Normalized word tokens of `text`, in order."""
+    tokens = []
+    for match in _TOKEN.finditer(normalize(text)):
+        token = match.group()
+        tokens.append(token)
+        if "/" in token:
+            tokens.extend(token.split("/"))
+    return tokens
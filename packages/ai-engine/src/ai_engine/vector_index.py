@@ -0,0 +1,372 @@
+"""
+Build and benchmark the ANN index on `document_chunks.embedding`.
+
+Two index types are supported, both with cosine distance:
+
+- HNSW (the default since migration 0010): a graph built from the rows
+  themselves. It needs no training, so it is correct from the first row
+  and stays accurate as documents are added. Recall is tuned per query
+  with `hnsw.ef_search`.
+- IVFFlat: vectors are assigned to `lists` clusters whose centroids are
+  computed from the rows present at build time. It builds faster and is
+  smaller, but it must be rebuilt when the corpus has grown or changed
+  shape, with `lists` sized to the row count (rows / 1000 up to 1M rows,
+  sqrt(rows) above). Recall is tuned per query with `ivfflat.probes`.
+
+`rebuild` builds the new index with CREATE INDEX CONCURRENTLY under a
+temporary name, then drops the old index concurrently and renames the new
+one into place. Ingestion keeps writing and retrieval keeps using the old
+index throughout; the only cost is disk space for two indexes while the
+new one is built.
+
+`benchmark` measures recall@k (against an exact scan with index scans
+disabled) and per-query latency of the current index over a sweep of
+probes / ef_search values. With --compare it builds an IVFFlat and an
+HNSW index in turn on the live corpus, benchmarks each, and then restores
+the index that was there before.
+
+Query vectors are sampled stored chunk embeddings by default. Pass
+--query-file (one question per line) to benchmark with real questions;
+they are embedded with RETRIEVAL_QUERY, which costs embedding quota.
+
+Usage:
+    uv run --package api python -m ai_engine.vector_index rebuild
+        [--kind hnsw|ivfflat] [--m N] [--ef-construction N] [--lists N]
+        [--maintenance-work-mem SIZE]
+    uv run --package api python -m ai_engine.vector_index benchmark
+        [--compare] [--queries N] [--query-file PATH] [--top-k N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import math
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+from database import AsyncSessionLocal, engine
+from database.models.document import DocumentChunk
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from ai_engine.clients import close_client, get_client
+from ai_engine.retrieval import TOP_K, embed_query, search_by_embedding
+
+logger = logging.getLogger(__name__)
+
+HNSW = "hnsw"
+IVFFLAT = "ivfflat"
+
+INDEX_NAMES = {
+    HNSW: "ix_document_chunks_embedding_hnsw",
+    IVFFLAT: "ix_document_chunks_embedding_ivfflat",
+}
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+# Build parameters pgvector uses when they are not given (not in reloptions)
+_PGVECTOR_DEFAULTS = {
+    HNSW: {"m": 16, "ef_construction": 64},
+    IVFFLAT: {"lists": 100},
+}
+
+_PROBES_SWEEP = (1, 2, 4, 8, 16, 32, 64, 128)
+_EF_SEARCH_SWEEP = (10, 20, 40, 80, 160, 320)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Type and build parameters of an embedding index."""
+    kind: str
+    params: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return INDEX_NAMES[self.kind]
+
+    def describe(self) -> str:
+        params = ", ".join(f"{key}={value}" for key, value in sorted(self.params.items()))
+        return f"{self.kind} ({params})"
+
+    def create_sql(self, name: str | None = None) -> str:
+        params = ", ".join(f"{key} = {int(value)}" for key, value in sorted(self.params.items()))
+        return (
+            f"CREATE INDEX CONCURRENTLY {name or self.name} ON document_chunks "
+            f"USING {self.kind} (embedding vector_cosine_ops) WITH ({params})"
+        )
+
+
+def ivfflat_lists(rows: int) -> int:
+    """Number of IVFFlat lists for `rows` vectors (pgvector's guidance)."""
+    if rows <= 1_000_000:
+        return max(rows // 1000, 1)
+    return round(math.sqrt(rows))
+
+
+def default_spec(kind: str, rows: int, *, m: int = HNSW_M,
+                 ef_construction: int = HNSW_EF_CONSTRUCTION) -> IndexSpec:
+    """Build parameters for a `kind` index over `rows` embedded chunks."""
+    if kind == IVFFLAT:
+        return IndexSpec(IVFFLAT, {"lists": ivfflat_lists(rows)})
+    return IndexSpec(HNSW, {"m": m, "ef_construction": ef_construction})
+
+
+def sweep(spec: IndexSpec, top_k: int) -> list[int]:
+    """Search parameter values to benchmark: probes or ef_search."""
+    if spec.kind == IVFFLAT:
+        lists = spec.params["lists"]
+        return sorted({p for p in _PROBES_SWEEP if p < lists} | {lists})
+    # hnsw.ef_search below k would return fewer than k rows
+    return sorted({max(ef, top_k) for ef in _EF_SEARCH_SWEEP})
+
+
+def recall_at_k(found: Sequence, exact: Sequence) -> float:
+    """Fraction of the exact top-k that the approximate search returned."""
+    if not exact:
+        return 1.0
+    return len(set(found) & set(exact)) / len(exact)
+
+
+def _parse_reloptions(options: Sequence[str] | None) -> dict[str, int]:
+    params = {}
+    for option in options or ():
+        key, _, value = option.partition("=")
+        params[key] = int(value)
+    return params
+
+
+async def count_embedded_chunks(db: AsyncSession) -> int:
+    """Rows the index holds: chunks with an embedding (near-duplicates have none)."""
+    result = await db.execute(
+        select(func.count()).select_from(DocumentChunk).where(DocumentChunk.embedding.is_not(None))
+    )
+    return result.scalar_one()
+
+
+async def current_index(db: AsyncSession) -> IndexSpec | None:
+    """The valid embedding index in place, if any."""
+    result = await db.execute(
+        text(
+            "SELECT am.amname, c.reloptions FROM pg_class c "
+            "JOIN pg_index i ON i.indexrelid = c.oid "
+            "JOIN pg_am am ON am.oid = c.relam "
+            "WHERE c.relname = ANY(:names) AND i.indisvalid"
+        ),
+        {"names": list(INDEX_NAMES.values())},
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return IndexSpec(
+        row.amname, {**_PGVECTOR_DEFAULTS[row.amname], **_parse_reloptions(row.reloptions)}
+    )
+
+
+async def rebuild_index(
+    bind: AsyncEngine, spec: IndexSpec, *, maintenance_work_mem: str | None = None
+) -> float:
+    """
+    Build `spec` concurrently and swap it in for the current embedding
+    index, without blocking writes. Returns the build time in seconds.
+    """
+    building = f"{spec.name}_new"
+    async with bind.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if maintenance_work_mem:
+            await conn.execute(
+                select(func.set_config("maintenance_work_mem", maintenance_work_mem, False))
+            )
+        try:
+            # Left INVALID by an interrupted earlier build
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {building}"))
+            logger.info("Building %s index %s", spec.describe(), building)
+            started = time.perf_counter()
+            await conn.execute(text(spec.create_sql(building)))
+            elapsed = time.perf_counter() - started
+            for name in INDEX_NAMES.values():
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            await conn.execute(text(f"ALTER INDEX {building} RENAME TO {spec.name}"))
+        finally:
+            await conn.execute(text("RESET maintenance_work_mem"))
+    logger.info("Built %s in %.1fs", spec.describe(), elapsed)
+    return elapsed
+
+
+@dataclass
+class BenchmarkResult:
+    """Recall and latency of one index at one search setting."""
+    index: str
+    setting: str
+    recall: float
+    p50_ms: float
+    p95_ms: float
+
+
+async def sample_query_embeddings(db: AsyncSession, count: int) -> list[np.ndarray]:
+    """Embeddings of `count` random chunks, used as query vectors."""
+    result = await db.execute(
+        select(DocumentChunk.embedding)
+        .where(DocumentChunk.embedding.is_not(None))
+        .order_by(func.random())
+        .limit(count)
+    )
+    return [np.asarray(embedding, dtype=np.float32) for embedding in result.scalars()]
+
+
+async def exact_neighbours(db: AsyncSession, embedding: np.ndarray, top_k: int) -> list:
+    """Chunk ids of the true top-k, from a sequential scan."""
+    await db.execute(select(func.set_config("enable_indexscan", "off", True)))
+    hits = await search_by_embedding(db, embedding, top_k, probes=None, ef_search=None)
+    await db.rollback()
+    return [hit.chunk_id for hit in hits]
+
+
+async def benchmark_index(
+    db: AsyncSession, spec: IndexSpec, queries: list[np.ndarray], top_k: int
+) -> list[BenchmarkResult]:
+    """Recall@k and latency of the current index across the parameter sweep."""
+    exact = [await exact_neighbours(db, query, top_k) for query in queries]
+    setting_name = "probes" if spec.kind == IVFFLAT else "ef_search"
+    results = []
+    for value in sweep(spec, top_k):
+        kwargs = {"probes": None, "ef_search": None, setting_name: value}
+        await search_by_embedding(db, queries[0], top_k, **kwargs)  # warm up
+        await db.rollback()
+        latencies, recalls = [], []
+        for query, truth in zip(queries, exact):
+            started = time.perf_counter()
+            hits = await search_by_embedding(db, query, top_k, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            await db.rollback()
+            recalls.append(recall_at_k([hit.chunk_id for hit in hits], truth))
+        results.append(BenchmarkResult(
+            index=spec.describe(),
+            setting=f"{setting_name}={value}",
+            recall=float(np.mean(recalls)),
+            p50_ms=float(np.percentile(latencies, 50)),
+            p95_ms=float(np.percentile(latencies, 95)),
+        ))
+    return results
+
+
+def format_results(results: Sequence[BenchmarkResult], top_k: int) -> str:
+    """Results as a plain-text table."""
+    header = ("index", "setting", f"recall@{top_k}", "p50 ms", "p95 ms")
+    rows = [
+        (r.index, r.setting, f"{r.recall:.3f}", f"{r.p50_ms:.1f}", f"{r.p95_ms:.1f}")
+        for r in results
+    ]
+    widths = [max(len(row[i]) for row in (header, *rows)) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in (header, *rows)
+    )
+
+
+async def _load_queries(args: argparse.Namespace) -> list[np.ndarray]:
+    if args.query_file:
+        questions = [
+            line.strip()
+            for line in args.query_file.read_text(encoding="utf-8").splitlines()
+            if line.strip()
+        ]
+        client = get_client()
+        return [await embed_query(question, client) for question in questions]
+    async with AsyncSessionLocal() as db:
+        return await sample_query_embeddings(db, args.queries)
+
+
+async def _benchmark(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        rows = await count_embedded_chunks(db)
+        original = await current_index(db)
+    queries = await _load_queries(args)
+    if not queries:
+        raise SystemExit("No embedded chunks to benchmark against")
+    logger.info("Benchmarking with %d queries over %d embedded chunks", len(queries), rows)
+
+    if args.compare:
+        specs = [
+            default_spec(IVFFLAT, rows),
+            default_spec(HNSW, rows, m=args.m, ef_construction=args.ef_construction),
+        ]
+    elif original is None:
+        raise SystemExit("No valid embedding index; run `rebuild` first")
+    else:
+        specs = [original]
+
+    results = []
+    for spec in specs:
+        if args.compare:
+            build_seconds = await rebuild_index(
+                engine, spec, maintenance_work_mem=args.maintenance_work_mem
+            )
+            print(f"{spec.describe()}: built in {build_seconds:.1f}s")
+        async with AsyncSessionLocal() as db:
+            results.extend(await benchmark_index(db, spec, queries, args.top_k))
+    if args.compare and original is not None and original != specs[-1]:
+        logger.info("Restoring %s", original.describe())
+        await rebuild_index(engine, original, maintenance_work_mem=args.maintenance_work_mem)
+    print(format_results(results, args.top_k))
+
+
+async def _rebuild(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        rows = await count_embedded_chunks(db)
+    spec = default_spec(args.kind, rows, m=args.m, ef_construction=args.ef_construction)
+    if args.kind == IVFFLAT and args.lists:
+        spec = IndexSpec(IVFFLAT, {"lists": args.lists})
+    logger.info("%d embedded chunks; building %s", rows, spec.describe())
+    await rebuild_index(engine, spec, maintenance_work_mem=args.maintenance_work_mem)
+    if spec.kind == IVFFLAT:
+        logger.info(
+            "Start from RETRIEVAL_IVFFLAT_PROBES=%d (sqrt of lists) and tune with `benchmark`",
+            max(round(math.sqrt(spec.params["lists"])), 1),
+        )
+
+
+def _parse_args(argv: Sequence[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--m", type=int, default=HNSW_M, help="HNSW links per node")
+    parser.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION,
+                        help="HNSW candidate list size while building")
+    parser.add_argument("--maintenance-work-mem",
+                        help="maintenance_work_mem for the build, e.g. 1GB")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild", help="rebuild the index concurrently")
+    rebuild.add_argument("--kind", choices=(HNSW, IVFFLAT), default=HNSW)
+    rebuild.add_argument("--lists", type=int,
+                         help="IVFFlat lists (default: derived from the row count)")
+
+    benchmark = commands.add_parser("benchmark", help="measure recall and latency")
+    benchmark.add_argument("--compare", action="store_true",
+                           help="build and benchmark both IVFFlat and HNSW")
+    benchmark.add_argument("--queries", type=int, default=100,
+                           help="number of sampled chunk embeddings to query with")
+    benchmark.add_argument("--query-file", type=Path,
+                           help="questions to embed and query with, one per line")
+    benchmark.add_argument("--top-k", type=int, default=TOP_K)
+    return parser.parse_args(argv)
+
+
+async def main(argv: Sequence[str] | None = None) -> None:
+    args = _parse_args(argv)
+    try:
+        if args.command == "rebuild":
+            await _rebuild(args)
+        else:
+            await _benchmark(args)
+    finally:
+        await close_client()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,270 @@
+"""
+Ingestion worker.
+
+Claims Document ids from a JobQueue and runs ingest_pdf on the stored
+upload. While a job runs, the worker heartbeats its visibility deadline
+and publishes per-stage progress. If the claim is lost (the deadline
+passed and the job may have gone to another worker), the attempt is
+cancelled and its transaction rolled back. When the job ends it moves the Document
+to INDEXED or FAILED.
+
+Failures are retried with exponential backoff until INGEST_MAX_ATTEMPTS is
+reached. Errors that cannot succeed on retry (no extractable text, an
+unreadable PDF, a missing upload) fail the document at once. An attempt
+runs in one transaction, so a failed one leaves nothing behind.
+
+A document that already has chunks (an amended file uploaded as a new
+version) keeps serving them until the job commits; ingest_pdf then writes
+only the chunks that changed.
+
+A retried or redelivered job resumes rather than restarts: extracted pages
+and embedded batches were checkpointed to the page and embedding caches as
+they completed, so the next attempt only calls Gemini for the pages that
+failed (PageExtractionError) or were never reached.
+
+Run dedicated workers (any number of processes or hosts) with:
+    uv run --package api python -m ai_engine.worker
+
+Environment variables:
+    INGEST_WORKER_CONCURRENCY  — jobs processed at once per process (default: 1)
+    INGEST_POLL_INTERVAL       — seconds between polls of an empty queue (default: 1)
+    INGEST_RETRY_DELAY         — backoff before the first retry, in seconds (default: 10)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+import signal
+import uuid
+
+from database import AsyncSessionLocal
+from database.models.document import Document, DocumentPage, DocumentStatus
+from google import genai
+from pypdf.errors import PyPdfError
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ai_engine.cache import (
+    DatabaseEmbeddingCache,
+    DatabasePageCache,
+    EmbeddingCache,
+    PageCache,
+)
+from ai_engine.clients import close_client
+from ai_engine.ingest import ingest_pdf
+from ai_engine.jobs import (
+    MAX_ATTEMPTS,
+    VISIBILITY_TIMEOUT,
+    JobQueue,
+    get_job_queue,
+    upload_path,
+)
+
+logger = logging.getLogger(__name__)
+
+_WORKER_CONCURRENCY = int(os.getenv("INGEST_WORKER_CONCURRENCY", "1"))
+_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "1"))
+_RETRY_DELAY = float(os.getenv("INGEST_RETRY_DELAY", "10"))
+
+# Retrying these cannot help
+_PERMANENT_ERRORS = (ValueError, FileNotFoundError, PyPdfError)
+
+
+class IngestionWorker:
+    """Processes ingestion jobs from a queue, one at a time."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        client: genai.Client | None = None,
+        page_cache: PageCache | None = None,
+        embedding_cache: EmbeddingCache | None = None,
+        visibility_timeout: float = VISIBILITY_TIMEOUT,
+        max_attempts: int = MAX_ATTEMPTS,
+        poll_interval: float = _POLL_INTERVAL,
+    ):
+        self._queue = queue
+        self._session_factory = session_factory
+        self._client = client
+        self._page_cache = page_cache
+        self._embedding_cache = embedding_cache
+        self._visibility_timeout = visibility_timeout
+        self._max_attempts = max_attempts
+        self._poll_interval = poll_interval
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Process jobs until `stop` is set."""
+        while not stop.is_set():
+            try:
+                worked = await self.run_once()
+            except Exception:
+                logger.exception("Ingestion worker poll failed")
+                worked = False
+            if not worked:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(stop.wait(), self._poll_interval)
+
+    async def run_once(self) -> bool:
+        """Claim and process one job. Returns False if there was none."""
+        requeued = await self._queue.requeue_expired()
+        if requeued:
+            logger.warning("Requeued %d ingestion jobs whose visibility timed out", requeued)
+        job_id = await self._queue.claim(self._visibility_timeout)
+        if job_id is None:
+            return False
+
+        process = asyncio.create_task(self._process(job_id))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, process))
+        try:
+            retry_delay = await process
+        except asyncio.CancelledError:
+            # Only a heartbeat that lost the claim ends on its own
+            if asyncio.current_task().cancelling() or not heartbeat.done():
+                raise
+            return True
+        finally:
+            heartbeat.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await heartbeat
+        # Only now: a heartbeat landing after a release would push the retry
+        # back to the full visibility timeout, and one after an ack would
+        # find the claim gone
+        if retry_delay is None:
+            await self._queue.ack(job_id)
+        else:
+            await self._queue.release(job_id, retry_delay)
+        return True
+
+    async def _heartbeat(self, job_id: str, process: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self._visibility_timeout / 3)
+            try:
+                extended = await self._queue.extend(job_id, self._visibility_timeout)
+            except Exception:
+                # The deadline may still be far off; try again next beat
+                logger.warning("Could not extend ingestion job %s", job_id, exc_info=True)
+                continue
+            if not extended:
+                # Another worker may own the job now; two writers of one
+                # document must not both commit, so drop this attempt
+                logger.warning("Lost the claim on ingestion job %s; abandoning it", job_id)
+                process.cancel()
+                return
+
+    async def _process(self, job_id: str) -> float | None:
+        """
+        Run one attempt. Returns the delay after which the job should be
+        retried, or None if it is finished (indexed, failed or obsolete).
+        """
+        attempt = await self._queue.record_attempt(job_id)
+        document_id = uuid.UUID(job_id)
+        path = upload_path(document_id)
+        if attempt > 1:
+            logger.info("Resuming ingestion of document %s (attempt %d)", document_id, attempt)
+        else:
+            logger.info("Ingesting document %s", document_id)
+
+        try:
+            async with self._session_factory() as db:
+                doc = await db.get(Document, document_id)
+                if doc is None or doc.status == DocumentStatus.INDEXED:
+                    # Deleted meanwhile, or a duplicate delivery of a finished job
+                    return None
+
+                if not await asyncio.to_thread(path.is_file):
+                    raise FileNotFoundError(f"Upload of document {document_id} is missing")
+                # Page text is rewritten in full; chunks are diffed by ingest_pdf
+                await db.execute(
+                    delete(DocumentPage).where(DocumentPage.document_id == document_id)
+                )
+                result = await ingest_pdf(
+                    path, document_id, db,
+                    client=self._client,
+                    page_cache=self._page_cache,
+                    embedding_cache=self._embedding_cache,
+                    progress=functools.partial(self._report_progress, job_id),
+                )
+                doc.status = DocumentStatus.INDEXED
+                await db.commit()
+        except Exception as exc:
+            if not isinstance(exc, _PERMANENT_ERRORS) and attempt < self._max_attempts:
+                delay = _RETRY_DELAY * 2 ** (attempt - 1)
+                logger.warning(
+                    "Ingestion of document %s failed (%s); retrying in %.0fs",
+                    document_id, exc, delay, exc_info=True,
+                )
+                return delay
+            logger.exception("Ingestion failed for document %s", document_id)
+            await self._queue.set_error(job_id, f"{type(exc).__name__}: {exc}")
+            await self._mark_failed(document_id)
+            return None
+
+        await asyncio.to_thread(path.unlink, missing_ok=True)
+        logger.info(
+            "Document %s indexed with %d chunks (%d kept, %d deleted, %d near-duplicates; "
+            "%d pages local, %d cached, %d via Gemini; %d embeddings cached)",
+            document_id, result.chunk_count, result.chunks_reused, result.chunks_deleted,
+            result.chunks_linked,
+            result.pages_local, result.pages_cached, result.pages_remote,
+            result.embeddings_cached,
+        )
+        return None
+
+    async def _report_progress(self, job_id: str, stage: str, done: int, total: int) -> None:
+        # Advisory only: a failed write must not abort the ingestion
+        try:
+            await self._queue.set_progress(job_id, stage, done, total)
+        except Exception:
+            logger.warning("Could not record progress of job %s", job_id, exc_info=True)
+
+    async def _mark_failed(self, document_id: uuid.UUID) -> None:
+        async with self._session_factory() as db:
+            doc = await db.get(Document, document_id)
+            if doc is not None:
+                doc.status = DocumentStatus.FAILED
+                await db.commit()
+
+
+def build_workers(
+    count: int = _WORKER_CONCURRENCY,
+    page_cache: PageCache | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+) -> list[IngestionWorker]:
+    """Workers wired to the shared queue, database and caches."""
+    queue = get_job_queue()
+    if page_cache is None:
+        page_cache = DatabasePageCache(AsyncSessionLocal)
+    if embedding_cache is None:
+        embedding_cache = DatabaseEmbeddingCache(AsyncSessionLocal)
+    return [
+        IngestionWorker(
+            queue, AsyncSessionLocal,
+            page_cache=page_cache, embedding_cache=embedding_cache,
+        )
+        for _ in range(max(count, 1))
+    ]
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    workers = build_workers()
+    logger.info("Starting %d ingestion workers", len(workers))
+    try:
+        await asyncio.gather(*(worker.run(stop) for worker in workers))
+    finally:
+        await close_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
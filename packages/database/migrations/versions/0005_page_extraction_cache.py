@@ -0,0 +1,28 @@
+"""Add page_extraction_cache for content-addressed page text reuse.
+
+Revision ID: 0005_page_extraction_cache
+Revises: 0004_data_quality_constraints
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision: str = "0005_page_extraction_cache"
+down_revision: str | None = "0004_data_quality_constraints"
+branch_labels: str | tuple[str, ...] | None = None
+depends_on: str | tuple[str, ...] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "page_extraction_cache",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("text", sa.Text, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("page_extraction_cache")
@@ -0,0 +1,31 @@
+"""Add embedding_cache for reusing chunk embeddings across ingestions.
+
+Revision ID: 0006_embedding_cache
+Revises: 0005_page_extraction_cache
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers
+revision: str = "0006_embedding_cache"
+down_revision: str | None = "0005_page_extraction_cache"
+branch_labels: str | tuple[str, ...] | None = None
+depends_on: str | tuple[str, ...] | None = None
+
+EMBEDDING_DIM = 1024
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_cache",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("embedding", Vector(EMBEDDING_DIM), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_cache")
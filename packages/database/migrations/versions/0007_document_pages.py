@@ -0,0 +1,32 @@
+"""Add document_pages to keep extracted page text for offline re-chunking.
+
+Revision ID: 0007_document_pages
+Revises: 0006_embedding_cache
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision: str = "0007_document_pages"
+down_revision: str | None = "0006_embedding_cache"
+branch_labels: str | tuple[str, ...] | None = None
+depends_on: str | tuple[str, ...] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "document_pages",
+        sa.Column("document_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("page_number", sa.Integer, primary_key=True),
+        sa.Column("text", sa.Text, nullable=False),
+        sa.Column("source", sa.String(16), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("document_pages")
@@ -0,0 +1,44 @@
+"""Add chunk content hashes and document versions for incremental re-ingestion.
+
+Revision ID: 0008_chunk_content_hash
+Revises: 0007_document_pages
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision: str = "0008_chunk_content_hash"
+down_revision: str | None = "0007_document_pages"
+branch_labels: str | tuple[str, ...] | None = None
+depends_on: str | tuple[str, ...] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "documents",
+        sa.Column("version", sa.Integer, nullable=False, server_default="1"),
+    )
+
+    op.add_column("document_chunks", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.execute(
+        "UPDATE document_chunks "
+        "SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')"
+    )
+    op.alter_column("document_chunks", "content_hash", nullable=False)
+    op.create_index(
+        "ix_document_chunks_document_content_hash",
+        "document_chunks",
+        ["document_id", "content_hash"],
+    )
+    # Leave room on each page so metadata-only updates of kept chunks can be
+    # HOT updates, which do not touch the embedding index
+    op.execute("ALTER TABLE document_chunks SET (fillfactor = 90)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE document_chunks RESET (fillfactor)")
+    op.drop_index("ix_document_chunks_document_content_hash", table_name="document_chunks")
+    op.drop_column("document_chunks", "content_hash")
+    op.drop_column("documents", "version")
@@ -0,0 +1,93 @@
+"""Link near-duplicate chunks to a canonical chunk instead of embedding them.
+
+Revision ID: 0009_near_duplicate_chunks
+Revises: 0008_chunk_content_hash
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision: str = "0009_near_duplicate_chunks"
+down_revision: str | None = "0008_chunk_content_hash"
+branch_labels: str | tuple[str, ...] | None = None
+depends_on: str | tuple[str, ...] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("document_chunks", sa.Column("minhash", sa.LargeBinary, nullable=True))
+    op.add_column(
+        "document_chunks",
+        sa.Column("lsh_bands", postgresql.ARRAY(sa.BigInteger), nullable=True),
+    )
+    op.add_column(
+        "document_chunks",
+        sa.Column(
+            "canonical_chunk_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey(
+                "document_chunks.id",
+                name="fk_document_chunks_canonical_chunk_id",
+                deferrable=True,
+                initially="DEFERRED",
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_document_chunks_canonical_chunk_id", "document_chunks", ["canonical_chunk_id"]
+    )
+    op.create_index(
+        "ix_document_chunks_lsh_bands", "document_chunks", ["lsh_bands"],
+        postgresql_using="gin",
+    )
+
+    # When a canonical chunk is deleted (stale after a new version, or with
+    # its document), its duplicates take over its embedding and become
+    # canonical. Statement-level, so duplicates deleted by the same
+    # statement (e.g. the same document) are already gone. Mirrored in
+    # database.models.document for schemas built with create_all.
+    op.execute(
+        """
+        CREATE FUNCTION promote_near_duplicate_chunks() RETURNS trigger AS $$
+        BEGIN
+            UPDATE document_chunks AS d
+            SET embedding = o.embedding, canonical_chunk_id = NULL
+            FROM deleted_chunks AS o
+            WHERE d.canonical_chunk_id = o.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_document_chunks_promote_near_duplicates
+        AFTER DELETE ON document_chunks
+        REFERENCING OLD TABLE AS deleted_chunks
+        FOR EACH STATEMENT EXECUTE FUNCTION promote_near_duplicate_chunks()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "DROP TRIGGER IF EXISTS trg_document_chunks_promote_near_duplicates ON document_chunks"
+    )
+    op.execute("DROP FUNCTION IF EXISTS promote_near_duplicate_chunks()")
+    # Give duplicates their canonical chunk's embedding before the link goes
+    op.execute(
+        """
+        UPDATE document_chunks AS d
+        SET embedding = c.embedding
+        FROM document_chunks AS c
+        WHERE d.canonical_chunk_id = c.id
+        """
+    )
+    op.drop_index("ix_document_chunks_lsh_bands", table_name="document_chunks")
+    op.drop_index("ix_document_chunks_canonical_chunk_id", table_name="document_chunks")
+    op.drop_column("document_chunks", "canonical_chunk_id")
+    op.drop_column("document_chunks", "lsh_bands")
+    op.drop_column("document_chunks", "minhash")
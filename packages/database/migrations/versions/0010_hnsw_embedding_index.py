@@ -0,0 +1,57 @@
+"""Replace the IVFFlat embedding index with HNSW, built concurrently.
+
+The IVFFlat index from 0001 was built when the table was empty, so its
+list centroids describe no data at all, and `lists = 100` was never
+related to the number of rows. HNSW needs no training step: the graph is
+built from the rows themselves and stays accurate as chunks are added,
+which suits a corpus that grows one upload at a time.
+
+Both statements run outside the migration transaction (CONCURRENTLY), so
+ingestion keeps writing while the index is built. To rebuild with other
+parameters, or to switch back to IVFFlat with `lists` derived from the
+row count, use `python -m ai_engine.vector_index`.
+
+Revision ID: 0010_hnsw_embedding_index
+Revises: 0009_near_duplicate_chunks
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers
+revision: str = "0010_hnsw_embedding_index"
+down_revision: str | None = "0009_near_duplicate_chunks"
+branch_labels: str | tuple[str, ...] | None = None
+depends_on: str | tuple[str, ...] | None = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # A failed concurrent build leaves an INVALID index behind; start clean
+        op.execute(sa.text(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_document_chunks_embedding_hnsw"
+        ))
+        op.execute(sa.text(
+            "CREATE INDEX CONCURRENTLY ix_document_chunks_embedding_hnsw "
+            "ON document_chunks USING hnsw (embedding vector_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        ))
+        op.execute(sa.text(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_document_chunks_embedding_ivfflat"
+        ))
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(sa.text(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_document_chunks_embedding_ivfflat"
+        ))
+        op.execute(sa.text(
+            "CREATE INDEX CONCURRENTLY ix_document_chunks_embedding_ivfflat "
+            "ON document_chunks USING ivfflat (embedding vector_cosine_ops) "
+            "WITH (lists = 100)"
+        ))
+        op.execute(sa.text(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_document_chunks_embedding_hnsw"
+        ))
@@ -3,9 +3,19 @@ database package — public API.
 
 Import from here in other packages:
     from database import get_session, get_redis, redis_client
+    from database import ChunkRow, PageRow, bulk_insert_chunks, bulk_insert_pages
     from database.models import BaUser, BaSession, Document, ChatSession, Message, Feedback
 """
 
+from database.bulk import (
+    ChunkRow,
+    PageRow,
+    bulk_insert_chunks,
+    bulk_insert_pages,
+    chunk_content_hash,
+    delete_chunks,
+    update_chunk_metadata,
+)
 from database.db import AsyncSessionLocal, engine, get_session, init_db
 from database.models import (
     BaSession,
@@ -13,10 +23,18 @@ from database.models import (
     ChatSession,
     Document,
     DocumentChunk,
+    DocumentPage,
+    EmbeddingCacheEntry,
     Feedback,
     Message,
+    PageExtraction,
+)
+from database.redis_client import (
+    get_redis,
+    ping_redis,
+    redis_binary_client,
+    redis_client,
 )
-from database.redis_client import get_redis, ping_redis, redis_client
 
 __all__ = [
     # Engine / session
@@ -24,8 +42,17 @@ __all__ = [
     "AsyncSessionLocal",
     "get_session",
     "init_db",
+    # Bulk writes
+    "ChunkRow",
+    "PageRow",
+    "bulk_insert_chunks",
+    "bulk_insert_pages",
+    "chunk_content_hash",
+    "delete_chunks",
+    "update_chunk_metadata",
     # Redis
     "redis_client",
+    "redis_binary_client",
     "get_redis",
     "ping_redis",
     # ORM models
@@ -33,6 +60,9 @@ __all__ = [
     "BaSession",
     "Document",
     "DocumentChunk",
+    "DocumentPage",
+    "PageExtraction",
+    "EmbeddingCacheEntry",
     "ChatSession",
     "Message",
     "Feedback",
@@ -0,0 +1,257 @@
+"""
+Bulk write paths for large row sets.
+
+Adding one ORM object per chunk costs unit-of-work bookkeeping per row and
+sends each 1024-float vector as a text literal in its own parameter set.
+`bulk_insert_chunks` instead streams rows straight into `document_chunks`:
+
+- asyncpg: binary COPY, with vectors encoded in pgvector's binary format
+- other drivers: one multi-row INSERT per batch
+
+Every chunk is stored with the SHA-256 of its content (`chunk_content_hash`),
+which lets a re-ingested version of a document keep the rows of unchanged
+chunks. For those, `update_chunk_metadata` rewrites only the jsonb metadata
+(no indexed column changes, so PostgreSQL can update the row in place
+without touching the embedding index) and `delete_chunks` removes the rows
+whose content is gone.
+
+`bulk_insert_pages` stores a document's extracted page text in
+`document_pages` with multi-row INSERTs (a few hundred short rows, so COPY
+would not pay off).
+
+Rows are written on the session's own connection, so they are part of the
+caller's transaction and are rolled back with it.
+
+Usage:
+    from database import ChunkRow, bulk_insert_chunks
+
+    await bulk_insert_chunks(session, document_id, [
+        ChunkRow(chunk_index=0, content="...", embedding=vec, metadata={"pages": [1]}),
+    ])
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import uuid
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timezone
+from typing import Any, NamedTuple
+
+from pgvector import Vector
+from sqlalchemy import bindparam, delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models.document import DocumentChunk, DocumentPage
+
+# Schema the pgvector extension was created in (CREATE EXTENSION vector)
+_VECTOR_SCHEMA = "public"
+# Rows per multi-row INSERT on the fallback path
+_INSERT_BATCH_SIZE = 500
+
+_COPY_COLUMNS = [
+    "id", "document_id", "chunk_index", "content", "content_hash", "embedding", "chunk_metadata",
+    "minhash", "lsh_bands", "canonical_chunk_id", "created_at",
+]
+
+
+class ChunkRow(NamedTuple):
+    """
+    One document chunk to insert. `embedding` may be a list or ndarray, and
+    is None for a near-duplicate linked to `canonical_id`. Without `id` a
+    fresh one is generated.
+    """
+    chunk_index: int
+    content: str
+    embedding: Sequence[float] | Any | None
+    metadata: dict | None = None
+    id: uuid.UUID | None = None
+    minhash: bytes | None = None
+    lsh_bands: list[int] | None = None
+    canonical_id: uuid.UUID | None = None
+
+
+class PageRow(NamedTuple):
+    """Extracted text of one page to insert."""
+    page_number: int
+    text: str
+    source: str
+
+
+def encode_vector(value: Sequence[float] | Any) -> bytes:
+    """Encode a vector in pgvector's binary wire format (dim, unused, float4s)."""
+    return Vector(value).to_binary()
+
+
+def chunk_content_hash(content: str) -> str:
+    """SHA-256 hex digest of a chunk's text, as stored in `content_hash`."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+async def bulk_insert_chunks(
+    session: AsyncSession,
+    document_id: uuid.UUID,
+    rows: Iterable[ChunkRow],
+) -> int:
+    """
+    Insert chunks of one document in bulk.
+
+    Pending ORM changes are flushed first so the parent Document row exists
+    for the foreign key.
+
+    Returns:
+        Number of rows inserted.
+    """
+    await session.flush()
+    conn = await session.connection()
+    if conn.dialect.driver == "asyncpg":
+        return await _copy_chunks(conn, document_id, rows)
+    return await _insert_chunks(conn, document_id, rows)
+
+
+async def bulk_insert_pages(
+    session: AsyncSession,
+    document_id: uuid.UUID,
+    rows: Iterable[PageRow],
+) -> int:
+    """
+    Insert the extracted pages of one document in bulk.
+
+    Returns:
+        Number of rows inserted.
+    """
+    await session.flush()
+    conn = await session.connection()
+    return await _insert_batches(conn, DocumentPage.__table__, (
+        {
+            "document_id": document_id,
+            "page_number": row.page_number,
+            "text": row.text,
+            "source": row.source,
+            "created_at": datetime.now(timezone.utc),
+        }
+        for row in rows
+    ))
+
+
+async def update_chunk_metadata(
+    session: AsyncSession,
+    updates: Iterable[tuple[uuid.UUID, dict | None]],
+) -> int:
+    """
+    Replace the metadata of existing chunks, given (chunk id, metadata) pairs.
+
+    Returns:
+        Number of rows updated.
+    """
+    params = [{"chunk_id": chunk_id, "metadata": metadata} for chunk_id, metadata in updates]
+    if not params:
+        return 0
+    table = DocumentChunk.__table__
+    await session.flush()
+    conn = await session.connection()
+    await conn.execute(
+        update(table)
+        .where(table.c.id == bindparam("chunk_id"))
+        .values(chunk_metadata=bindparam("metadata")),
+        params,
+    )
+    return len(params)
+
+
+async def delete_chunks(session: AsyncSession, chunk_ids: Iterable[uuid.UUID]) -> int:
+    """
+    Delete chunks by id, in batches of _INSERT_BATCH_SIZE.
+
+    Returns:
+        Number of ids passed.
+    """
+    ids = list(chunk_ids)
+    if not ids:
+        return 0
+    table = DocumentChunk.__table__
+    await session.flush()
+    conn = await session.connection()
+    for start in range(0, len(ids), _INSERT_BATCH_SIZE):
+        batch = ids[start:start + _INSERT_BATCH_SIZE]
+        await conn.execute(delete(table).where(table.c.id.in_(batch)))
+    return len(ids)
+
+
+async def _copy_chunks(conn, document_id: uuid.UUID, rows: Iterable[ChunkRow]) -> int:
+    """Binary COPY through the session's underlying asyncpg connection."""
+    created_at = datetime.now(timezone.utc)
+    records = [
+        (
+            row.id or uuid.uuid4(),
+            document_id,
+            row.chunk_index,
+            row.content,
+            chunk_content_hash(row.content),
+            row.embedding,
+            # The jsonb codec takes JSON text
+            json.dumps(row.metadata) if row.metadata is not None else None,
+            row.minhash,
+            row.lsh_bands,
+            row.canonical_id,
+            created_at,
+        )
+        for row in rows
+    ]
+    if not records:
+        return 0
+
+    raw = await conn.get_raw_connection()
+    pg = raw.driver_connection
+    # COPY is binary-only in asyncpg, and vector has no built-in binary codec.
+    # The codec is removed again afterwards because the ORM binds vectors as
+    # text on this (pooled) connection.
+    await pg.set_type_codec(
+        "vector",
+        schema=_VECTOR_SCHEMA,
+        encoder=encode_vector,
+        decoder=Vector.from_binary,
+        format="binary",
+    )
+    try:
+        await pg.copy_records_to_table(
+            DocumentChunk.__tablename__, records=records, columns=_COPY_COLUMNS
+        )
+    finally:
+        await pg.reset_type_codec("vector", schema=_VECTOR_SCHEMA)
+    return len(records)
+
+
+async def _insert_chunks(conn, document_id: uuid.UUID, rows: Iterable[ChunkRow]) -> int:
+    """Multi-row INSERT in batches of _INSERT_BATCH_SIZE."""
+    return await _insert_batches(conn, DocumentChunk.__table__, (
+        {
+            "id": row.id or uuid.uuid4(),
+            "document_id": document_id,
+            "chunk_index": row.chunk_index,
+            "content": row.content,
+            "content_hash": chunk_content_hash(row.content),
+            "embedding": row.embedding,
+            "chunk_metadata": row.metadata,
+            "minhash": row.minhash,
+            "lsh_bands": row.lsh_bands,
+            "canonical_chunk_id": row.canonical_id,
+        }
+        for row in rows
+    ))
+
+
+async def _insert_batches(conn, table, rows: Iterable[dict]) -> int:
+    count = 0
+    batch: list[dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == _INSERT_BATCH_SIZE:
+            await conn.execute(insert(table).values(batch))
+            count += len(batch)
+            batch = []
+    if batch:
+        await conn.execute(insert(table).values(batch))
+        count += len(batch)
+    return count
@@ -1,6 +1,7 @@
 from .auth import BaSession, BaUser
+from .cache import EmbeddingCacheEntry, PageExtraction
 from .customer import CuSession, CuUser
-from .document import Document, DocumentChunk
+from .document import Document, DocumentChunk, DocumentPage
 from .session import ChatSession, Feedback, Message
 
 __all__ = [
@@ -10,6 +11,9 @@ __all__ = [
     "CuSession",
     "Document",
     "DocumentChunk",
+    "DocumentPage",
+    "PageExtraction",
+    "EmbeddingCacheEntry",
     "ChatSession",
     "Message",
     "Feedback",
@@ -0,0 +1,51 @@
+"""
+Content-addressed caches for the ingestion pipeline.
+
+- PageExtraction: Gemini-extracted text of a PDF page, keyed by a hash of
+  the page content plus the extraction prompt/model version. Re-uploading a
+  revised document only pays for pages that actually changed.
+- EmbeddingCacheEntry: a normalized embedding keyed by a hash of the text,
+  model, output dimension and task type, so unchanged chunks are never
+  re-embedded.
+"""
+
+from datetime import datetime, timezone
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import DateTime, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.base import Base
+from database.models.document import EMBEDDING_DIM
+
+
+class PageExtraction(Base):
+    """Cached extraction result for one PDF page."""
+
+    __tablename__ = "page_extraction_cache"
+
+    # SHA-256 of (page content fingerprint, extractor version)
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self) -> str:
+        return f"<PageExtraction key={self.key[:12]} chars={len(self.text)}>"
+
+
+class EmbeddingCacheEntry(Base):
+    """Cached embedding for one piece of text."""
+
+    __tablename__ = "embedding_cache"
+
+    # SHA-256 of (model, output dimension, task type, text)
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    embedding: Mapped[list[float]] = mapped_column(Vector(EMBEDDING_DIM), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self) -> str:
+        return f"<EmbeddingCacheEntry key={self.key[:12]}>"
@@ -2,7 +2,10 @@
 Document and DocumentChunk ORM models.
 
 - Document: represents an ingested regulatory PDF from mor.gov.et
-- DocumentChunk: a 1024-token chunk of text + its pgvector embedding
+- DocumentChunk: a 1024-token chunk of text + its pgvector embedding, or a
+  link to the canonical chunk it near-duplicates
+- DocumentPage: the extracted text of one page, so chunks can be rebuilt
+  without extracting the PDF again
 """
 
 import uuid
@@ -11,16 +14,20 @@ from enum import Enum as PyEnum
 
 from pgvector.sqlalchemy import Vector
 from sqlalchemy import (
+    DDL,
+    BigInteger,
     DateTime,
     Enum,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     UniqueConstraint,
+    event,
 )
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database.base import Base
@@ -45,6 +52,8 @@ class Document(Base):
     # SHA-256 of the raw file bytes — used for deduplication
     file_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
     language: Mapped[str] = mapped_column(String(8), nullable=False, default="am")
+    # Bumped each time an amended file replaces this document's content
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     status: Mapped[str] = mapped_column(
         Enum(DocumentStatus, name="document_status", values_callable=lambda e: [m.value for m in e]),
         nullable=False,
@@ -60,10 +69,13 @@ class Document(Base):
         onupdate=lambda: datetime.now(timezone.utc),
     )
 
-    # Relationship
+    # Relationships
     chunks: Mapped[list["DocumentChunk"]] = relationship(
         "DocumentChunk", back_populates="document", cascade="all, delete-orphan"
     )
+    pages: Mapped[list["DocumentPage"]] = relationship(
+        "DocumentPage", back_populates="document", cascade="all, delete-orphan"
+    )
 
     __table_args__ = (
         UniqueConstraint("file_hash", name="uq_documents_file_hash"),
@@ -95,9 +107,25 @@ class DocumentChunk(Base):
         nullable=False,
         index=True,
     )
+    # Unique per document. Chunks kept across versions keep their index, so
+    # reading order is given by chunk_metadata["char_start"]
     chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    # SHA-256 of `content` — matches chunks across versions of a document
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # NULL for near-duplicates, which share the embedding of their canonical chunk
     embedding: Mapped[list[float]] = mapped_column(Vector(EMBEDDING_DIM), nullable=True)
+    # Near-duplicate detection (see ai_engine.dedup): MinHash signature
+    # (uint32 values), its hashed LSH bands, and the chunk this one duplicates
+    minhash: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    lsh_bands: Mapped[list[int] | None] = mapped_column(ARRAY(BigInteger), nullable=True)
+    canonical_chunk_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        # Deferred: a canonical chunk may be written after its duplicates
+        ForeignKey("document_chunks.id", deferrable=True, initially="DEFERRED"),
+        nullable=True,
+        index=True,
+    )
     # Extra metadata: page_number, section_title, etc.
     chunk_metadata: Mapped[dict] = mapped_column(JSONB, nullable=True, default=dict)
     created_at: Mapped[datetime] = mapped_column(
@@ -108,13 +136,23 @@ class DocumentChunk(Base):
     document: Mapped["Document"] = relationship("Document", back_populates="chunks")
 
     __table_args__ = (
-        # Approximate Nearest Neighbour index (IVFFlat, cosine similarity)
-        # Created AFTER initial data load for best performance:
-        #   CREATE INDEX ON document_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
-        Index("ix_document_chunks_embedding_ivfflat", "embedding", postgresql_using="ivfflat"),
+        # Approximate Nearest Neighbour index (HNSW, cosine similarity), as
+        # created by migration 0010. Without the opclass, cosine (<=>)
+        # queries could not use it. HNSW has no training step, so building
+        # it on an empty table is fine; `python -m ai_engine.vector_index`
+        # rebuilds it (or an IVFFlat index sized to the row count) online.
+        Index(
+            "ix_document_chunks_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+            postgresql_with={"m": 16, "ef_construction": 64},
+        ),
         # GIN trigram index for fuzzy text search on the content column
         Index("ix_document_chunks_content_trgm", "content", postgresql_using="gin",
               postgresql_ops={"content": "gin_trgm_ops"}),
+        Index("ix_document_chunks_document_content_hash", "document_id", "content_hash"),
+        Index("ix_document_chunks_lsh_bands", "lsh_bands", postgresql_using="gin"),
         UniqueConstraint(
             "document_id",
             "chunk_index",
@@ -124,3 +162,69 @@ class DocumentChunk(Base):
 
     def __repr__(self) -> str:
         return f"<DocumentChunk id={self.id} doc={self.document_id} idx={self.chunk_index}>"
+
+
+# When a canonical chunk is deleted (stale after a new version, re-chunked,
+# or with its document), its duplicates take over its embedding and become
+# canonical; without this the deferred FK fails at commit. Statement-level,
+# so duplicates deleted by the same statement are already gone. Created by
+# migration 0009; attached here so `create_all` (init_db, tests) matches.
+event.listen(
+    DocumentChunk.__table__,
+    "after_create",
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION promote_near_duplicate_chunks() RETURNS trigger AS $$
+        BEGIN
+            UPDATE document_chunks AS d
+            SET embedding = o.embedding, canonical_chunk_id = NULL
+            FROM deleted_chunks AS o
+            WHERE d.canonical_chunk_id = o.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    DocumentChunk.__table__,
+    "after_create",
+    DDL(
+        """
+        CREATE TRIGGER trg_document_chunks_promote_near_duplicates
+        AFTER DELETE ON document_chunks
+        REFERENCING OLD TABLE AS deleted_chunks
+        FOR EACH STATEMENT EXECUTE FUNCTION promote_near_duplicate_chunks()
+        """
+    ).execute_if(dialect="postgresql"),
+)
+
+
+class DocumentPage(Base):
+    """
+    Extracted text of one page of a Document.
+
+    Written once at ingestion so that re-chunking and re-embedding (see
+    ai_engine.rechunk) never need Gemini again. `source` records where the
+    text came from: text_layer, cache or gemini.
+    """
+
+    __tablename__ = "document_pages"
+
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("documents.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    page_number: Mapped[int] = mapped_column(Integer, primary_key=True)  # 1-indexed
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    source: Mapped[str] = mapped_column(String(16), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+    # Relationship
+    document: Mapped["Document"] = relationship("Document", back_populates="pages")
+
+    def __repr__(self) -> str:
+        return f"<DocumentPage doc={self.document_id} page={self.page_number}>"
@@ -1,9 +1,11 @@
 """
 Async Redis client for session storage and rate-limiting.
 
-Two use cases:
+Use cases:
   1. IP rate-limit counters — keyed by "rate:{ip}"
   2. Scraper coordination keys — keyed by "scraper:*"
+  3. Binary values such as cached embeddings — through `redis_binary_client`,
+     which returns bytes instead of decoded strings
 
 Environment variables:
     REDIS_URL  — Redis connection URL (default: redis://localhost:6379/0)
@@ -41,6 +43,14 @@ _pool = aioredis.ConnectionPool.from_url(
 
 redis_client: aioredis.Redis = aioredis.Redis(connection_pool=_pool)
 
+# Same server, raw bytes in and out (e.g. float32 vectors)
+_binary_pool = aioredis.ConnectionPool.from_url(
+    _REDIS_URL,
+    max_connections=50,
+)
+
+redis_binary_client: aioredis.Redis = aioredis.Redis(connection_pool=_binary_pool)
+
 # ---------------------------------------------------------------------------
 # TTL constants
 # ---------------------------------------------------------------------------
@@ -101,6 +101,22 @@ class TestAdminLogs:
         assert len(data["logs"]) >= 1  # at least the "no messages" fallback
 
 
+class TestIngestionCacheStats:
+    async def test_unauthenticated_returns_401(self, client):
+        response = await client.get("/v1/admin/ingestion/cache-stats")
+        assert response.status_code == 401
+
+    async def test_authenticated_returns_counters(self, client, admin_session):
+        response = await client.get(
+            "/v1/admin/ingestion/cache-stats",
+            headers={"Authorization": f"Bearer {admin_session.token}"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data["embedding_cache"]) == {"hits", "misses"}
+        assert set(data["page_cache"]) == {"hits", "misses"}
+
+
 class TestAdminUpload:
     async def test_unauthenticated_returns_401(self, client):
         response = await client.post("/v1/admin/upload")
@@ -114,6 +130,141 @@ class TestAdminUpload:
         )
         assert response.status_code == 403
 
+    @pytest.fixture
+    def queue(self, tmp_path, monkeypatch):
+        import ai_engine.jobs as jobs_module
+        from ai_engine.jobs import InMemoryJobQueue, get_job_queue
+
+        from apps.api.main import app
+
+        monkeypatch.setattr(jobs_module, "STORAGE_DIR", tmp_path)
+        queue = InMemoryJobQueue()
+        app.dependency_overrides[get_job_queue] = lambda: queue
+        yield queue
+        app.dependency_overrides.pop(get_job_queue, None)
+
+    async def test_upload_queues_job_and_reports_progress(
+        self, client, admin_session, queue, tmp_path
+    ):
+        headers = {"Authorization": f"Bearer {admin_session.token}"}
+
+        response = await client.post(
+            "/v1/admin/upload",
+            headers=headers,
+            files={"file": ("test.pdf", b"%PDF-1.4 queued", "application/pdf")},
+        )
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status"] == "pending"
+        assert await queue.claim() == data["doc_id"]
+        # Only the renamed upload is left; no spool files
+        assert [p.name for p in tmp_path.iterdir()] == [f"{data['doc_id']}.pdf"]
+
+        await queue.set_progress(data["doc_id"], "extract", 2, 5)
+        response = await client.get(
+            f"/v1/admin/documents/{data['doc_id']}/ingestion", headers=headers
+        )
+        assert response.status_code == 200
+        status = response.json()
+        assert status["status"] == "pending"
+        assert status["stage"] == "extract"
+        assert status["stages"]["extract"] == {"done": 2, "total": 5}
+
+    async def test_duplicate_upload_discards_spool(
+        self, client, admin_session, queue, tmp_path
+    ):
+        headers = {"Authorization": f"Bearer {admin_session.token}"}
+        files = {"file": ("dup.pdf", b"%PDF-1.4 duplicate", "application/pdf")}
+
+        first = await client.post("/v1/admin/upload", headers=headers, files=files)
+        assert first.status_code == 202
+        second = await client.post("/v1/admin/upload", headers=headers, files=files)
+        assert second.status_code == 200
+        assert second.json()["doc_id"] == first.json()["doc_id"]
+        assert len(list(tmp_path.iterdir())) == 1
+
+    async def test_failed_commit_leaves_no_upload(
+        self, client, admin_session, queue, tmp_path, monkeypatch
+    ):
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        async def _fail(session):
+            raise ConnectionError("database went away")
+
+        monkeypatch.setattr(AsyncSession, "commit", _fail)
+        with pytest.raises(ConnectionError):
+            await client.post(
+                "/v1/admin/upload",
+                headers={"Authorization": f"Bearer {admin_session.token}"},
+                files={"file": ("lost.pdf", b"%PDF-1.4 lost", "application/pdf")},
+            )
+        assert list(tmp_path.iterdir()) == []
+        assert await queue.claim() is None
+
+    async def test_new_version_keeps_document_id(
+        self, client, admin_session, queue, db_session
+    ):
+        headers = {"Authorization": f"Bearer {admin_session.token}"}
+        first = await client.post(
+            "/v1/admin/upload", headers=headers,
+            files={"file": ("law.pdf", b"%PDF-1.4 version one", "application/pdf")},
+        )
+        doc_id = first.json()["doc_id"]
+        # A version can only replace a document that is not being ingested
+        busy = await client.post(
+            "/v1/admin/upload", headers=headers, data={"replaces": doc_id},
+            files={"file": ("law.pdf", b"%PDF-1.4 version two", "application/pdf")},
+        )
+        assert busy.status_code == 409
+
+        from database.models.document import Document, DocumentStatus
+
+        doc = await db_session.get(Document, uuid.UUID(doc_id))
+        doc.status = DocumentStatus.INDEXED
+        await db_session.commit()
+
+        second = await client.post(
+            "/v1/admin/upload", headers=headers, data={"replaces": doc_id},
+            files={"file": ("law-amended.pdf", b"%PDF-1.4 version two", "application/pdf")},
+        )
+        assert second.status_code == 202
+        assert second.json()["doc_id"] == doc_id
+        await db_session.refresh(doc)
+        assert doc.version == 2
+        assert doc.title == "law-amended.pdf"
+
+    async def test_new_version_of_unknown_document(self, client, admin_session, queue, tmp_path):
+        response = await client.post(
+            "/v1/admin/upload",
+            headers={"Authorization": f"Bearer {admin_session.token}"},
+            data={"replaces": str(uuid.uuid4())},
+            files={"file": ("law.pdf", b"%PDF-1.4 orphan", "application/pdf")},
+        )
+        assert response.status_code == 404
+        assert list(tmp_path.iterdir()) == []
+
+    async def test_oversized_upload_discards_spool(
+        self, client, admin_session, queue, tmp_path, monkeypatch
+    ):
+        from apps.api.routers import admin
+
+        monkeypatch.setattr(admin, "MAX_UPLOAD_BYTES", 16)
+        monkeypatch.setattr(admin, "UPLOAD_READ_CHUNK_SIZE", 8)
+        response = await client.post(
+            "/v1/admin/upload",
+            headers={"Authorization": f"Bearer {admin_session.token}"},
+            files={"file": ("big.pdf", b"%PDF-1.4" + b"x" * 64, "application/pdf")},
+        )
+        assert response.status_code == 413
+        assert list(tmp_path.iterdir()) == []
+
+    async def test_ingestion_status_unknown_document(self, client, admin_session):
+        response = await client.get(
+            f"/v1/admin/documents/{uuid.uuid4()}/ingestion",
+            headers={"Authorization": f"Bearer {admin_session.token}"},
+        )
+        assert response.status_code == 404
+
     async def test_non_pdf_rejected(self, client, admin_session):
         response = await client.post(
             "/v1/admin/upload",
@@ -31,6 +31,30 @@ class TestSendMessage:
         assert isinstance(data["confidence_score"], float)
         assert isinstance(data["citations"], list)
 
+    async def test_retrieved_chunks_become_citations(self, client, retrieved_chunks):
+        from ai_engine.retrieval import RetrievedChunk
+
+        from apps.api.routers.chat import CITATION_SNIPPET_CHARS
+
+        long_text = "Article 12 " + "taxable income " * 100
+        retrieved_chunks.extend(
+            RetrievedChunk(
+                chunk_id=uuid.uuid4(), document_id=uuid.uuid4(),
+                document_title="Income Tax Proclamation", content=content,
+                score=0.03, pages=pages,
+            )
+            for content, pages in (("Article 12 ...", [4, 5]), (long_text, []))
+        )
+        response = await client.post("/v1/chat/send", json={
+            "message": "Article 12", "session_id": str(uuid.uuid4()),
+        })
+        assert response.status_code == 200
+        short, truncated = response.json()["citations"]
+        assert short == {"source": "Income Tax Proclamation", "page": 4, "text": "Article 12 ..."}
+        assert truncated["page"] == 0
+        assert len(truncated["text"]) <= CITATION_SNIPPET_CHARS + 1
+        assert truncated["text"].endswith("income…")
+
     async def test_second_message_with_token_succeeds(self, client):
         session_id = str(uuid.uuid4())
 
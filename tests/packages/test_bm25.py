@@ -0,0 +1,113 @@
+"""Tests for the Ge'ez-aware tokenizer and the in-memory BM25 index."""
+
+import uuid
+
+import pytest
+from ai_engine.bm25 import BM25Index, term_counts
+from ai_engine.tokenizer import ethiopic_to_int, normalize, tokenize
+
+try:
+    from tests.conftest import _HAS_DB
+except ImportError:
+    _HAS_DB = False
+
+
+class TestTokenizer:
+    def test_homophone_spellings_normalize_alike(self):
+        assert normalize("ሐገር ሠራተኛ ዓመት ፀሐይ") == normalize("ሀገር ሰራተኛ አመት ጸሀይ")
+        assert normalize("ሃገር") == normalize("ሀገር")
+
+    def test_ethiopic_numerals_become_arabic(self):
+        assert ethiopic_to_int("፲፪") == 12
+        assert ethiopic_to_int("፳፻፲፮") == 2016
+        assert ethiopic_to_int("፼፪") == 10002
+        assert tokenize("አንቀጽ ፲፪") == ["አንቀጽ", "12"]
+
+    def test_ethiopic_punctuation_separates_words(self):
+        assert tokenize("ገቢ፡ግብር። ታክስ፣ክፍያ") == ["ገቢ", "ግብር", "ታክስ", "ክፍያ"]
+
+    def test_citation_numbers_are_kept_whole_and_split(self):
+        assert tokenize("Proclamation No. 983/2016") == [
+            "proclamation", "no", "983/2016", "983", "2016",
+        ]
+
+
+def _index(texts_by_document):
+    index = BM25Index()
+    chunk_ids = {}
+    for document_id, texts in texts_by_document.items():
+        for text, counts in zip(texts, term_counts(texts)):
+            chunk_ids[text] = uuid.uuid4()
+            index.add(chunk_ids[text], document_id, counts)
+    return index, chunk_ids
+
+
+class TestBM25Index:
+    def test_rare_exact_term_ranks_first(self):
+        doc = uuid.uuid4()
+        index, ids = _index({doc: [
+            "የገቢ ግብር ክፍያ በወቅቱ ይፈጸማል",
+            "የገቢ ግብር አዋጅ ቁጥር 979/2016 አንቀጽ 12",
+            "የገቢ ግብር ተመን",
+        ]})
+        hits = index.search("አዋጅ ፱፻፸፱/፳፻፲፮", top_k=2)
+        assert hits[0].chunk_id == ids["የገቢ ግብር አዋጅ ቁጥር 979/2016 አንቀጽ 12"]
+        assert hits[0].document_id == doc
+        assert len(hits) == 1  # chunks without any query term are not returned
+
+    def test_scores_are_ordered_and_limited(self):
+        index, _ = _index({uuid.uuid4(): [f"tax {'tax ' * n}rate" for n in range(10)]})
+        hits = index.search("tax rate", top_k=3)
+        assert len(hits) == 3
+        assert [h.score for h in hits] == sorted((h.score for h in hits), reverse=True)
+
+    def test_removed_documents_stop_matching_and_compaction_keeps_results(self):
+        kept, dropped = uuid.uuid4(), uuid.uuid4()
+        index, ids = _index({
+            kept: ["customs duty on imports", "excise duty"],
+            dropped: ["customs duty refund", "customs clearance"],
+        })
+        assert index.search("customs", 5)
+        assert index.remove_document(dropped) == 2
+        before = index.search("customs duty", 5)
+        assert {h.document_id for h in before} == {kept}
+        index.compact()
+        assert index.search("customs duty", 5) == before
+        assert len(index) == 2
+
+        index.add(uuid.uuid4(), dropped, term_counts(["customs refund"])[0])
+        assert index.search("refund", 1)[0].document_id == dropped
+
+    def test_unknown_terms_return_nothing(self):
+        index, _ = _index({uuid.uuid4(): ["ታክስ"]})
+        assert index.search("vat", 5) == []
+        assert BM25Index().search("ታክስ", 5) == []
+
+
+@pytest.mark.skipif(not _HAS_DB, reason="PostgreSQL not available")
+class TestRefresh:
+    async def test_refresh_follows_document_changes(self, db_session):
+        from database.bulk import ChunkRow, bulk_insert_chunks
+        from database.models.document import Document, DocumentStatus
+
+        doc = Document(
+            id=uuid.uuid4(), title="Customs", file_hash=uuid.uuid4().hex,
+            status=DocumentStatus.INDEXED,
+        )
+        db_session.add(doc)
+        await db_session.flush()
+        await bulk_insert_chunks(db_session, doc.id, [
+            ChunkRow(chunk_index=0, content="customs duty on imports", embedding=None,
+                     metadata={}),
+        ])
+        await db_session.commit()
+
+        index = BM25Index()
+        assert await index.refresh(db_session) == (1, 0)
+        assert index.search("customs", 1)[0].document_id == doc.id
+        assert await index.refresh(db_session) == (0, 0)
+
+        await db_session.delete(doc)
+        await db_session.commit()
+        assert await index.refresh(db_session) == (0, 1)
+        assert index.search("customs", 1) == []
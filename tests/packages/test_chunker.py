@@ -1,8 +1,67 @@
 """Tests for the ai-engine text chunker."""
 
-from ai_engine.chunker import _pages_for_range, chunk_pages
+import random
+
+import pytest
+from ai_engine.chunker import (
+    SentenceChunker,
+    WindowChunker,
+    _pages_for_range,
+    chunk_pages,
+    estimate_tokens,
+    get_chunking_strategy,
+    iter_chunks,
+)
 from ai_engine.extractor import PageText
 
+_AMHARIC_SENTENCE = "የተጨማሪ እሴት ታክስ ከፋይ በዚህ አዋጅ መሠረት መመዝገብ አለበት። "
+_ENGLISH_SENTENCE = "A person carrying on taxable activity shall register under this Proclamation. "
+
+
+def _proclamation(
+    num_pages: int, articles_per_page: int = 3, bilingual: bool = False
+) -> list[PageText]:
+    """Negarit Gazeta style pages; bilingual ones carry the English text too."""
+    pages = []
+    for page_num in range(1, num_pages + 1):
+        text = ""
+        for a in range(articles_per_page):
+            article = (page_num - 1) * articles_per_page + a + 1
+            repeats = 2 + article % 4
+            text += f"አንቀጽ {article}. ምዝገባ\n" + _AMHARIC_SENTENCE * repeats + "\n"
+            if bilingual:
+                text += _ENGLISH_SENTENCE * repeats + "\n"
+        pages.append(PageText(page_number=page_num, text=text))
+    return pages
+
+
+def _reference_chunks(pages, chunk_size, overlap):
+    """The original quadratic chunker, kept as an oracle for boundaries."""
+    full_text = ""
+    boundaries = []
+    for page in pages:
+        if not page.text.strip():
+            continue
+        boundaries.append((len(full_text), page.page_number))
+        full_text += page.text + "\n\n"
+    result = []
+    step = max(chunk_size - overlap, 1)
+    start = 0
+    while start < len(full_text):
+        end = min(start + chunk_size, len(full_text))
+        content = full_text[start:end].strip()
+        if content:
+            spanned = set()
+            for i, (offset, page_num) in enumerate(boundaries):
+                next_offset = boundaries[i + 1][0] if i + 1 < len(boundaries) else float("inf")
+                if offset < end and next_offset > start:
+                    spanned.add(page_num)
+            result.append((content, {
+                "pages": sorted(spanned), "char_start": start, "char_end": end,
+            }))
+        start += step
+    return result
+
 
 class TestChunkPages:
     def test_empty_pages(self):
@@ -69,6 +128,103 @@ class TestChunkPages:
             assert chunk.index == i
 
 
+class TestStreamingChunker:
+    def test_matches_reference_on_random_documents(self):
+        rng = random.Random(7)
+        for _ in range(40):
+            pages = [
+                PageText(
+                    page_number=n,
+                    text=rng.choice(["", "  ", "ታክስ " * rng.randint(1, 400), "x" * rng.randint(1, 3000)]),
+                )
+                for n in range(1, rng.randint(1, 30))
+            ]
+            chunk_size = rng.randint(50, 2000)
+            overlap = rng.randint(0, chunk_size)
+            chunks = chunk_pages(pages, chunk_size=chunk_size, overlap=overlap)
+            expected = _reference_chunks(pages, chunk_size, overlap)
+            assert [(c.content, c.metadata) for c in chunks] == expected
+            assert [c.index for c in chunks] == list(range(len(expected)))
+
+    def test_first_chunk_yielded_before_all_pages_read(self):
+        consumed = 0
+
+        def _pages():
+            nonlocal consumed
+            for n in range(1, 101):
+                consumed = n
+                yield PageText(page_number=n, text="Z" * 1000)
+
+        first = next(iter_chunks(_pages(), chunk_size=2000, overlap=200))
+        assert first.metadata["pages"] == [1, 2]
+        assert consumed < 5
+
+
+class TestEstimateTokens:
+    def test_geez_costs_more_per_character_than_latin(self):
+        assert estimate_tokens("ታክስ" * 20) > estimate_tokens("tax" * 20)
+
+    def test_whitespace_is_free(self):
+        assert estimate_tokens("tax   payer") == estimate_tokens("tax payer")
+
+    def test_empty(self):
+        assert estimate_tokens("") == 0
+
+
+class TestSentenceChunker:
+    def test_chunks_end_on_sentence_boundaries(self):
+        chunks = list(SentenceChunker(max_tokens=120).chunk(_proclamation(4)))
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert chunk.content.endswith("።")
+            assert chunk.metadata["tokens"] <= 120
+
+    def test_articles_start_chunks_and_are_packed_whole(self):
+        chunks = list(SentenceChunker(max_tokens=400).chunk(_proclamation(4)))
+        for chunk in chunks:
+            assert chunk.content.startswith("አንቀጽ")
+        # Every article heading appears exactly once across all chunks
+        headings = [line for c in chunks for line in c.content.splitlines() if line.startswith("አንቀጽ")]
+        assert len(headings) == 12
+
+    def test_fewer_chunks_than_character_windows(self):
+        pages = _proclamation(40, bilingual=True)
+        sentence_chunks = list(SentenceChunker().chunk(pages))
+        window_chunks = list(WindowChunker().chunk(pages))
+        assert len(sentence_chunks) < len(window_chunks)
+
+    def test_metadata_matches_window_offsets(self):
+        pages = _proclamation(3)
+        chunk = list(SentenceChunker(max_tokens=100_000).chunk(pages))[0]
+        assert chunk.metadata["pages"] == [1, 2, 3]
+        assert chunk.metadata["char_start"] == 0
+        full_text = "".join(p.text + "\n\n" for p in pages)
+        assert chunk.content == full_text[:chunk.metadata["char_end"]].strip()
+
+    def test_long_article_split_with_sentence_overlap(self):
+        pages = [PageText(page_number=1, text="አንቀጽ 1.\n" + _AMHARIC_SENTENCE * 30)]
+        chunks = list(SentenceChunker(max_tokens=100, overlap_sentences=1).chunk(pages))
+        assert len(chunks) > 1
+        for prev, nxt in zip(chunks, chunks[1:]):
+            assert nxt.metadata["char_start"] < prev.metadata["char_end"]
+
+    def test_oversized_sentence_cut_between_words(self):
+        pages = [PageText(page_number=1, text="word " * 500 + "x" * 900)]
+        chunks = list(SentenceChunker(max_tokens=50).chunk(pages))
+        assert all(c.metadata["tokens"] <= 50 for c in chunks)
+        assert "".join(c.content for c in chunks).replace(" ", "") == ("word" * 500 + "x" * 900)
+
+
+class TestGetChunkingStrategy:
+    def test_known_names(self):
+        assert isinstance(get_chunking_strategy("window"), WindowChunker)
+        assert isinstance(get_chunking_strategy("sentence"), SentenceChunker)
+
+    def test_unknown_name(self):
+        with pytest.raises(ValueError):
+            get_chunking_strategy("paragraph")
+
+
 class TestPagesForRange:
     def test_single_page(self):
         boundaries = [(0, 1)]
@@ -88,3 +244,7 @@ class TestPagesForRange:
     def test_range_covers_all_pages(self):
         boundaries = [(0, 1), (100, 2), (200, 3)]
         assert _pages_for_range(boundaries, 0, 300) == {1, 2, 3}
+
+    def test_range_ending_on_boundary_excludes_next_page(self):
+        boundaries = [(0, 1), (500, 2)]
+        assert _pages_for_range(boundaries, 0, 500) == {1}
@@ -0,0 +1,87 @@
+"""Tests for MinHash near-duplicate detection (the database lookup is faked)."""
+
+import uuid
+
+import ai_engine.dedup as dedup_module
+import pytest
+from ai_engine.dedup import (
+    NearDuplicateLinker,
+    band_keys,
+    lsh_params,
+    minhash_signatures,
+    similarity,
+)
+
+_DEFINITIONS = (
+    "በዚህ አዋጅ ውስጥ የቃሉ አገባብ ሌላ ትርጉም የሚያሰጠው ካልሆነ በስተቀር፡ "
+    "\"ግብር ከፋይ\" ማለት በዚህ አዋጅ መሠረት ግብር የመክፈል ግዴታ ያለበት ሰው ነው። "
+    "\"ባለሥልጣን\" ማለት የገቢዎች ሚኒስቴር ነው። \"የግብር ዘመን\" ማለት የሂሳብ ዓመት ነው። "
+) * 3
+_OTHER = "Value added tax is charged on every taxable transaction by a registered person. " * 4
+
+
+class TestMinHash:
+    def test_lsh_params(self):
+        assert lsh_params(0.9) == (8, 16)
+        bands, rows = lsh_params(0.5)
+        assert bands * rows == 128 and bands > 8
+
+    def test_similarity_tracks_overlap(self):
+        edited = _DEFINITIONS.replace("የሂሳብ ዓመት", "የበጀት ዓመት", 1)
+        same, near, far = minhash_signatures([_DEFINITIONS, edited, _OTHER])
+        assert similarity(same, minhash_signatures([" ".join(_DEFINITIONS.split())])[0]) == 1.0
+        assert similarity(same, near) > 0.8
+        assert similarity(same, far) < 0.1
+
+    def test_band_keys_are_stable_bigints(self):
+        signature = minhash_signatures([_DEFINITIONS])[0]
+        keys = band_keys(signature, 8)
+        assert keys == band_keys(signature.copy(), 8)
+        assert len(set(keys)) == 8
+        assert all(-(1 << 63) <= key < (1 << 63) for key in keys)
+
+
+class TestNearDuplicateLinker:
+    @pytest.fixture
+    def stored(self, monkeypatch):
+        stored = []
+
+        async def _load(db, keys, exclude_document=None):
+            keys = set(keys)
+            return [
+                row[:3] for row in stored
+                if keys.intersection(row[2]) and row[3] != exclude_document
+            ]
+
+        monkeypatch.setattr(dedup_module, "load_canonical_candidates", _load)
+        return stored
+
+    async def test_links_duplicates_within_a_run(self, stored):
+        linker = NearDuplicateLinker(threshold=0.8)
+        first, copy, other = await linker.fingerprint(None, [_DEFINITIONS, _DEFINITIONS, _OTHER])
+        assert first.canonical_id is None
+        assert copy.canonical_id == first.id
+        assert other.canonical_id is None
+
+    async def test_links_to_stored_canonical(self, stored):
+        (earlier,) = await NearDuplicateLinker(threshold=0.8).fingerprint(None, [_DEFINITIONS])
+        stored.append((uuid.uuid4(), earlier.minhash, earlier.lsh_bands, uuid.uuid4()))
+
+        (again,) = await NearDuplicateLinker(threshold=0.8).fingerprint(None, [_DEFINITIONS])
+        assert again.canonical_id == stored[0][0]
+
+    async def test_excluded_document_is_not_a_candidate(self, stored):
+        document_id = uuid.uuid4()
+        (earlier,) = await NearDuplicateLinker(threshold=0.8).fingerprint(None, [_DEFINITIONS])
+        stored.append((uuid.uuid4(), earlier.minhash, earlier.lsh_bands, document_id))
+
+        (again,) = await NearDuplicateLinker(threshold=0.8).fingerprint(
+            None, [_DEFINITIONS], exclude_document=document_id
+        )
+        assert again.canonical_id is None
+
+    async def test_threshold_zero_disables(self, stored):
+        fingerprints = await NearDuplicateLinker(threshold=0).fingerprint(
+            None, [_DEFINITIONS, _DEFINITIONS]
+        )
+        assert all(fp.canonical_id is None and fp.minhash is None for fp in fingerprints)
@@ -0,0 +1,168 @@
+"""Tests for the ai-engine embedder (Gemini calls are faked)."""
+
+import asyncio
+import math
+from types import SimpleNamespace
+
+import ai_engine.embedder as embedder_module
+import numpy as np
+import pytest
+from ai_engine.embedder import OUTPUT_DIM, embed_texts, embedding_cache_key
+from google.genai import errors
+
+
+class _FakeEmbedModels:
+    """Returns a distinct, unnormalized vector per text and records calls."""
+
+    def __init__(self, delay: float = 0.0, failures: dict[str, list[Exception]] | None = None):
+        self.delay = delay
+        # first text of a batch -> errors raised by its successive attempts
+        self.failures = failures or {}
+        self.embedded: list[str] = []
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def embed_content(self, model, contents, config):
+        self.calls += 1
+        call_num = self.calls
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later calls finish first, so ordering must not rely on completion
+            await asyncio.sleep(self.delay / call_num)
+        finally:
+            self.in_flight -= 1
+        first_text = contents[0]
+        pending = self.failures.get(first_text)
+        if pending:
+            raise pending.pop(0)
+        self.embedded.extend(contents)
+        return SimpleNamespace(embeddings=[
+            SimpleNamespace(values=[float(len(text))] + [1.0] * (OUTPUT_DIM - 1))
+            for text in contents
+        ])
+
+
+class _DictEmbeddingCache:
+    def __init__(self):
+        self.entries: dict[str, list[float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_many(self, keys):
+        found = {k: self.entries[k] for k in keys if k in self.entries}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, entries):
+        self.entries.update(entries)
+
+
+def _fake_client(models):
+    return SimpleNamespace(aio=SimpleNamespace(models=models))
+
+
+class TestEmbedTexts:
+    async def test_empty_input(self):
+        assert await embed_texts([], client=_fake_client(_FakeEmbedModels())) == []
+
+    async def test_vectors_are_normalized(self):
+        vectors = await embed_texts(["a", "bb"], client=_fake_client(_FakeEmbedModels()))
+        assert len(vectors) == 2
+        for vec in vectors:
+            assert len(vec) == OUTPUT_DIM
+            assert math.isclose(math.sqrt(sum(x * x for x in vec)), 1.0, rel_tol=1e-6)
+
+
+class TestArrayMode:
+    async def test_returns_contiguous_float32_matrix(self):
+        matrix = await embed_texts(
+            ["a", "bb", "ccc"], client=_fake_client(_FakeEmbedModels()), as_array=True
+        )
+        assert matrix.shape == (3, OUTPUT_DIM)
+        assert matrix.dtype == np.float32
+        assert matrix.flags["C_CONTIGUOUS"]
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), 1.0, rtol=1e-6)
+
+    async def test_matches_list_mode(self):
+        texts = ["preamble", "article 1"]
+        as_list = await embed_texts(texts, client=_fake_client(_FakeEmbedModels()))
+        as_array = await embed_texts(
+            texts, client=_fake_client(_FakeEmbedModels()),
+            cache=_DictEmbeddingCache(), as_array=True,
+        )
+        np.testing.assert_allclose(as_array, np.array(as_list), rtol=1e-6)
+
+    async def test_empty_input(self):
+        matrix = await embed_texts([], client=_fake_client(_FakeEmbedModels()), as_array=True)
+        assert matrix.shape == (0, OUTPUT_DIM)
+
+    def test_zero_vector_left_unchanged(self):
+        out = np.empty((2, 3), dtype=np.float32)
+        embedder_module._fill_normalized(out, [[0.0, 0.0, 0.0], [3.0, 4.0, 0.0]])
+        np.testing.assert_allclose(out, [[0, 0, 0], [0.6, 0.8, 0]])
+
+
+class TestConcurrentBatches:
+    @pytest.fixture(autouse=True)
+    def _no_backoff(self, monkeypatch):
+        monkeypatch.setattr(embedder_module, "_RETRY_BASE_DELAY", 0)
+
+    async def test_order_stable_and_concurrency_bounded(self):
+        models = _FakeEmbedModels(delay=0.02)
+        texts = ["t" * (i + 1) for i in range(450)]
+        vectors = await embedder_module._embed_uncached(
+            texts, _fake_client(models), "RETRIEVAL_DOCUMENT", max_concurrency=3
+        )
+        assert models.calls == 5
+        assert models.max_in_flight == 3
+        # The first component encodes the text length, so order is checkable
+        lengths = [v[0] / v[1] for v in vectors]
+        assert [round(n) for n in lengths] == [len(t) for t in texts]
+
+    async def test_transient_error_retried_per_batch(self):
+        models = _FakeEmbedModels(failures={
+            "b0": [errors.APIError(429, {}), errors.APIError(503, {})],
+        })
+        texts = ["a" + str(i) for i in range(100)] + ["b" + str(i) for i in range(100)]
+        vectors = await embed_texts(texts, client=_fake_client(models))
+        assert len(vectors) == 200
+        # One clean batch plus three attempts of the flaky one
+        assert models.calls == 4
+        assert models.embedded == texts
+
+    async def test_permanent_error_propagates(self):
+        models = _FakeEmbedModels(failures={"x": [errors.APIError(400, {})]})
+        with pytest.raises(errors.APIError):
+            await embed_texts(["x"], client=_fake_client(models))
+        assert models.calls == 1
+
+
+class TestEmbeddingCache:
+    async def test_only_new_texts_are_embedded(self):
+        cache = _DictEmbeddingCache()
+        await embed_texts(["preamble", "article 1"], client=_fake_client(_FakeEmbedModels()), cache=cache)
+
+        models = _FakeEmbedModels()
+        vectors = await embed_texts(
+            ["preamble", "article 2", "article 1"], client=_fake_client(models), cache=cache
+        )
+        assert models.embedded == ["article 2"]
+        assert len(vectors) == 3
+        assert (cache.hits, cache.misses) == (2, 3)
+
+    async def test_duplicate_texts_embedded_once_and_order_kept(self):
+        models = _FakeEmbedModels()
+        vectors = await embed_texts(
+            ["x", "yyy", "x"], client=_fake_client(models), cache=_DictEmbeddingCache()
+        )
+        assert models.embedded == ["x", "yyy"]
+        assert vectors[0] == vectors[2]
+        assert vectors[0] != vectors[1]
+
+    def test_key_depends_on_task_type(self):
+        assert embedding_cache_key("q", "RETRIEVAL_QUERY") != embedding_cache_key(
+            "q", "RETRIEVAL_DOCUMENT"
+        )
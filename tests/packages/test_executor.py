@@ -0,0 +1,78 @@
+"""Tests that CPU-bound ingestion work stays off the event loop."""
+
+import io
+import threading
+
+import ai_engine.extractor as extractor_module
+from ai_engine.chunker import chunk_pages
+from ai_engine.executor import run_cpu_bound
+from ai_engine.extractor import SOURCE_TEXT_LAYER, PageText, extract_text
+from pypdf import PageObject, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+
+def _make_text_pdf(num_pages: int) -> bytes:
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    line = b"(Article 12 - The taxpayer shall register for value added tax.) Tj T*"
+    for _ in range(num_pages):
+        page = writer.add_blank_page(width=600, height=800)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+        contents = DecodedStreamObject()
+        contents.set_data(b"BT /F1 10 Tf 12 TL 20 780 Td " + line * 60 + b" ET")
+        page[NameObject("/Contents")] = writer._add_object(contents)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def _on_threads(func, threads: list[int]):
+    """`func`, recording the id of each thread it is called on."""
+    def _spy(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return func(*args, **kwargs)
+    return _spy
+
+
+class TestRunCpuBound:
+    async def test_returns_result(self):
+        assert await run_cpu_bound(sum, [1, 2, 3]) == 6
+
+    async def test_passes_kwargs(self):
+        assert await run_cpu_bound(sorted, [3, 1, 2], reverse=True) == [3, 2, 1]
+
+    async def test_runs_on_a_pool_thread(self):
+        name = await run_cpu_bound(lambda: threading.current_thread().name)
+        assert name.startswith("ingest-cpu")
+        assert await run_cpu_bound(threading.get_ident) != threading.get_ident()
+
+
+class TestIngestionWorkStaysOffTheLoop:
+    async def test_pdf_parsing_and_text_layer(self, monkeypatch):
+        threads: list[int] = []
+        monkeypatch.setattr(
+            extractor_module, "_open_pdf", _on_threads(extractor_module._open_pdf, threads)
+        )
+        monkeypatch.setattr(
+            PageObject, "extract_text", _on_threads(PageObject.extract_text, threads)
+        )
+        pages = await extract_text(_make_text_pdf(5))
+        assert [page.source for page in pages] == [SOURCE_TEXT_LAYER] * 5
+        assert threads and threading.get_ident() not in threads
+
+    async def test_chunking(self):
+        threads: list[int] = []
+        pages = [
+            PageText(page_number=i, text="የታክስ ከፋዩ ግዴታዎች። " * 100) for i in range(1, 6)
+        ]
+        chunks = await run_cpu_bound(
+            _on_threads(chunk_pages, threads), pages, chunk_size=500, overlap=50
+        )
+        assert chunks
+        assert threads and threading.get_ident() not in threads
@@ -0,0 +1,381 @@
+"""Tests for the ai-engine PDF text extractor (Gemini calls are faked)."""
+
+import asyncio
+import io
+import re
+from collections.abc import Callable
+from types import SimpleNamespace
+
+import ai_engine.extractor as extractor_module
+import pytest
+from ai_engine.extractor import (
+    SOURCE_CACHE,
+    SOURCE_FAILED,
+    SOURCE_GEMINI,
+    SOURCE_TEXT_LAYER,
+    _classify_text_layer,
+    _page_fingerprint,
+    _split_page_delimited,
+    extract_text,
+)
+from google.genai import errors
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+
+def _make_pdf(num_pages: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(num_pages):
+        writer.add_blank_page(width=200, height=200)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def _make_mixed_pdf(pages: list[tuple[str, bool]]) -> bytes:
+    """Build a PDF whose pages have the given (text layer, has image) contents."""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text, has_image in pages:
+        page = writer.add_blank_page(width=200, height=200)
+        resources = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+        ops = f"BT /F1 12 Tf 10 100 Td ({text}) Tj ET".encode() if text else b""
+        if has_image:
+            image = DecodedStreamObject()
+            image.set_data(b"\x00")
+            image.update({
+                NameObject("/Type"): NameObject("/XObject"),
+                NameObject("/Subtype"): NameObject("/Image"),
+            })
+            resources[NameObject("/XObject")] = DictionaryObject({
+                NameObject("/Im1"): writer._add_object(image),
+            })
+            ops += b" q 200 0 0 200 0 0 cm /Im1 Do Q"
+        page[NameObject("/Resources")] = resources
+        contents = DecodedStreamObject()
+        contents.set_data(ops)
+        page[NameObject("/Contents")] = writer._add_object(contents)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+class _FakePage:
+    def __init__(self, text: str):
+        self._text = text
+
+    def extract_text(self) -> str:
+        return self._text
+
+    def get(self, key, default=None):
+        return default
+
+
+class _DictPageCache:
+    def __init__(self):
+        self.entries: dict[str, str] = {}
+
+    async def get_many(self, keys):
+        return {k: self.entries[k] for k in keys if k in self.entries}
+
+    async def set_many(self, entries):
+        self.entries.update(entries)
+
+
+class _FakeModels:
+    """Stands in for client.aio.models; records concurrency and call order."""
+
+    def __init__(
+        self,
+        delay: float = 0.01,
+        fail_on: set[int] | None = None,
+        garble_multi_page: bool = False,
+        error: Callable[[], Exception] = lambda: RuntimeError("simulated Gemini failure"),
+    ):
+        self.delay = delay
+        self.fail_on = fail_on or set()
+        self.error = error
+        self.garble_multi_page = garble_multi_page
+        self.calls = 0
+        self.page_counts: list[int] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content(self, model, contents):
+        self.calls += 1
+        call_num = self.calls
+        parts = contents[0].parts
+        page_count = len(PdfReader(io.BytesIO(parts[0].inline_data.data)).pages)
+        self.page_counts.append(page_count)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later calls finish first, so ordering must not rely on completion
+            await asyncio.sleep(self.delay / call_num)
+            if call_num in self.fail_on:
+                raise self.error()
+            if page_count == 1:
+                return SimpleNamespace(text=f"text {call_num}")
+            if self.garble_multi_page:
+                return SimpleNamespace(text="=== PAGE 1 ===\nonly one page came back")
+            return SimpleNamespace(text="\n".join(
+                f"=== PAGE {n} ===\ncall {call_num} page {n}"
+                for n in range(1, page_count + 1)
+            ))
+        finally:
+            self.in_flight -= 1
+
+
+def _fake_client(models: _FakeModels):
+    return SimpleNamespace(aio=SimpleNamespace(models=models))
+
+
+class TestExtractText:
+    async def test_results_in_page_order(self):
+        models = _FakeModels()
+        pages = await extract_text(
+            _make_pdf(5), client=_fake_client(models), use_text_layer=False
+        )
+        assert [p.page_number for p in pages] == [1, 2, 3, 4, 5]
+        assert [p.text for p in pages] == [f"text {i}" for i in range(1, 6)]
+
+    async def test_respects_concurrency_limit(self):
+        models = _FakeModels()
+        await extract_text(
+            _make_pdf(12), client=_fake_client(models),
+            max_concurrency=3, use_text_layer=False,
+        )
+        assert models.calls == 12
+        assert models.max_in_flight == 3
+
+    async def test_page_failure_is_isolated(self):
+        models = _FakeModels(fail_on={2})
+        pages = await extract_text(
+            _make_pdf(3), client=_fake_client(models), use_text_layer=False
+        )
+        assert [p.text for p in pages] == ["text 1", "", "text 3"]
+        assert pages[1].source == SOURCE_FAILED
+
+    async def test_reads_pdf_from_path(self, tmp_path):
+        path = tmp_path / "doc.pdf"
+        pdf = _make_mixed_pdf([("Article 1 - Registration", False), ("", True)])
+        path.write_bytes(pdf)
+        models = _FakeModels()
+        from_path = await extract_text(path, client=_fake_client(models))
+        from_bytes = await extract_text(pdf, client=_fake_client(_FakeModels()))
+        assert from_path == from_bytes
+        assert models.calls == 1
+
+    async def test_page_pdfs_rendered_lazily(self, monkeypatch):
+        rendered = 0
+        max_outstanding = 0
+        models = _FakeModels()
+        real_pages_to_pdf = extractor_module._pages_to_pdf
+
+        def _counting_pages_to_pdf(reader, page_indices):
+            nonlocal rendered, max_outstanding
+            rendered += 1
+            max_outstanding = max(max_outstanding, rendered - models.calls + models.in_flight)
+            return real_pages_to_pdf(reader, page_indices)
+
+        monkeypatch.setattr(extractor_module, "_pages_to_pdf", _counting_pages_to_pdf)
+        await extract_text(
+            _make_pdf(20), client=_fake_client(models),
+            max_concurrency=2, use_text_layer=False,
+        )
+        assert rendered == 20
+        # Only pages held by a worker (in flight or about to be sent) exist
+        assert max_outstanding <= 2
+
+
+    async def test_render_failure_leaves_no_pending_tasks(self, monkeypatch):
+        real_pages_to_pdf = extractor_module._pages_to_pdf
+        rendered = 0
+
+        def _failing_pages_to_pdf(reader, page_indices):
+            nonlocal rendered
+            rendered += 1
+            if rendered == 3:
+                raise ValueError("corrupt page")
+            return real_pages_to_pdf(reader, page_indices)
+
+        monkeypatch.setattr(extractor_module, "_pages_to_pdf", _failing_pages_to_pdf)
+        with pytest.raises(ValueError, match="corrupt page"):
+            await extract_text(
+                _make_pdf(6), client=_fake_client(_FakeModels(delay=0.5)),
+                max_concurrency=3, use_text_layer=False,
+            )
+        # The other workers were cancelled and awaited, not left running
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+class TestMultiPageExtraction:
+    async def test_one_request_per_page_range(self):
+        models = _FakeModels()
+        pages = await extract_text(
+            _make_pdf(7), client=_fake_client(models),
+            pages_per_request=3, use_text_layer=False,
+        )
+        assert models.page_counts == [3, 3, 1]
+        assert [p.page_number for p in pages] == list(range(1, 8))
+        assert pages[0].text == "call 1 page 1"
+        assert pages[5].text == "call 2 page 3"
+
+    async def test_unclean_split_falls_back_to_single_pages(self):
+        models = _FakeModels(garble_multi_page=True)
+        pages = await extract_text(
+            _make_pdf(3), client=_fake_client(models),
+            pages_per_request=3, use_text_layer=False,
+        )
+        assert models.page_counts == [3, 1, 1, 1]
+        assert [p.page_number for p in pages] == [1, 2, 3]
+        assert all(re.fullmatch(r"text \d", p.text) for p in pages)
+
+
+class TestTextLayerFastPath:
+    async def test_digital_pages_skip_gemini(self):
+        models = _FakeModels()
+        pdf = _make_mixed_pdf([
+            ("Article 1 - Value added tax registration threshold", False),
+            ("Article 2 - Withholding tax on imported goods", False),
+        ])
+        pages = await extract_text(pdf, client=_fake_client(models))
+        assert models.calls == 0
+        assert [p.source for p in pages] == [SOURCE_TEXT_LAYER] * 2
+        assert "Value added tax" in pages[0].text
+
+    async def test_only_scanned_pages_go_remote(self):
+        models = _FakeModels()
+        pdf = _make_mixed_pdf([
+            ("Article 1 - Value added tax registration threshold", False),
+            ("", True),  # scanned: image only
+            ("p. 3", True),  # image with a stray page number
+            ("", False),  # blank page
+        ])
+        pages = await extract_text(pdf, client=_fake_client(models))
+        assert models.calls == 2
+        assert [p.source for p in pages] == [
+            SOURCE_TEXT_LAYER, SOURCE_GEMINI, SOURCE_GEMINI, SOURCE_TEXT_LAYER,
+        ]
+        assert [p.page_number for p in pages] == [1, 2, 3, 4]
+        assert pages[3].text == ""
+
+
+class TestPageCache:
+    async def test_reupload_costs_nothing(self):
+        cache = _DictPageCache()
+        pdf = _make_mixed_pdf([("", True), ("Art. 2", True)])
+        first = await extract_text(pdf, client=_fake_client(_FakeModels()), cache=cache)
+        assert [p.source for p in first] == [SOURCE_GEMINI] * 2
+
+        models = _FakeModels()
+        second = await extract_text(pdf, client=_fake_client(models), cache=cache)
+        assert models.calls == 0
+        assert [p.source for p in second] == [SOURCE_CACHE] * 2
+        assert [p.text for p in second] == [p.text for p in first]
+
+    async def test_revised_document_only_pays_for_changed_pages(self):
+        cache = _DictPageCache()
+        original = _make_mixed_pdf([("", True), ("Art. 2", True), ("Art. 3", True)])
+        await extract_text(original, client=_fake_client(_FakeModels()), cache=cache)
+
+        models = _FakeModels()
+        revised = _make_mixed_pdf([
+            ("", True), ("Art. 2 amended", True), ("Art. 3", True), ("Art. 4", True),
+        ])
+        pages = await extract_text(revised, client=_fake_client(models), cache=cache)
+        assert models.calls == 2
+        assert [p.source for p in pages] == [
+            SOURCE_CACHE, SOURCE_GEMINI, SOURCE_CACHE, SOURCE_GEMINI,
+        ]
+
+    async def test_failed_pages_not_cached(self):
+        cache = _DictPageCache()
+        pdf = _make_mixed_pdf([("", True)])
+        await extract_text(
+            pdf, client=_fake_client(_FakeModels(fail_on={1})), cache=cache
+        )
+        assert cache.entries == {}
+
+
+class TestRetriesAndCheckpoints:
+    @pytest.fixture(autouse=True)
+    def _no_backoff(self, monkeypatch):
+        monkeypatch.setattr(extractor_module, "_RETRY_BASE_DELAY", 0)
+
+    async def test_transient_page_failure_retried(self):
+        models = _FakeModels(fail_on={2}, error=lambda: errors.APIError(503, {}))
+        pages = await extract_text(
+            _make_pdf(3), client=_fake_client(models), max_concurrency=1,
+            use_text_layer=False,
+        )
+        assert models.calls == 4
+        assert all(p.text and p.source == SOURCE_GEMINI for p in pages)
+
+    async def test_failed_range_retried_page_by_page(self):
+        models = _FakeModels(fail_on={1})
+        pages = await extract_text(
+            _make_pdf(3), client=_fake_client(models),
+            pages_per_request=3, use_text_layer=False,
+        )
+        assert models.page_counts == [3, 1, 1, 1]
+        assert all(p.text for p in pages)
+
+    async def test_resume_only_extracts_failed_pages(self):
+        cache = _DictPageCache()
+        pdf = _make_mixed_pdf([("", True), ("Art. 2", True), ("Art. 3", True)])
+        first = await extract_text(
+            pdf, client=_fake_client(_FakeModels(fail_on={2})),
+            max_concurrency=1, cache=cache,
+        )
+        assert [p.source for p in first] == [SOURCE_GEMINI, SOURCE_FAILED, SOURCE_GEMINI]
+        assert len(cache.entries) == 2
+
+        models = _FakeModels()
+        second = await extract_text(pdf, client=_fake_client(models), cache=cache)
+        assert models.calls == 1
+        assert [p.source for p in second] == [SOURCE_CACHE, SOURCE_GEMINI, SOURCE_CACHE]
+
+
+class TestPageFingerprint:
+    def test_same_page_in_different_files_matches(self):
+        a = PdfReader(io.BytesIO(_make_mixed_pdf([("Art. 1", True), ("Art. 2", False)])))
+        b = PdfReader(io.BytesIO(_make_mixed_pdf([("Art. 0", False), ("Art. 1", True)])))
+        assert _page_fingerprint(a.pages[0]) == _page_fingerprint(b.pages[1])
+
+    def test_different_content_differs(self):
+        reader = PdfReader(io.BytesIO(_make_mixed_pdf([("Art. 1", True), ("Art. 2", True)])))
+        assert _page_fingerprint(reader.pages[0]) != _page_fingerprint(reader.pages[1])
+
+
+class TestClassifyTextLayer:
+    def test_clean_amharic_accepted(self):
+        text = "የተጨማሪ እሴት ታክስ ምዝገባ። አንቀጽ ፭፡ ግዴታዎች"
+        assert _classify_text_layer(_FakePage(text)) == text
+
+    def test_private_use_glyphs_rejected(self):
+        text = "\ue001\ue002\ue003 \ue004\ue005 ታክስ"
+        assert _classify_text_layer(_FakePage(text)) is None
+
+    def test_symbol_soup_rejected(self):
+        assert _classify_text_layer(_FakePage("¢£¤ ¥¦§ ¨©ª «¬® ±²³")) is None
+
+
+class TestSplitPageDelimited:
+    def test_clean_split(self):
+        text = "=== PAGE 1 ===\nfirst\n=== PAGE 2 ===\n\n=== PAGE 3 ===\nthird\n"
+        assert _split_page_delimited(text, 3) == ["first", "", "third"]
+
+    def test_missing_page_rejected(self):
+        assert _split_page_delimited("=== PAGE 1 ===\na\n=== PAGE 3 ===\nc", 3) is None
+
+    def test_out_of_order_rejected(self):
+        assert _split_page_delimited("=== PAGE 2 ===\nb\n=== PAGE 1 ===\na", 2) is None
+
+    def test_no_delimiters_rejected(self):
+        assert _split_page_delimited("plain text", 1) is None
@@ -0,0 +1,114 @@
+"""Tests for hybrid retrieval (both legs and the database are faked)."""
+
+import asyncio
+import contextlib
+import uuid
+
+import ai_engine.hybrid as hybrid_module
+from ai_engine.bm25 import BM25Index, term_counts
+from ai_engine.hybrid import hybrid_search, reciprocal_rank_fusion
+from ai_engine.retrieval import RetrievedChunk
+
+
+def _chunk(chunk_id, content="", score=0.0):
+    return RetrievedChunk(
+        chunk_id=chunk_id, document_id=uuid.uuid4(), document_title="Doc",
+        content=content, score=score,
+    )
+
+
+@contextlib.asynccontextmanager
+async def _no_session():
+    yield None
+
+
+class _Corpus:
+    """A BM25 index and a fake chunk table over the same texts."""
+
+    def __init__(self, texts):
+        self.index = BM25Index()
+        self.chunks = {}
+        for text, counts in zip(texts, term_counts(texts)):
+            chunk = _chunk(uuid.uuid4(), text)
+            self.chunks[chunk.chunk_id] = chunk
+            self.index.add(chunk.chunk_id, chunk.document_id, counts)
+        self.fetched = []
+
+    def by_text(self, text):
+        return next(c for c in self.chunks.values() if c.content == text)
+
+    async def fetch(self, db, chunk_ids):
+        self.fetched.extend(chunk_ids)
+        return {i: self.chunks[i] for i in chunk_ids if i in self.chunks}
+
+
+class TestReciprocalRankFusion:
+    def test_agreement_beats_a_single_first_place(self):
+        a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        fused = reciprocal_rank_fusion([[a, b], [c, b]], k=60)
+        assert [item for item, _ in fused] == [b, a, c]
+        assert fused[0][1] == 1 / 62 + 1 / 62
+
+    def test_each_id_appears_once(self):
+        a = uuid.uuid4()
+        assert len(reciprocal_rank_fusion([[a], [a], [a]])) == 1
+
+
+class TestHybridSearch:
+    async def test_legs_are_fused_and_sparse_hits_loaded(self, monkeypatch):
+        corpus = _Corpus(["customs duty article 12", "excise tax", "income tax rates"])
+        shared = corpus.by_text("customs duty article 12")
+        dense_only = _chunk(uuid.uuid4(), "import duties", 0.9)
+
+        async def _dense(db, query, top_k, client=None):
+            return [dense_only, shared]
+
+        monkeypatch.setattr(hybrid_module, "dense_search", _dense)
+        monkeypatch.setattr(hybrid_module, "fetch_chunks", corpus.fetch)
+        results = await hybrid_search(_no_session, "customs article 12", 5, index=corpus.index)
+        # Found by both legs -> first; each chunk once
+        assert [r.chunk_id for r in results] == [shared.chunk_id, dense_only.chunk_id]
+        assert results[0].score > results[1].score
+        assert corpus.fetched == []  # the dense leg already returned the content
+
+        results = await hybrid_search(_no_session, "excise", 5, index=corpus.index)
+        excise = corpus.by_text("excise tax")
+        assert excise.chunk_id in [r.chunk_id for r in results]
+        assert corpus.fetched == [excise.chunk_id]
+
+    async def test_slow_dense_leg_falls_back_to_sparse(self, monkeypatch):
+        corpus = _Corpus(["customs duty", "income tax"])
+
+        async def _slow(db, query, top_k, client=None):
+            await asyncio.sleep(10)
+
+        monkeypatch.setattr(hybrid_module, "dense_search", _slow)
+        monkeypatch.setattr(hybrid_module, "fetch_chunks", corpus.fetch)
+        results = await asyncio.wait_for(
+            hybrid_search(
+                _no_session, "customs", 3, index=corpus.index, dense_timeout=0.05
+            ),
+            timeout=1,
+        )
+        assert [r.content for r in results] == ["customs duty"]
+
+    async def test_failing_dense_leg_and_empty_index_return_nothing(self, monkeypatch):
+        async def _fail(db, query, top_k, client=None):
+            raise RuntimeError("embedding quota exhausted")
+
+        monkeypatch.setattr(hybrid_module, "dense_search", _fail)
+        assert await hybrid_search(_no_session, "customs", 3, index=BM25Index()) == []
+
+    async def test_failing_sparse_leg_keeps_dense_hits(self, monkeypatch):
+        hit = _chunk(uuid.uuid4(), "customs duty", 0.8)
+
+        async def _dense(db, query, top_k, client=None):
+            return [hit]
+
+        class _BrokenIndex(BM25Index):
+            def search(self, query, top_k):
+                raise RuntimeError("corrupt postings")
+
+        monkeypatch.setattr(hybrid_module, "dense_search", _dense)
+        results = await hybrid_search(_no_session, "customs", 3, index=_BrokenIndex())
+        assert [r.chunk_id for r in results] == [hit.chunk_id]
@@ -0,0 +1,326 @@
+"""Tests for the staged ingestion pipeline (Gemini and the database are faked)."""
+
+import asyncio
+import io
+import random
+import time
+import uuid
+from types import SimpleNamespace
+
+import ai_engine.dedup as dedup_module
+import ai_engine.ingest as ingest_module
+import pytest
+from ai_engine.chunker import WindowChunker
+from ai_engine.embedder import OUTPUT_DIM
+from ai_engine.extractor import PageExtractionError
+from ai_engine.ingest import StoredChunk, ingest_pdf
+from database.bulk import chunk_content_hash
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+
+def _scanned_pdf(num_pages: int) -> bytes:
+    """Image-only pages, so every page goes to the (fake) Gemini extractor."""
+    writer = PdfWriter()
+    for n in range(num_pages):
+        page = writer.add_blank_page(width=200, height=200)
+        image = DecodedStreamObject()
+        image.set_data(bytes([n % 256]))
+        image.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+        })
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({
+                NameObject("/Im1"): writer._add_object(image),
+            }),
+        })
+        contents = DecodedStreamObject()
+        contents.set_data(b"q 200 0 0 200 0 0 cm /Im1 Do Q")
+        page[NameObject("/Contents")] = writer._add_object(contents)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+class _FakeModels:
+    """Fakes both extraction and embedding calls and logs when they happen."""
+
+    def __init__(
+        self,
+        extract_delay: float = 0.0,
+        empty_pages: bool = False,
+        fail_pages: set[int] | None = None,
+        amended_pages: set[int] | None = None,
+        boilerplate: bool = False,
+        distinct: bool = False,
+    ):
+        self.extract_delay = extract_delay
+        self.empty_pages = empty_pages
+        self.fail_pages = fail_pages or set()
+        self.amended_pages = amended_pages or set()
+        self.boilerplate = boilerplate
+        self.distinct = distinct
+        self.events: list[tuple[str, float]] = []
+        self.embedded_texts = 0
+
+    async def generate_content(self, model, contents):
+        data = contents[0].parts[0].inline_data.data
+        await asyncio.sleep(self.extract_delay)
+        self.events.append(("extract", time.monotonic()))
+        page = PdfReader(io.BytesIO(data)).pages[0]
+        page_num = page["/Resources"]["/XObject"]["/Im1"].get_object().get_data()[0] + 1
+        if page_num in self.fail_pages:
+            raise RuntimeError("simulated Gemini failure")
+        if self.empty_pages:
+            return SimpleNamespace(text="")
+        if self.boilerplate:
+            return SimpleNamespace(text="የገቢዎች ሚኒስቴር ደብዳቤ ቁጥር ፲፪ " * 20)
+        if self.distinct:
+            return SimpleNamespace(text=_article(page_num, page_num in self.amended_pages))
+        # Amended pages keep their length, so window offsets elsewhere do not move
+        word = "ቀረጥ" if page_num in self.amended_pages else "ታክስ"
+        return SimpleNamespace(text=f"Article {page_num}. " + f"{word} ክፍያ " * 40)
+
+    async def embed_content(self, model, contents, config):
+        self.events.append(("embed", time.monotonic()))
+        self.embedded_texts += len(contents)
+        return SimpleNamespace(embeddings=[
+            SimpleNamespace(values=[1.0] * OUTPUT_DIM) for _ in contents
+        ])
+
+
+def _article(page_num: int, amended: bool = False) -> str:
+    """Text unlike every other page's; amending it changes one word."""
+    rng = random.Random(page_num)
+    words = ["".join(rng.choice("ሀለመረሰሸቀበተነከወዘየደገጠጸፈፐ") for _ in range(4)) for _ in range(60)]
+    if amended:
+        words[30] = "ቀረጥ"
+    return f"Article {page_num}. " + " ".join(words)
+
+
+class _RecordingWriter:
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.rows = []
+        self.pages = []
+        self.calls = 0
+        self.stored: dict[str, list[StoredChunk]] = {}
+        self.metadata_updates = []
+        self.deleted = []
+        # Committed canonical rows and their document, for the LSH lookup
+        self.canonical: list[tuple[uuid.UUID, object]] = []
+
+    async def load_stored(self, session, document_id):
+        return {key: list(rows) for key, rows in self.stored.items()}
+
+    async def write_pages(self, session, document_id, rows):
+        self.pages.extend(rows)
+        return len(self.pages)
+
+    async def update_metadata(self, session, updates):
+        updates = list(updates)
+        self.metadata_updates.extend(updates)
+        return len(updates)
+
+    async def delete(self, session, chunk_ids):
+        chunk_ids = list(chunk_ids)
+        self.deleted.extend(chunk_ids)
+        return len(chunk_ids)
+
+    async def candidates(self, session, keys, exclude_document=None):
+        keys = set(keys)
+        return [
+            (row.id, row.minhash, row.lsh_bands) for document_id, row in self.canonical
+            if document_id != exclude_document and keys.intersection(row.lsh_bands or ())
+        ]
+
+    def commit(self, document_id=None):
+        """Make the written rows the stored version, as a committed run would."""
+        self.stored = {}
+        for row in self.rows:
+            self.stored.setdefault(chunk_content_hash(row.content), []).append(
+                StoredChunk(row.id, row.chunk_index, row.metadata)
+            )
+            if row.canonical_id is None:
+                self.canonical.append((document_id, row))
+        self.rows = []
+
+    async def __call__(self, session, document_id, rows):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("database went away")
+        rows = list(rows)
+        self.rows.extend(rows)
+        return len(rows)
+
+
+def _install(monkeypatch, writer):
+    monkeypatch.setattr(dedup_module, "load_canonical_candidates", writer.candidates)
+    monkeypatch.setattr(ingest_module, "load_stored_chunks", writer.load_stored)
+    monkeypatch.setattr(ingest_module, "bulk_insert_chunks", writer)
+    monkeypatch.setattr(ingest_module, "bulk_insert_pages", writer.write_pages)
+    monkeypatch.setattr(ingest_module, "update_chunk_metadata", writer.update_metadata)
+    monkeypatch.setattr(ingest_module, "delete_chunks", writer.delete)
+    monkeypatch.setattr(ingest_module, "_MAX_BATCH_SIZE", 5)
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = _RecordingWriter()
+    _install(monkeypatch, writer)
+    return writer
+
+
+def _client(models):
+    return SimpleNamespace(aio=SimpleNamespace(models=models))
+
+
+class TestIngestPipeline:
+    async def test_all_chunks_stored_in_order_with_progress(self, writer):
+        models = _FakeModels()
+        reports = []
+
+        async def progress(stage, done, total):
+            reports.append((stage, done, total))
+
+        result = await ingest_pdf(
+            _scanned_pdf(12), uuid.uuid4(), db=None, client=_client(models),
+            chunker=WindowChunker(chunk_size=300, overlap=30), progress=progress,
+        )
+        assert result.pages_total == result.pages_remote == 12
+        assert result.chunk_count == len(writer.rows) > 10
+        assert sorted(row.chunk_index for row in writer.rows) == list(range(result.chunk_count))
+        assert writer.calls > 1  # written batch by batch
+        assert [page.page_number for page in writer.pages] == list(range(1, 13))
+        last = {stage: (done, total) for stage, done, total in reports}
+        assert last["extract"] == (12, 12)
+        assert last["chunk"] == (12, 12)
+        assert last["store"] == (result.chunk_count, result.chunk_count)
+
+    async def test_embedding_overlaps_extraction(self, writer):
+        models = _FakeModels(extract_delay=0.01)
+        await ingest_pdf(
+            _scanned_pdf(40), uuid.uuid4(), db=None, client=_client(models),
+            chunker=WindowChunker(chunk_size=300, overlap=30),
+        )
+        first_embed = min(t for kind, t in models.events if kind == "embed")
+        last_extract = max(t for kind, t in models.events if kind == "extract")
+        assert first_embed < last_extract
+
+    async def test_failed_pages_raise_after_the_rest_is_done(self, writer, monkeypatch):
+        import ai_engine.extractor as extractor_module
+
+        monkeypatch.setattr(extractor_module, "_MAX_RETRIES", 0)
+        models = _FakeModels(fail_pages={3})
+        with pytest.raises(PageExtractionError) as excinfo:
+            await ingest_pdf(
+                _scanned_pdf(6), uuid.uuid4(), db=None, client=_client(models),
+                chunker=WindowChunker(chunk_size=300, overlap=30),
+            )
+        assert excinfo.value.page_numbers == [3]
+        # Pages after the failed one were still extracted and embedded
+        assert sum(kind == "extract" for kind, _ in models.events) == 6
+        assert writer.rows
+        assert not writer.pages
+
+    async def test_no_text_raises(self, writer):
+        with pytest.raises(ValueError, match="No text"):
+            await ingest_pdf(
+                _scanned_pdf(3), uuid.uuid4(), db=None,
+                client=_client(_FakeModels(empty_pages=True)),
+            )
+        assert writer.calls == 0
+
+    async def test_stage_failure_tears_down_pipeline(self, monkeypatch):
+        writer = _RecordingWriter(fail=True)
+        _install(monkeypatch, writer)
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(ingest_pdf(
+                _scanned_pdf(40), uuid.uuid4(), db=None, client=_client(_FakeModels()),
+                chunker=WindowChunker(chunk_size=300, overlap=30),
+            ), timeout=5)
+        assert writer.calls == 1
+
+
+class TestIncrementalReingest:
+    async def test_only_changed_chunks_are_embedded_and_written(self, writer):
+        chunker = WindowChunker(chunk_size=300, overlap=30)
+        first = await ingest_pdf(
+            _scanned_pdf(12), uuid.uuid4(), db=None, client=_client(_FakeModels()),
+            chunker=chunker, near_dup_threshold=0,
+        )
+        writer.commit()
+        stored_ids = {row.id for rows in writer.stored.values() for row in rows}
+        max_index = max(row.chunk_index for rows in writer.stored.values() for row in rows)
+
+        models = _FakeModels(amended_pages={6})
+        second = await ingest_pdf(
+            _scanned_pdf(12), uuid.uuid4(), db=None, client=_client(models),
+            chunker=chunker, near_dup_threshold=0,
+        )
+        assert second.chunk_count == first.chunk_count
+        assert 0 < len(writer.rows) < first.chunk_count // 4
+        # Only the new chunks were sent to Gemini
+        assert models.embedded_texts == len(writer.rows)
+        assert second.chunks_reused == first.chunk_count - len(writer.rows)
+        # Stale rows are deleted, kept rows are untouched (offsets did not move)
+        assert second.chunks_deleted == len(writer.deleted) == len(writer.rows)
+        assert set(writer.deleted) <= stored_ids
+        assert writer.metadata_updates == []
+        # New rows are numbered after the stored ones
+        assert min(row.chunk_index for row in writer.rows) > max_index
+
+    async def test_unchanged_file_writes_nothing(self, writer):
+        chunker = WindowChunker(chunk_size=300, overlap=30)
+        await ingest_pdf(
+            _scanned_pdf(4), uuid.uuid4(), db=None, client=_client(_FakeModels()),
+            chunker=chunker, near_dup_threshold=0,
+        )
+        writer.commit()
+        models = _FakeModels()
+        result = await ingest_pdf(
+            _scanned_pdf(4), uuid.uuid4(), db=None, client=_client(models),
+            chunker=chunker, near_dup_threshold=0,
+        )
+        assert writer.rows == [] and writer.deleted == []
+        assert models.embedded_texts == 0
+        assert result.chunks_reused == result.chunk_count
+
+
+    async def test_amended_chunk_is_embedded_not_linked_to_its_old_version(self, writer):
+        chunker = WindowChunker(chunk_size=300, overlap=30)
+        document_id = uuid.uuid4()
+        await ingest_pdf(
+            _scanned_pdf(6), document_id, db=None, client=_client(_FakeModels(distinct=True)),
+            chunker=chunker, near_dup_threshold=0.8,
+        )
+        writer.commit(document_id)
+
+        models = _FakeModels(distinct=True, amended_pages={3})
+        result = await ingest_pdf(
+            _scanned_pdf(6), document_id, db=None, client=_client(models),
+            chunker=chunker, near_dup_threshold=0.8,
+        )
+        assert writer.rows and result.chunks_linked == 0
+        # The amended chunks got fresh embeddings, not links to the rows deleted below
+        assert all(row.canonical_id is None and row.embedding is not None for row in writer.rows)
+        assert models.embedded_texts == len(writer.rows)
+        assert len(writer.deleted) == len(writer.rows)
+
+class TestNearDuplicates:
+    async def test_repeated_text_is_linked_not_embedded(self, writer):
+        models = _FakeModels(boilerplate=True)
+        result = await ingest_pdf(
+            _scanned_pdf(12), uuid.uuid4(), db=None, client=_client(models),
+            chunker=WindowChunker(chunk_size=300, overlap=30), near_dup_threshold=0.8,
+        )
+        assert result.chunk_count == len(writer.rows)
+        canonical = {row.id for row in writer.rows if row.canonical_id is None}
+        linked = [row for row in writer.rows if row.canonical_id is not None]
+        assert result.chunks_linked == len(linked) > result.chunk_count // 2
+        assert models.embedded_texts == len(canonical)
+        assert all(row.embedding is None and row.canonical_id in canonical for row in linked)
+        assert all(row.embedding is not None for row in writer.rows if row.id in canonical)
@@ -0,0 +1,200 @@
+"""Tests for the ingestion job queue and worker (no DB, Redis or Gemini needed)."""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import ai_engine.jobs as jobs_module
+import ai_engine.worker as worker_module
+import pytest
+from ai_engine.ingest import IngestionResult
+from ai_engine.jobs import InMemoryJobQueue
+from ai_engine.worker import IngestionWorker
+from database.models.document import DocumentStatus
+
+
+class TestInMemoryJobQueue:
+    async def test_fifo_claim_and_ack(self):
+        queue = InMemoryJobQueue()
+        await queue.enqueue("a")
+        await queue.enqueue("b")
+        assert await queue.claim() == "a"
+        assert await queue.claim() == "b"
+        assert await queue.claim() is None
+        await queue.ack("a")
+        assert await queue.requeue_expired() == 0
+
+    async def test_expired_claim_is_redelivered(self):
+        queue = InMemoryJobQueue()
+        await queue.enqueue("a")
+        assert await queue.claim(visibility_timeout=0) == "a"
+        assert await queue.requeue_expired() == 1
+        assert await queue.claim() == "a"
+
+    async def test_extend_keeps_job_hidden(self):
+        queue = InMemoryJobQueue()
+        await queue.enqueue("a")
+        await queue.claim(visibility_timeout=0)
+        assert await queue.extend("a", visibility_timeout=60)
+        assert await queue.requeue_expired() == 0
+        await queue.ack("a")
+        assert not await queue.extend("a")
+
+    async def test_progress(self):
+        queue = InMemoryJobQueue()
+        await queue.enqueue("a")
+        await queue.set_progress("a", "extract", 3, 10)
+        await queue.set_progress("a", "chunk", 0, 7)
+        assert await queue.record_attempt("a") == 1
+        progress = await queue.get_progress("a")
+        assert progress.stage == "chunk"
+        assert progress.stages["extract"].done == 3
+        assert progress.attempts == 1
+        assert await queue.get_progress("unknown") is None
+
+
+class _FakeSession:
+    def __init__(self, docs):
+        self._docs = docs
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, model, key):
+        return self._docs.get(key)
+
+    async def execute(self, statement):
+        return None
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def stored_doc(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs_module, "STORAGE_DIR", tmp_path)
+    doc = SimpleNamespace(id=uuid.uuid4(), status=DocumentStatus.PENDING)
+    jobs_module.upload_path(doc.id).write_bytes(b"%PDF-1.4")
+    return doc
+
+
+def _worker(queue, doc, **kwargs):
+    docs = {doc.id: doc}
+    return IngestionWorker(queue, lambda: _FakeSession(docs), **kwargs)
+
+
+class TestIngestionWorker:
+    async def test_success_indexes_and_acks(self, stored_doc, monkeypatch):
+        async def fake_ingest(pdf, document_id, db, progress, **kwargs):
+            await progress("extract", 1, 1)
+            return IngestionResult(1, 1, 1, 0, 0)
+
+        monkeypatch.setattr(worker_module, "ingest_pdf", fake_ingest)
+        queue = InMemoryJobQueue()
+        await queue.enqueue(str(stored_doc.id))
+
+        assert await _worker(queue, stored_doc).run_once()
+        assert stored_doc.status == DocumentStatus.INDEXED
+        assert not jobs_module.upload_path(stored_doc.id).exists()
+        assert await queue.claim() is None
+        assert (await queue.get_progress(str(stored_doc.id))).stages["extract"].done == 1
+
+    async def test_progress_write_failure_does_not_abort(self, stored_doc, monkeypatch):
+        async def fake_ingest(pdf, document_id, db, progress, **kwargs):
+            await progress("extract", 1, 1)
+            return IngestionResult(1, 1, 1, 0, 0)
+
+        class _FlakyQueue(InMemoryJobQueue):
+            async def set_progress(self, *args):
+                raise ConnectionError("redis went away")
+
+        monkeypatch.setattr(worker_module, "ingest_pdf", fake_ingest)
+        queue = _FlakyQueue()
+        await queue.enqueue(str(stored_doc.id))
+
+        assert await _worker(queue, stored_doc).run_once()
+        assert stored_doc.status == DocumentStatus.INDEXED
+        assert (await queue.get_progress(str(stored_doc.id))).attempts == 1
+
+    async def test_lost_claim_cancels_the_attempt(self, stored_doc, monkeypatch):
+        cancelled = asyncio.Event()
+
+        async def slow_ingest(*args, **kwargs):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        class _StolenQueue(InMemoryJobQueue):
+            async def extend(self, job_id, visibility_timeout=0):
+                return False
+
+        monkeypatch.setattr(worker_module, "ingest_pdf", slow_ingest)
+        queue = _StolenQueue()
+        await queue.enqueue(str(stored_doc.id))
+
+        worker = _worker(queue, stored_doc, visibility_timeout=0.03)
+        assert await asyncio.wait_for(worker.run_once(), timeout=1)
+        assert cancelled.is_set()
+        assert stored_doc.status == DocumentStatus.PENDING
+
+    async def test_transient_failure_released_for_retry(self, stored_doc, monkeypatch):
+        async def failing_ingest(*args, **kwargs):
+            raise ConnectionError("database went away")
+
+        monkeypatch.setattr(worker_module, "ingest_pdf", failing_ingest)
+        monkeypatch.setattr(worker_module, "_RETRY_DELAY", 0)
+        queue = InMemoryJobQueue()
+        await queue.enqueue(str(stored_doc.id))
+        worker = _worker(queue, stored_doc, max_attempts=2)
+
+        assert await worker.run_once()
+        assert stored_doc.status == DocumentStatus.PENDING
+        # Second delivery exhausts the attempts
+        assert await worker.run_once()
+        assert stored_doc.status == DocumentStatus.FAILED
+        progress = await queue.get_progress(str(stored_doc.id))
+        assert progress.attempts == 2
+        assert "database went away" in progress.error
+        assert not await worker.run_once()
+
+    async def test_release_happens_after_the_heartbeat_stops(self, stored_doc, monkeypatch):
+        async def failing_ingest(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            raise ConnectionError("database went away")
+
+        class _RecordingQueue(InMemoryJobQueue):
+            running_at_release = None
+
+            async def release(self, job_id, delay=0.0):
+                current = asyncio.current_task()
+                self.running_at_release = [t for t in asyncio.all_tasks() if t is not current]
+                await super().release(job_id, delay)
+
+        monkeypatch.setattr(worker_module, "ingest_pdf", failing_ingest)
+        monkeypatch.setattr(worker_module, "_RETRY_DELAY", 0)
+        queue = _RecordingQueue()
+        await queue.enqueue(str(stored_doc.id))
+
+        assert await _worker(queue, stored_doc, visibility_timeout=0.03).run_once()
+        # No heartbeat left to push the retry deadline back
+        assert queue.running_at_release == []
+        await asyncio.sleep(0.05)
+        assert await queue.requeue_expired() == 1
+
+    async def test_permanent_failure_not_retried(self, stored_doc, monkeypatch):
+        async def empty_ingest(*args, **kwargs):
+            raise ValueError("No text could be extracted from the PDF")
+
+        monkeypatch.setattr(worker_module, "ingest_pdf", empty_ingest)
+        queue = InMemoryJobQueue()
+        await queue.enqueue(str(stored_doc.id))
+
+        assert await _worker(queue, stored_doc).run_once()
+        assert stored_doc.status == DocumentStatus.FAILED
+        assert await queue.requeue_expired() == 0
@@ -0,0 +1,95 @@
+"""Tests for Gemini quota pacing, retry backoff and the shared client."""
+
+import ai_engine.ratelimit as ratelimit_module
+import pytest
+from ai_engine.ratelimit import Bucket, InMemoryTokenBuckets, QuotaLimiter
+from ai_engine.retry import backoff_delay, server_retry_delay
+from google.genai import errors
+
+
+class TestTokenBuckets:
+    async def test_reservations_are_spaced_at_the_refill_rate(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(ratelimit_module.time, "monotonic", lambda: now[0])
+        buckets = InMemoryTokenBuckets()
+        bucket = Bucket(rate=2.0, capacity=2.0)
+
+        waits = [await buckets.reserve("b", bucket, 1) for _ in range(5)]
+        # The burst capacity is free, then one reservation every 1/rate seconds
+        assert waits == [0.0, 0.0, 0.5, 1.0, 1.5]
+
+        now[0] += 10  # idle refills up to capacity, not beyond
+        assert [await buckets.reserve("b", bucket, 1) for _ in range(3)] == [0.0, 0.0, 0.5]
+
+    async def test_refund(self, monkeypatch):
+        monkeypatch.setattr(ratelimit_module.time, "monotonic", lambda: 0.0)
+        buckets = InMemoryTokenBuckets()
+        bucket = Bucket(rate=1.0, capacity=10.0)
+        assert await buckets.reserve("t", bucket, 14) == 4.0
+        await buckets.reserve("t", bucket, -4)
+        assert await buckets.reserve("t", bucket, 1) == 1.0
+
+
+class TestQuotaLimiter:
+    @pytest.fixture
+    def sleeps(self, monkeypatch):
+        sleeps = []
+
+        async def _sleep(seconds):
+            sleeps.append(seconds)
+
+        monkeypatch.setattr(ratelimit_module.asyncio, "sleep", _sleep)
+        return sleeps
+
+    async def test_waits_for_the_scarcer_quota(self, sleeps, monkeypatch):
+        monkeypatch.setattr(ratelimit_module.time, "monotonic", lambda: 0.0)
+        limiter = QuotaLimiter(InMemoryTokenBuckets(), {
+            "embed:requests": 6000, "embed:tokens": 600,  # 100 req/s, 10 tokens/s
+        })
+        await limiter.acquire("embed", tokens=50)  # capacity is 5s of quota
+        assert sleeps == []
+        await limiter.acquire("embed", tokens=20)
+        assert sleeps == [pytest.approx(2.0)]
+
+    async def test_unconfigured_quota_is_not_paced(self, sleeps):
+        limiter = QuotaLimiter(InMemoryTokenBuckets(), {"generate:requests": 0})
+        for _ in range(100):
+            await limiter.acquire("generate", tokens=10_000)
+        assert sleeps == []
+
+    async def test_unavailable_backend_lets_calls_through(self, sleeps):
+        class _Down:
+            async def reserve(self, name, bucket, cost):
+                raise ConnectionError("redis is down")
+
+        limiter = QuotaLimiter(_Down(), {"generate:requests": 1})
+        await limiter.acquire("generate")
+        assert sleeps == []
+
+
+class TestBackoff:
+    def test_jitter_stays_within_half_to_full_delay(self):
+        delays = [backoff_delay(3, 1.0) for _ in range(200)]
+        assert all(4.0 <= d <= 8.0 for d in delays)
+        assert len(set(delays)) > 1
+        assert backoff_delay(20, 1.0) <= 60.0
+
+    def test_server_retry_delay_is_honoured(self):
+        exc = errors.APIError(429, {"error": {
+            "code": 429,
+            "status": "RESOURCE_EXHAUSTED",
+            "details": [
+                {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "27s"},
+            ],
+        }})
+        assert server_retry_delay(exc) == 27.0
+        assert backoff_delay(0, 1.0, exc) == 27.0
+        assert server_retry_delay(TimeoutError()) is None
+
+
+def test_client_is_shared(monkeypatch):
+    import ai_engine.clients as clients_module
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(clients_module, "_client", None)
+    assert clients_module.get_client() is clients_module.get_client()
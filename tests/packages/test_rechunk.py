@@ -0,0 +1,65 @@
+"""Tests for offline re-chunking (the rebuild test requires PostgreSQL)."""
+
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from ai_engine.chunker import SentenceChunker, WindowChunker
+from ai_engine.embedder import OUTPUT_DIM
+from ai_engine.rechunk import build_chunker, rechunk_document
+
+try:
+    from tests.conftest import _HAS_DB
+except ImportError:
+    _HAS_DB = False
+
+
+class TestBuildChunker:
+    def test_overrides_apply(self):
+        assert build_chunker("window", chunk_size=800, overlap=80) == WindowChunker(800, 80)
+        assert build_chunker("sentence", max_tokens=300) == SentenceChunker(max_tokens=300)
+
+    def test_setting_of_other_strategy_rejected(self):
+        with pytest.raises(ValueError, match="chunk_size"):
+            build_chunker("sentence", chunk_size=800)
+
+
+class _FakeEmbedModels:
+    def __init__(self):
+        self.embedded: list[str] = []
+
+    async def embed_content(self, model, contents, config):
+        self.embedded.extend(contents)
+        return SimpleNamespace(embeddings=[
+            SimpleNamespace(values=[1.0] * OUTPUT_DIM) for _ in contents
+        ])
+
+
+@pytest.mark.skipif(not _HAS_DB, reason="PostgreSQL not available")
+@pytest.mark.asyncio(loop_scope="session")
+class TestRechunkDocument:
+    async def test_rebuilds_chunks_from_stored_pages(self, db_session):
+        from database.bulk import PageRow, bulk_insert_pages
+        from database.models import Document, DocumentChunk
+        from sqlalchemy import select
+
+        doc = Document(id=uuid.uuid4(), title="Proclamation", file_hash=uuid.uuid4().hex * 2)
+        db_session.add(doc)
+        await bulk_insert_pages(db_session, doc.id, [
+            PageRow(n, f"Article {n}. " + "Tax is due on every sale. " * 30, "gemini")
+            for n in range(1, 4)
+        ])
+        client = SimpleNamespace(aio=SimpleNamespace(models=_FakeEmbedModels()))
+
+        coarse = await rechunk_document(db_session, doc.id, WindowChunker(4000, 400), client)
+        fine = await rechunk_document(db_session, doc.id, WindowChunker(500, 50), client)
+        assert fine > coarse
+
+        rows = (await db_session.execute(
+            select(DocumentChunk.chunk_index).where(DocumentChunk.document_id == doc.id)
+        )).scalars().all()
+        assert sorted(rows) == list(range(fine))
+
+    async def test_document_without_pages(self, db_session):
+        with pytest.raises(LookupError):
+            await rechunk_document(db_session, uuid.uuid4(), WindowChunker())
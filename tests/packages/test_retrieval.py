@@ -0,0 +1,188 @@
+"""Tests for dense retrieval (the search round trip requires PostgreSQL)."""
+
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from ai_engine.cache import InMemoryEmbeddingCache, RedisEmbeddingCache
+from ai_engine.embedder import OUTPUT_DIM
+from ai_engine.retrieval import (
+    dense_search,
+    embed_query,
+    query_cache_key,
+    search_by_embedding,
+    set_ann_params,
+)
+from sqlalchemy.dialects import postgresql
+
+try:
+    from tests.conftest import _HAS_DB
+except ImportError:
+    _HAS_DB = False
+
+
+class _RecordingSession:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return self.rows
+
+
+class TestAnnParams:
+    async def test_parameters_are_transaction_local(self):
+        db = _RecordingSession()
+        await set_ann_params(db, probes=20, ef_search=100)
+        (sql,) = db.statements
+        assert sql.count("set_config(") == 2
+
+    async def test_unset_parameters_are_left_alone(self):
+        db = _RecordingSession()
+        await set_ann_params(db)
+        assert db.statements == []
+
+    async def test_search_sets_params_then_queries_with_title(self):
+        doc_id, chunk_id = uuid.uuid4(), uuid.uuid4()
+        db = _RecordingSession([
+            (chunk_id, doc_id, "Income Tax Proclamation", "text", {"pages": [3, 4]}, 0.25),
+        ])
+        (hit,) = await search_by_embedding(db, [0.1] * OUTPUT_DIM, 5, probes=7, ef_search=None)
+        assert db.statements[0].count("set_config(") == 1
+        assert "JOIN documents" in db.statements[1]
+        assert hit.score == 0.75
+        assert hit.pages == [3, 4]
+        assert hit.document_title == "Income Tax Proclamation"
+
+
+class _FakeEmbedModels:
+    def __init__(self, vector):
+        self.vector = vector
+        self.task_types = []
+
+    async def embed_content(self, model, contents, config):
+        self.task_types.append(config.task_type)
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=self.vector)])
+
+
+class _FakeRedis:
+    """Just enough of a bytes-returning Redis client for pipelined GETEX / SET."""
+
+    def __init__(self, down: bool = False):
+        self.down = down
+        self.values: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def getex(self, key, ex):
+        self.commands.append(("getex", key, ex))
+
+    def set(self, key, value, ex):
+        self.commands.append(("set", key, value, ex))
+
+    async def execute(self):
+        if self.redis.down:
+            raise ConnectionError("redis is down")
+        results = []
+        for command, key, *args in self.commands:
+            if command == "set":
+                self.redis.values[key], self.redis.ttls[key] = args
+                results.append(True)
+            else:
+                value = self.redis.values.get(key)
+                if value is not None:
+                    self.redis.ttls[key] = args[0]
+                results.append(value)
+        return results
+
+
+class TestQueryEmbeddingCache:
+    def test_keys_ignore_spacing_punctuation_case_and_homophones(self):
+        assert query_cache_key("TIN ላማውጣት?") == query_cache_key("  tin ላማውጣት ")
+        assert query_cache_key("የሐገር ውስጥ ገቢ፡፡") == query_cache_key("የሀገር ውስጥ ገቢ")
+        assert query_cache_key("VAT threshold") != query_cache_key("VAT registration")
+        # No words to normalize: keyed by the text, not all by ""
+        assert query_cache_key("??") != query_cache_key("%")
+        assert query_cache_key(" ?? ") == query_cache_key("??")
+
+    async def test_variant_spelling_is_served_from_cache(self):
+        models = _FakeEmbedModels([0.5] * OUTPUT_DIM)
+        client = SimpleNamespace(aio=SimpleNamespace(models=models))
+        cache = InMemoryEmbeddingCache(capacity=10, ttl=60)
+        first = await embed_query("VAT registration threshold?", client, cache)
+        second = await embed_query("vat  registration threshold", client, cache)
+        assert len(models.task_types) == 1
+        assert np.array_equal(first, second) and second.dtype == np.float32
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    async def test_in_memory_cache_evicts_least_recently_used_and_expired(self):
+        cache = InMemoryEmbeddingCache(capacity=2, ttl=60)
+        vector = np.ones(4, dtype=np.float32)
+        await cache.set_many({"a": vector, "b": vector})
+        await cache.get_many(["a"])
+        await cache.set_many({"c": vector})
+        assert set(await cache.get_many(["a", "b", "c"])) == {"a", "c"}
+
+        expired = InMemoryEmbeddingCache(capacity=2, ttl=0)
+        await expired.set_many({"a": vector})
+        assert await expired.get_many(["a"]) == {}
+
+    async def test_redis_stores_float32_bytes_and_renews_ttl(self):
+        redis = _FakeRedis()
+        vector = np.linspace(0, 1, OUTPUT_DIM, dtype=np.float32)
+        await RedisEmbeddingCache(redis, ttl=3600).set_many({"k": vector})
+        assert redis.values["embedding:query:k"] == vector.astype("<f4").tobytes()
+
+        # A fresh process: no local entry, served from Redis
+        cache = RedisEmbeddingCache(redis, ttl=3600, local_size=10)
+        found = await cache.get_many(["k", "missing"])
+        assert np.array_equal(found["k"], vector) and found["k"].dtype == np.float32
+        assert redis.ttls["embedding:query:k"] == 3600
+        redis.values.clear()
+        assert "k" in await cache.get_many(["k"])  # now from the local tier
+
+    async def test_redis_outage_is_a_miss_not_an_error(self):
+        cache = RedisEmbeddingCache(_FakeRedis(down=True), ttl=60)
+        await cache.set_many({"k": np.ones(4, dtype=np.float32)})
+        assert await cache.get_many(["k"]) == {}
+        assert cache.misses == 1
+
+
+@pytest.mark.skipif(not _HAS_DB, reason="PostgreSQL not available")
+@pytest.mark.asyncio(loop_scope="session")
+class TestDenseSearch:
+    async def test_nearest_chunks_first(self, db_session):
+        from database.bulk import ChunkRow, bulk_insert_chunks
+        from database.models import Document
+
+        doc = Document(id=uuid.uuid4(), title="VAT Proclamation", file_hash=uuid.uuid4().hex * 2)
+        db_session.add(doc)
+        basis = np.eye(3, OUTPUT_DIM, dtype=np.float32)
+        await bulk_insert_chunks(db_session, doc.id, [
+            ChunkRow(i, f"chunk {i}", basis[i], {"pages": [i + 1]}) for i in range(3)
+        ])
+
+        models = _FakeEmbedModels((basis[1] + 0.1 * basis[2]).tolist())
+        client = SimpleNamespace(aio=SimpleNamespace(models=models))
+        hits = await dense_search(db_session, "query", top_k=2, client=client)
+        assert [hit.content for hit in hits] == ["chunk 1", "chunk 2"]
+        assert hits[0].document_title == "VAT Proclamation"
+        assert hits[0].pages == [2]
+        assert hits[0].score > hits[1].score
+        assert models.task_types == ["RETRIEVAL_QUERY"]
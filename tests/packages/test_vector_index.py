@@ -0,0 +1,75 @@
+"""Tests for the embedding index tooling (rebuilds require PostgreSQL)."""
+
+import pytest
+from ai_engine.vector_index import (
+    HNSW,
+    IVFFLAT,
+    BenchmarkResult,
+    IndexSpec,
+    current_index,
+    default_spec,
+    format_results,
+    ivfflat_lists,
+    rebuild_index,
+    recall_at_k,
+    sweep,
+)
+
+try:
+    from tests.conftest import _HAS_DB
+except ImportError:
+    _HAS_DB = False
+
+
+class TestIndexParameters:
+    def test_lists_follow_the_row_count(self):
+        assert ivfflat_lists(0) == 1
+        assert ivfflat_lists(25_000) == 25
+        assert ivfflat_lists(1_000_000) == 1000
+        assert ivfflat_lists(4_000_000) == 2000
+
+    def test_create_sql_is_concurrent_with_cosine_ops(self):
+        sql = default_spec(IVFFLAT, 50_000).create_sql("tmp_index")
+        assert sql.startswith("CREATE INDEX CONCURRENTLY tmp_index ON document_chunks")
+        assert "USING ivfflat (embedding vector_cosine_ops) WITH (lists = 50)" in sql
+        sql = IndexSpec(HNSW, {"m": 24, "ef_construction": 100}).create_sql()
+        assert "ix_document_chunks_embedding_hnsw" in sql
+        assert "WITH (ef_construction = 100, m = 24)" in sql
+
+    def test_sweep_stays_within_lists_and_above_k(self):
+        assert sweep(IndexSpec(IVFFLAT, {"lists": 20}), 8) == [1, 2, 4, 8, 16, 20]
+        assert min(sweep(IndexSpec(HNSW, {"m": 16}), 50)) == 50
+
+
+class TestBenchmarkReport:
+    def test_recall_is_the_share_of_exact_neighbours_found(self):
+        assert recall_at_k(["a", "b", "x"], ["a", "b", "c"]) == pytest.approx(2 / 3)
+        assert recall_at_k([], []) == 1.0
+
+    def test_table_has_one_line_per_setting(self):
+        table = format_results([
+            BenchmarkResult("hnsw (m=16)", "ef_search=40", 0.98, 1.2, 2.5),
+            BenchmarkResult("hnsw (m=16)", "ef_search=80", 0.995, 1.9, 3.1),
+        ], top_k=8)
+        lines = table.splitlines()
+        assert "recall@8" in lines[0]
+        assert len(lines) == 3 and "0.995" in lines[2]
+
+
+@pytest.mark.skipif(not _HAS_DB, reason="PostgreSQL not available")
+class TestRebuild:
+    async def test_rebuild_swaps_index_kind(self, db_session):
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        from tests.conftest import TEST_DATABASE_URL
+
+        engine = create_async_engine(TEST_DATABASE_URL)
+        try:
+            await rebuild_index(engine, IndexSpec(IVFFLAT, {"lists": 4}))
+            assert await current_index(db_session) == IndexSpec(IVFFLAT, {"lists": 4})
+            # An open transaction would hold up the concurrent build
+            await db_session.rollback()
+            await rebuild_index(engine, default_spec(HNSW, 0))
+            assert (await current_index(db_session)).kind == HNSW
+        finally:
+            await engine.dispose()